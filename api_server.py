@@ -0,0 +1,351 @@
+"""Headless HTTP API for the app's psychrometric calculations.
+
+Other tools and BMS scripts can solve states without the Streamlit UI. The
+server is asynchronous (Starlette on uvicorn, both installed with Streamlit);
+the solving runs in a process pool. Concurrent single-state requests that
+arrive within BATCH_WINDOW of each other are solved together in one
+vectorized call, and so are concurrent mixes.
+
+Endpoints (JSON bodies; temperatures in °C, RH in %, pressures in kPa):
+
+    POST /state   {"dry_bulb": 25, "humidity": 50, "method": "rel_hum", "pressure": 101.325}
+    POST /batch   {"dry_bulb": [...], "humidity": [...], "method": ..., "pressure": 101.325 or [...]}
+                  With ?stream=1 (or Accept: application/x-ndjson) the result
+                  is streamed as one JSON object per line, in input order.
+    POST /mix     {"streams": [{"dry_bulb": 30, "rel_hum": 40, "ratio": 30}, ...], "pressure": 101.325}
+    GET  /health
+
+method is one of psychro_engine.HUMIDITY_METHODS (rel_hum, wet_bulb,
+dew_point, hum_ratio). "elevation" (m) may be given instead of "pressure".
+Results use the columns and units of psychro_calc.BATCH_COLUMNS; invalid
+states give nulls. States are solved with the vectorized engine, which
+agrees with psychrolib within 0.002 °C.
+
+Run:
+
+    python -m api_server --port 8600 --workers 4
+"""
+import argparse
+import asyncio
+import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import psychro_engine as engine
+from parallel_calc import default_workers
+from process_chain import AirStream, mix
+from psychro_calc import BATCH_COLUMNS, pressure_from_elevation, solve_batch
+
+DEFAULT_PORT = 8600
+SEA_LEVEL_PRESSURE = 101.325
+# Single-state and mix requests are collected for up to this long (s) and solved together
+BATCH_WINDOW = 0.002
+# Collected requests are solved at once when this many are waiting
+MAX_BATCHED_REQUESTS = 1024
+# Rows per worker task for /batch; streamed responses send one task's rows at a time
+BATCH_CHUNK_ROWS = 20_000
+# Largest /batch request accepted
+MAX_BATCH_ROWS = 5_000_000
+NDJSON = 'application/x-ndjson'
+
+
+class RequestError(ValueError):
+    """Invalid request body, reported as HTTP 400."""
+
+
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RequestError(f"'{field}' must be a number")
+    return float(value)
+
+
+def _numbers(value, field):
+    if isinstance(value, list):
+        try:
+            values = np.array(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            values = None
+        if values is None or values.ndim != 1:
+            raise RequestError(f"'{field}' must be a list of numbers")
+        return values
+    return _number(value, field)
+
+
+def _required(body, field):
+    if field not in body:
+        raise RequestError(f"missing '{field}'")
+    return body[field]
+
+
+def _method(body):
+    method = body.get('method', engine.REL_HUM)
+    if method not in engine.HUMIDITY_METHODS:
+        raise RequestError(f"'method' must be one of {', '.join(engine.HUMIDITY_METHODS)}")
+    return method
+
+
+def _pressure(body):
+    # kPa, from "pressure" (number or list) or "elevation" (m)
+    if 'elevation' in body:
+        return pressure_from_elevation(_number(body['elevation'], 'elevation'))
+    return _numbers(body.get('pressure', SEA_LEVEL_PRESSURE), 'pressure')
+
+
+def _clean(value):
+    # NaN and infinity are not valid JSON
+    return value if math.isfinite(value) else None
+
+
+def _json_values(values):
+    # Float array as JSON number texts, null where not finite
+    return [repr(v) if math.isfinite(v) else 'null' for v in values.tolist()]
+
+
+# One result object per line, filled with _json_values texts
+_ROW_TEMPLATE = '{{' + ', '.join(f'"{key}": {{}}' for key in BATCH_COLUMNS) + '}}'
+
+
+def _result_rows(props, n, extra=()):
+    # Column arrays to one dict per state; extra columns come first
+    columns = [(key, values.tolist()) for key, values in extra]
+    columns += [(key, props[key].tolist()) for key in BATCH_COLUMNS]
+    return [{key: _clean(values[i]) for key, values in columns} for i in range(n)]
+
+
+def _solve_states(method, dry_bulb, humidity, pressure):
+    # Worker task: batched single states, one result dict each
+    return _result_rows(solve_batch(dry_bulb, method, humidity, pressure), len(dry_bulb))
+
+
+def _solve_columns(dry_bulb, method, humidity, pressure):
+    # Worker task: a chunk of /batch as the JSON text of each column's values
+    props = solve_batch(dry_bulb, method, humidity, pressure)
+    return {key: ', '.join(_json_values(props[key])) for key in BATCH_COLUMNS}
+
+
+def _solve_ndjson(dry_bulb, method, humidity, pressure):
+    # Worker task: a chunk of /batch already serialized as NDJSON lines
+    props = solve_batch(dry_bulb, method, humidity, pressure)
+    columns = [_json_values(props[key]) for key in BATCH_COLUMNS]
+    return ''.join(_ROW_TEMPLATE.format(*row) + '\n' for row in zip(*columns))
+
+
+def _solve_mixes(n_streams, *columns):
+    # Worker task: batched mixes of n_streams streams each; columns are dry
+    # bulb, RH (%), pressure (kPa) and ratio of stream 1, then stream 2, ...
+    mixed = mix(*(
+        AirStream.from_input(dry_bulb, rel_hum / 100, pressure * 1000, ratio)
+        for dry_bulb, rel_hum, pressure, ratio in zip(*[iter(columns)] * 4)
+    ))
+    props = solve_batch(mixed.dry_bulb, engine.HUM_RATIO, mixed.hum_ratio, mixed.pressure / 1000)
+    extra = (('dry_bulb', mixed.dry_bulb), ('pressure', mixed.pressure / 1000))
+    return _result_rows(props, len(columns[0]), extra)
+
+
+class RequestBatcher:
+    """Collects concurrent small requests and solves each group in one
+    vectorized worker call.
+
+    task(group, *columns) gets one float64 array per value and returns one
+    result per request, in order.
+    """
+
+    def __init__(self, executor, task, window=BATCH_WINDOW, max_requests=MAX_BATCHED_REQUESTS):
+        self.executor = executor
+        self.task = task
+        self.window = window
+        self.max_requests = max_requests
+        self.batches = 0
+        self.requests = 0
+        self._pending = []
+        self._timer = None
+
+    async def solve(self, group, *values):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((group, values, future))
+        if len(self._pending) >= self.max_requests:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        groups = {}
+        for item in pending:
+            groups.setdefault(item[0], []).append(item)
+        loop = asyncio.get_running_loop()
+        for group, items in groups.items():
+            columns = np.array([values for _, values, _ in items], dtype=np.float64).T
+            task = loop.run_in_executor(self.executor, self.task, group, *columns)
+            task.add_done_callback(lambda task, items=items: self._deliver(task, items))
+            self.batches += 1
+            self.requests += len(items)
+
+    @staticmethod
+    def _deliver(task, items):
+        futures = [future for _, _, future in items]
+        if task.exception() is not None:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(task.exception())
+            return
+        for future, result in zip(futures, task.result()):
+            if not future.done():
+                future.set_result(result)
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise RequestError("body must be JSON") from None
+    if not isinstance(body, dict):
+        raise RequestError("body must be a JSON object")
+    return body
+
+
+def _handler(endpoint):
+    # Request errors become 400 responses
+    async def handle(request):
+        try:
+            return await endpoint(request)
+        except RequestError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+    return handle
+
+
+async def state(request):
+    body = await _body(request)
+    dry_bulb = _number(_required(body, 'dry_bulb'), 'dry_bulb')
+    humidity = _number(_required(body, 'humidity'), 'humidity')
+    pressure = _pressure(body)
+    if isinstance(pressure, np.ndarray):
+        raise RequestError("'pressure' must be a number")
+    row = await request.app.state.state_batcher.solve(_method(body), dry_bulb, humidity, pressure)
+    return JSONResponse(row)
+
+
+async def batch(request):
+    body = await _body(request)
+    method = _method(body)
+    dry_bulb = _numbers(_required(body, 'dry_bulb'), 'dry_bulb')
+    humidity = _numbers(_required(body, 'humidity'), 'humidity')
+    pressure = _pressure(body)
+    try:
+        dry_bulb, humidity, pressure = np.broadcast_arrays(
+            np.atleast_1d(dry_bulb), np.atleast_1d(humidity), np.atleast_1d(pressure)
+        )
+    except ValueError:
+        raise RequestError("'dry_bulb', 'humidity' and 'pressure' lists must have the same length") from None
+    n = len(dry_bulb)
+    if n > MAX_BATCH_ROWS:
+        raise RequestError(f"at most {MAX_BATCH_ROWS:,} states per batch")
+
+    loop = asyncio.get_running_loop()
+    executor = request.app.state.executor
+    chunks = range(0, n, BATCH_CHUNK_ROWS)
+    stream = request.query_params.get('stream') in ('1', 'true') or NDJSON in request.headers.get('accept', '')
+    task = _solve_ndjson if stream else _solve_columns
+    # Every chunk is submitted at once so the pool works on them in parallel
+    tasks = [
+        loop.run_in_executor(executor, task, dry_bulb[i:i + BATCH_CHUNK_ROWS].copy(), method,
+                             humidity[i:i + BATCH_CHUNK_ROWS].copy(), pressure[i:i + BATCH_CHUNK_ROWS].copy())
+        for i in chunks
+    ]
+    if stream:
+        async def lines():
+            for chunk in tasks:
+                yield await chunk
+        return StreamingResponse(lines(), media_type=NDJSON)
+
+    # Columns joined from the workers' JSON texts, not re-encoded here
+    chunks = await asyncio.gather(*tasks)
+    content = '{' + ', '.join(
+        f'"{key}": [' + ', '.join(chunk[key] for chunk in chunks if chunk[key]) + ']' for key in BATCH_COLUMNS
+    ) + '}'
+    return Response(content, media_type='application/json')
+
+
+async def mixing(request):
+    body = await _body(request)
+    streams = _required(body, 'streams')
+    if not isinstance(streams, list) or len(streams) < 2 or not all(isinstance(s, dict) for s in streams):
+        raise RequestError("'streams' must be a list of at least two objects")
+    default_pressure = _pressure(body)
+    if isinstance(default_pressure, np.ndarray):
+        raise RequestError("'pressure' must be a number")
+    inputs = []
+    for s in streams:
+        pressure = _pressure(s) if ('pressure' in s or 'elevation' in s) else default_pressure
+        if isinstance(pressure, np.ndarray):
+            raise RequestError("'pressure' must be a number")
+        # Dry air mass ratios; only their proportions matter
+        ratio = _number(s.get('ratio', 1.0), 'ratio')
+        if not (ratio > 0 and math.isfinite(ratio)):
+            raise RequestError("'ratio' must be a positive number")
+        inputs.append((
+            _number(_required(s, 'dry_bulb'), 'dry_bulb'),
+            _number(_required(s, 'rel_hum'), 'rel_hum'),
+            pressure,
+            ratio,
+        ))
+    row = await request.app.state.mix_batcher.solve(len(inputs), *(value for values in inputs for value in values))
+    return JSONResponse(row)
+
+
+async def health(request):
+    batchers = {'state': request.app.state.state_batcher, 'mix': request.app.state.mix_batcher}
+    return JSONResponse({
+        'status': 'ok',
+        'batched': {name: {'requests': b.requests, 'batches': b.batches} for name, b in batchers.items()},
+    })
+
+
+def create_app(workers=None):
+    """Starlette app with its process pool started and stopped with the server."""
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.executor = ProcessPoolExecutor(max_workers=workers or default_workers())
+        app.state.state_batcher = RequestBatcher(app.state.executor, _solve_states)
+        app.state.mix_batcher = RequestBatcher(app.state.executor, _solve_mixes)
+        try:
+            yield
+        finally:
+            app.state.executor.shutdown(cancel_futures=True)
+
+    return Starlette(
+        routes=[
+            Route('/state', _handler(state), methods=['POST']),
+            Route('/batch', _handler(batch), methods=['POST']),
+            Route('/mix', _handler(mixing), methods=['POST']),
+            Route('/health', health, methods=['GET']),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="HTTP API for psychrometric state calculations.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--workers', type=int, default=0, help="solver processes (0 = every CPU)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    uvicorn.run(create_app(args.workers), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Load test of the HTTP API: p50/p99 latency and requests per second.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_api [--concurrency 64] [--requests 5000] [--workers 4]
+
+Starts api_server on a free local port, then keeps --concurrency keep-alive
+connections busy with each request type in turn: single states (batched by
+the server), 1000-state batches, mixes, and one large streamed batch.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = '127.0.0.1'
+BATCH_STATES = 1000
+STREAM_STATES = 500_000
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+class Connection:
+    # Minimal HTTP/1.1 keep-alive client, enough for the API's responses
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, port):
+        return cls(*await asyncio.open_connection(HOST, port))
+
+    async def request(self, method, path, body=None):
+        data = b'' if body is None else json.dumps(body).encode()
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) != b'\r\n':
+            key, _, value = line.decode().partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            return status, await self.reader.readexactly(int(headers['content-length']))
+        # Chunked (streamed) response
+        chunks = []
+        while size := int((await self.reader.readline()).strip(), 16):
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+        await self.reader.readline()
+        return status, b''.join(chunks)
+
+    def close(self):
+        self.writer.close()
+
+
+def _bodies(seed=0):
+    rng = np.random.default_rng(seed)
+    dry_bulb = rng.uniform(5, 45, BATCH_STATES).round(1).tolist()
+    rel_hum = rng.uniform(10, 90, BATCH_STATES).round(1).tolist()
+    return {
+        'state': lambda i: ('/state', {'dry_bulb': dry_bulb[i % BATCH_STATES], 'humidity': rel_hum[i % BATCH_STATES]}),
+        'batch': lambda i: ('/batch', {'dry_bulb': dry_bulb, 'humidity': rel_hum}),
+        'mix': lambda i: ('/mix', {'streams': [
+            {'dry_bulb': dry_bulb[i % BATCH_STATES], 'rel_hum': rel_hum[i % BATCH_STATES], 'ratio': 30},
+            {'dry_bulb': 24.0, 'rel_hum': 50.0, 'ratio': 70},
+        ]}),
+    }
+
+
+async def _load(port, make_request, requests, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        connection = await Connection.open(port)
+        try:
+            for i in counter:
+                path, body = make_request(i)
+                start = time.perf_counter()
+                status, _ = await connection.request('POST', path, body)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+async def _stream(port):
+    rng = np.random.default_rng(1)
+    body = {'dry_bulb': rng.uniform(5, 45, STREAM_STATES).round(1).tolist(),
+            'humidity': rng.uniform(10, 90, STREAM_STATES).round(1).tolist()}
+    connection = await Connection.open(port)
+    try:
+        start = time.perf_counter()
+        status, data = await connection.request('POST', '/batch?stream=1', body)
+        elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+    return status, data.count(b'\n'), elapsed
+
+
+async def _run(port, args):
+    print(f"{'request':<10}{'requests':>10}{'errors':>8}{'p50 (ms)':>10}{'p99 (ms)':>10}{'req/s':>10}{'states/s':>12}")
+    for name, make_request in _bodies().items():
+        requests = args.requests if name != 'batch' else max(args.requests // 20, args.concurrency)
+        latencies, errors, elapsed = await _load(port, make_request, requests, args.concurrency)
+        states = BATCH_STATES if name == 'batch' else 1
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+        print(f"{name:<10}{requests:>10,}{errors:>8}{p50:>10.1f}{p99:>10.1f}"
+              f"{requests / elapsed:>10,.0f}{requests * states / elapsed:>12,.0f}")
+    status, lines, elapsed = await _stream(port)
+    print(f"streamed batch: {lines:,} NDJSON lines in {elapsed:.2f} s (HTTP {status})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', type=int, default=64, help="open connections")
+    parser.add_argument('--requests', type=int, default=5000, help="requests per request type")
+    parser.add_argument('--workers', type=int, default=0, help="server solver processes (0 = every CPU)")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'api_server', '--port', str(port), '--workers', str(args.workers)], cwd=ROOT,
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection((HOST, port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(_run(port, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Peak memory and throughput of the streaming bulk calculator.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_bulk_calc
+
+Each file size is processed in a fresh interpreter so that the reported
+peak RSS belongs to that run only. Peak memory should stay roughly flat as
+the file grows.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROWS = (100_000, 1_000_000, 3_000_000)
+CHUNK_SIZE = 100_000
+
+_CHILD = """
+import resource, sys
+from bulk_calc import process_file
+rows = process_file(sys.argv[1], sys.argv[2], 'dry_bulb', 'rel_hum', pressure_col='pressure', chunk_size=int(sys.argv[3]))
+print(rows, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _write_input(path, n):
+    rng = np.random.default_rng(0)
+    for offset in range(0, n, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n - offset)
+        pd.DataFrame({
+            'dry_bulb': rng.uniform(-10.0, 45.0, size).round(1),
+            'rel_hum': rng.uniform(5.0, 100.0, size).round(1),
+            'pressure': rng.uniform(95.0, 102.0, size).round(3),
+        }).to_csv(path, mode='w' if offset == 0 else 'a', header=offset == 0, index=False)
+
+
+def main():
+    print(f"{'rows':>12}{'file (MB)':>12}{'time (s)':>12}{'rows/s':>12}{'peak RSS (MB)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in ROWS:
+            src = os.path.join(tmp, f"in_{n}.csv")
+            dst = os.path.join(tmp, f"out_{n}.csv")
+            _write_input(src, n)
+            start = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, '-c', _CHILD, src, dst, str(CHUNK_SIZE)],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            elapsed = time.perf_counter() - start
+            rows, peak_kb = int(out[0]), int(out[1])
+            size_mb = os.path.getsize(src) / 1e6
+            print(f"{rows:>12,}{size_mb:>12.1f}{elapsed:>12.2f}{rows / elapsed:>12,.0f}{peak_kb / 1024:>16.0f}")
+            os.remove(src)
+            os.remove(dst)
+
+
+if __name__ == '__main__':
+    main()
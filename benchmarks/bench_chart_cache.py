@@ -0,0 +1,57 @@
+"""Cold vs warm timing of the base chart cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chart_cache
+"""
+import time
+
+from chart_cache import ChartCache, render_base_chart
+
+REPEATS = 10
+
+
+def _points(n):
+    points = {}
+    for i in range(n):
+        points[f"Point_{i + 1}"] = {
+            'label': f"Point_{i + 1}",
+            'style': {'color': [0.2, 0.4, 0.8, 0.8], 'marker': 'o', 'markersize': 15},
+            'xy': (15 + i % 20, 30 + i % 50)
+        }
+    return points
+
+
+def _time(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main():
+    points = _points(5)
+
+    def cold():
+        chart = render_base_chart('ashrae')
+        chart.plot_points_dbt_rh(points)
+
+    cache = ChartCache()
+    cache.get('ashrae')  # prime
+
+    def warm():
+        chart = cache.get('ashrae')
+        chart.plot_points_dbt_rh(points)
+
+    cold_best, cold_mean = _time(cold)
+    warm_best, warm_mean = _time(warm)
+    print(f"{'case':<8}{'best (ms)':>12}{'mean (ms)':>12}")
+    print(f"{'cold':<8}{cold_best * 1e3:>12.1f}{cold_mean * 1e3:>12.1f}")
+    print(f"{'warm':<8}{warm_best * 1e3:>12.1f}{warm_mean * 1e3:>12.1f}")
+    print(f"speedup: {cold_mean / warm_mean:.1f}x (hits={cache.hits}, misses={cache.misses})")
+
+
+if __name__ == '__main__':
+    main()
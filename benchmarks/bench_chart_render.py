@@ -0,0 +1,83 @@
+"""Chart render time for large point sets, per rendering mode.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chart_render [points]
+
+Draws the points the way the app does above DENSE_POINT_THRESHOLD (a few
+named points as markers plus one aggregated layer) and saves a PNG like
+st.pyplot. One marker per point through plot_points_dbt_rh is timed at a
+few hundred points for comparison, and hexbin again with every point
+renamed, as after an import of named sensor readings.
+"""
+import io
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from chart_cache import get_base_chart
+from chart_overlays import DENSE_MODES, plot_point_cloud, points_to_chart_xy, split_named_points
+
+DEFAULT_POINTS = 100_000
+MARKER_POINTS = 300
+NAMED_POINTS = 5
+PRESSURE = 101.325
+
+
+def _points(n, seed=0, renamed=NAMED_POINTS):
+    rng = np.random.default_rng(seed)
+    dry_bulb = rng.uniform(5, 45, n).round(1)
+    rel_hum = rng.uniform(10, 90, n).round(1)
+    points = [
+        {'name': f"Point_{i + 1}", 'type': 'input', 'dry_bulb': db, 'rel_hum': rh,
+         'color': '#1f77b4', 'connects_to': None, 'pressure': PRESSURE}
+        for i, (db, rh) in enumerate(zip(dry_bulb.tolist(), rel_hum.tolist()))
+    ]
+    for i in range(min(renamed, n)):
+        points[i]['name'] = f"Zone {i + 1}"
+    return points
+
+
+def _markers(chart, points):
+    chart.plot_points_dbt_rh({
+        p['name']: {'label': p['name'], 'style': {'color': p['color'], 'marker': 'o', 'markersize': 15},
+                    'xy': (p['dry_bulb'], p['rel_hum'])}
+        for p in points
+    })
+    chart.plot_legend(markerscale=.7, frameon=False, fontsize=10, labelspacing=1.2)
+
+
+def _render(points, mode=None):
+    start = time.perf_counter()
+    chart = get_base_chart('ashrae')
+    if mode is None:
+        _markers(chart, points)
+    else:
+        named, others = split_named_points(points)
+        dry_bulb, hum_ratio = points_to_chart_xy(others, PRESSURE)
+        plot_point_cloud(chart.axes, dry_bulb, hum_ratio, mode, [p['color'] for p in others])
+        _markers(chart, named)
+    chart.axes.figure.savefig(io.BytesIO(), format='png', bbox_inches='tight')
+    plt.close(chart.axes.figure)
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS
+    # Warm the base chart cache
+    get_base_chart('ashrae')
+    print(f"{'mode':<12}{'points':>10}{'time (s)':>10}")
+    print(f"{'markers':<12}{MARKER_POINTS:>10,}{_render(_points(MARKER_POINTS)):>10.2f}")
+    points = _points(n)
+    for mode in DENSE_MODES:
+        print(f"{mode:<12}{n:>10,}{_render(points, mode):>10.2f}")
+    print(f"{'all renamed':<12}{n:>10,}{_render(_points(n, renamed=n), DENSE_MODES[0]):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
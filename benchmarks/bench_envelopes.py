@@ -0,0 +1,60 @@
+"""Envelope classification time for bulk state queries: grid index against brute force.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_envelopes [states]
+
+Classifies random states (the chart's range) against every preset
+envelope, both with each envelope's grid index and with a point-in-polygon
+test of every state, and checks that the two agree.
+"""
+import sys
+import time
+
+import numpy as np
+
+import envelopes
+
+DEFAULT_STATES = 500_000
+REPEATS = 3
+
+
+def _best(run):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_STATES
+    rng = np.random.default_rng(0)
+    dry_bulb = rng.uniform(0, 50, n)
+    hum_ratio = rng.uniform(0, 30, n)
+
+    start = time.perf_counter()
+    shapes = envelopes.preset_envelopes()
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for envelope in shapes:
+        envelope.grid
+    gridding = time.perf_counter() - start
+
+    indexing, inside = _best(lambda: [envelope.contains(dry_bulb, hum_ratio) for envelope in shapes])
+    brute, expected = _best(lambda: [envelopes.inside_polygon(envelope.dry_bulb, envelope.hum_ratio, dry_bulb, hum_ratio)
+                                     for envelope in shapes])
+    print(f"{n:,} states x {len(shapes)} envelopes")
+    print(f"{'build envelopes':<20}{built * 1e3:>9.1f} ms")
+    print(f"{'build grids':<20}{gridding * 1e3:>9.1f} ms")
+    print(f"{'grid index':<20}{indexing * 1e3:>9.1f} ms")
+    print(f"{'brute force':<20}{brute * 1e3:>9.1f} ms{brute / indexing:>9.1f}x")
+    mismatches = sum(int(np.count_nonzero(a != b)) for a, b in zip(inside, expected))
+    print(f"{mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
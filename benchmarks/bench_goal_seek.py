@@ -0,0 +1,126 @@
+"""Batched goal-seek solving against one target at a time.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_goal_seek [targets]
+
+Solves each goal_seek problem for all targets in one call and for a sample
+of them one call per target, and checks the answers: mixes are re-run with
+process_chain.mix, enthalpy/RH states against psychrolib. Errors are in
+the target's units: °C for the mix, RH (0 to 1) for the coils and J/kg for
+the enthalpy/RH states.
+
+Also counts find_root's function evaluations on x^3 - 2 over [0, 5] and
+fails if it converges no faster than bisection would.
+"""
+import sys
+import time
+
+import numpy as np
+import psychrolib as psy
+
+import goal_seek as gs
+import psychro_engine as engine
+from process_chain import AirStream, cooling_coil, mix
+
+DEFAULT_TARGETS = 10_000
+# Targets solved one call at a time; the per-target time is scaled up
+LOOP_TARGETS = 200
+PRESSURE = 101325.0
+# Evaluations find_root may take on x^3 - 2 over [0, 5] to 1e-10; Illinois
+# takes 16, bisection 39
+MAX_CUBIC_EVALUATIONS = 20
+
+
+def _problems(n, seed=0):
+    # name -> (solve(rows), check(rows, answer) -> max error)
+    rng = np.random.default_rng(seed)
+    outdoor = AirStream.from_input(rng.uniform(28, 38, n), rng.uniform(0.3, 0.7, n), PRESSURE)
+    return_air = AirStream.from_input(24.0, 0.5, PRESSURE)
+    mix_db = rng.uniform(24.5, 28, n)
+    coil_rh = rng.uniform(0.92, 0.98, n)
+    enthalpy = rng.uniform(10e3, 90e3, n)
+    rel_hum = rng.uniform(0.1, 1.0, n)
+
+    def stream(rows):
+        return outdoor._replace(dry_bulb=outdoor.dry_bulb[rows], hum_ratio=outdoor.hum_ratio[rows])
+
+    def check_mix(rows, fraction):
+        mixed = mix(stream(rows)._replace(mass_flow=fraction), return_air._replace(mass_flow=1 - fraction))
+        return np.nanmax(np.abs(mixed.dry_bulb - mix_db[rows]))
+
+    def check_coil(rows, adp):
+        # Unsolved targets (NaN) would pass through the coil unchanged
+        solved = np.isfinite(adp)
+        leaving = cooling_coil(stream(rows[solved]), adp[solved], 0.1)
+        rel_hum_out = engine.rel_hum_from_hum_ratio(leaving.dry_bulb, leaving.hum_ratio, PRESSURE)
+        return np.max(np.abs(rel_hum_out - coil_rh[rows[solved]]), initial=0.0)
+
+    def check_state(rows, states):
+        psy.SetUnitSystem(psy.SI)
+        errors = [
+            abs(psy.GetMoistAirEnthalpy(t, psy.GetHumRatioFromRelHum(t, rh, PRESSURE)) - h)
+            for t, rh, h in zip(np.atleast_1d(states['dry_bulb']), rel_hum[rows], enthalpy[rows])
+            if np.isfinite(t)
+        ]
+        return max(errors, default=0.0)
+
+    return {
+        'mixing fraction (dry bulb)': (
+            lambda rows: gs.mixing_fraction(stream(rows), return_air, mix_db[rows]), check_mix),
+        'coil ADP (RH)': (
+            lambda rows: gs.coil_adp_for_rel_hum(stream(rows), coil_rh[rows], 0.1), check_coil),
+        'sensible dry bulb (RH)': (
+            lambda rows: gs.leaving_dry_bulb_for_rel_hum(stream(rows), rel_hum[rows]),
+            lambda rows, t: np.nanmax(np.abs(
+                engine.rel_hum_from_hum_ratio(t, outdoor.hum_ratio[rows], PRESSURE) - rel_hum[rows]))),
+        'state (enthalpy, RH)': (
+            lambda rows: gs.state_from_enthalpy_rel_hum(enthalpy[rows], rel_hum[rows], PRESSURE), check_state),
+    }
+
+
+def _cubic_evaluations():
+    count = 0
+
+    def cubic(x, rows):
+        nonlocal count
+        count += 1
+        return x ** 3 - 2
+
+    root = gs.find_root(cubic, np.array([0.0]), np.array([5.0]), 1e-10)
+    return count, abs(root[0] - 2 ** (1 / 3))
+
+
+def _solved(answer):
+    values = answer['dry_bulb'] if isinstance(answer, dict) else answer
+    return int(np.count_nonzero(np.isfinite(values)))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TARGETS
+    rows = np.arange(n)
+    print(f"{n:,} targets")
+    print(f"{'problem':<28}{'batched (ms)':>14}{'looped (ms)':>13}{'speedup':>9}{'solved':>8}{'max error':>11}")
+    for name, (solve, check) in _problems(n).items():
+        start = time.perf_counter()
+        answer = solve(rows)
+        batched = time.perf_counter() - start
+
+        sample = rows[:min(LOOP_TARGETS, n)]
+        start = time.perf_counter()
+        for i in sample:
+            solve(i)
+        looped = (time.perf_counter() - start) * n / len(sample)
+
+        error = check(rows, answer)
+        print(f"{name:<28}{batched * 1e3:>14.1f}{looped * 1e3:>13.0f}{looped / batched:>8.0f}x"
+              f"{_solved(answer):>8}{error:>11.1e}")
+
+    evaluations, error = _cubic_evaluations()
+    print(f"find_root on x^3 - 2: {evaluations} evaluations (at most {MAX_CUBIC_EVALUATIONS}), error {error:.1e}")
+    if evaluations > MAX_CUBIC_EVALUATIONS or error > 1e-9:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Scaling of the process-pool batch solver with worker count.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel_calc [rows]
+
+Reports speedup over one worker at 1, 2, 4, 8 and all available CPUs, and
+checks that the parallel output matches the serial one row for row.
+"""
+import sys
+import time
+
+import numpy as np
+
+import psychro_engine as engine
+from parallel_calc import default_workers, make_executor, solve_batch_parallel
+from psychro_calc import solve_batch
+
+DEFAULT_ROWS = 2_000_000
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    rng = np.random.default_rng(0)
+    dry_bulb = rng.uniform(-10.0, 45.0, n)
+    rel_hum = rng.uniform(5.0, 100.0, n)
+    pressure = rng.uniform(95.0, 102.0, n)
+
+    start = time.perf_counter()
+    expected = solve_batch(dry_bulb, engine.REL_HUM, rel_hum, pressure)
+    serial = time.perf_counter() - start
+
+    cpus = default_workers()
+    counts = sorted(set(WORKER_COUNTS) | {cpus})
+    print(f"{n:,} rows, {cpus} CPUs available")
+    print(f"{'workers':>8}{'time (s)':>12}{'rows/s':>14}{'speedup':>10}")
+    for workers in counts:
+        with make_executor(workers) as executor:
+            # Start the worker processes before timing
+            list(executor.map(abs, range(workers)))
+            start = time.perf_counter()
+            result = solve_batch_parallel(dry_bulb, engine.REL_HUM, rel_hum, pressure, workers, executor)
+            elapsed = time.perf_counter() - start
+        for key, values in expected.items():
+            np.testing.assert_array_equal(result[key], values)
+        print(f"{workers:>8}{elapsed:>12.2f}{n / elapsed:>14,.0f}{serial / elapsed:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Export and import time, file size and peak import memory per points file format.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_point_io [points]
+
+Compares the streamed, checked import of each export format with the app's
+previous import (json.loads of the whole upload, then the point store),
+and checks that every format reads back the exported points.
+"""
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from point_io import EXPORT_FORMATS, export_formats, export_points, read_points
+from point_store import PointStore
+
+DEFAULT_POINTS = 100_000
+POINT_COUNTER = 12_345
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    points = [{
+        'name': f"Point_{i + 1}",
+        'type': 'input',
+        'dry_bulb': round(float(rng.uniform(5, 45)), 1),
+        'rel_hum': round(float(rng.uniform(10, 90)), 1),
+        'wet_bulb': round(float(rng.uniform(5, 30)), 1),
+        'color': '#1f77b4',
+        'connects_to': None,
+        'pressure': 101.325,
+    } for i in range(n)]
+    points.append({
+        'name': 'Mixed', 'type': 'mixed', 'source1': 'Point_1', 'source2': 'Point_2',
+        'ratio1': 30.0, 'ratio2': 70.0, 'color': '#ff7f0e', 'connects_to': None,
+    })
+    return PointStore(points).points
+
+
+def _measure(read):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = read()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _upload(data, extension):
+    # Like a Streamlit upload: an in-memory binary file with a name
+    upload = io.BytesIO(data)
+    upload.name = f"points{extension}"
+    return upload
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS
+    points = _points(n)
+    print(f"{len(points):,} points")
+    print(f"{'format':<16}{'size (MB)':>10}{'export (s)':>12}{'import (s)':>12}{'peak (MB)':>11}")
+
+    legacy = export_points(points, POINT_COUNTER, 'JSON')
+
+    def old_import():
+        data = json.loads(_upload(legacy, '.json').getvalue().decode('utf-8'))
+        return PointStore(data['points_data']).points
+
+    imported, elapsed, peak = _measure(old_import)
+    assert imported == points
+    print(f"{'json.loads (old)':<16}{len(legacy) / 1e6:>10.1f}{'':>12}{elapsed:>12.2f}{peak / 1e6:>11.0f}")
+
+    for fmt in export_formats():
+        extension = EXPORT_FORMATS[fmt][0]
+        start = time.perf_counter()
+        data = export_points(points, POINT_COUNTER, fmt)
+        export_time = time.perf_counter() - start
+        (imported, counter), elapsed, peak = _measure(lambda: read_points(_upload(data, extension)))
+        assert imported == points and counter == POINT_COUNTER, fmt
+        print(f"{fmt:<16}{len(data) / 1e6:>10.1f}{export_time:>12.2f}{elapsed:>12.2f}{peak / 1e6:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Per-session memory, export time and lookups of the point store at 10k points.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_point_store [points]
+
+Compares the compact Point records with the plain dicts the app stored
+before, and checks that the JSON export is unchanged.
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from point_store import Point, PointStore
+
+DEFAULT_POINTS = 10_000
+COLOURS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+
+
+def _dicts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    points = []
+    for i in range(n):
+        points.append({
+            'name': f"Point_{i + 1}",
+            'type': 'input',
+            'dry_bulb': round(float(rng.uniform(5, 45)), 1),
+            'rel_hum': round(float(rng.uniform(10, 90)), 1),
+            'wet_bulb': round(float(rng.uniform(5, 30)), 1),
+            # Colour strings decoded from JSON are separate objects per point
+            'color': ''.join(COLOURS[i % len(COLOURS)]),
+            'connects_to': None if i == 0 else f"Point_{i}",
+            'pressure': 101.325,
+        })
+    return points
+
+
+def _traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _time(run, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS
+    source = json.dumps({'points_data': _dicts(n)})
+
+    dicts, dict_bytes = _traced(lambda: json.loads(source)['points_data'])
+    store, store_bytes = _traced(lambda: PointStore(json.loads(source)['points_data']))
+    print(f"{n:,} points")
+    print(f"{'':<24}{'dicts':>12}{'records':>12}")
+    print(f"{'memory (MB)':<24}{dict_bytes / 1e6:>12.2f}{store_bytes / 1e6:>12.2f}")
+
+    dict_export, exported = _time(lambda: json.dumps({'points_data': dicts}, indent=2))
+    store_export, store_exported = _time(lambda: json.dumps({'points_data': store.to_records()}, indent=2))
+    print(f"{'export (ms)':<24}{dict_export * 1e3:>12.1f}{store_export * 1e3:>12.1f}")
+    if exported != store_exported:
+        print("export differs from the dict format")
+        sys.exit(1)
+
+    names = [f"Point_{i + 1}" for i in range(0, n, max(n // 100, 1))]
+    dict_lookup, _ = _time(lambda: [next(p for p in dicts if p['name'] == name) for name in names])
+    store_lookup, _ = _time(lambda: [store.get(name) for name in names])
+    print(f"{'100 lookups (ms)':<24}{dict_lookup * 1e3:>12.2f}{store_lookup * 1e3:>12.3f}")
+
+    dict_column, _ = _time(lambda: np.array([p['dry_bulb'] for p in dicts]))
+    store_column, _ = _time(lambda: store.column('dry_bulb'))
+    print(f"{'dry bulb column (ms)':<24}{dict_column * 1e3:>12.2f}{store_column * 1e3:>12.2f}")
+
+    assert all(isinstance(p, Point) for p in store)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Annual (8760-hour) AHU simulation with process_chain.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_process_chain
+
+Times one year of hourly states through an AHU chain (economizer mixing,
+cooling coil, heating coil, steam humidifier) and a long chain of thousands
+of steps, and checks that the step loads add up to the overall enthalpy
+change.
+"""
+import sys
+import time
+
+import numpy as np
+
+import process_chain as pc
+
+HOURS = 8760
+PRESSURE = 101325.0
+SUPPLY_MASS_FLOW = 5.0  # kg/s
+LONG_CHAIN_STEPS = 2_000
+REPEATS = 20
+
+
+def _weather(seed=0):
+    # Synthetic hourly outdoor air: seasonal and daily swings plus noise
+    rng = np.random.default_rng(seed)
+    hour = np.arange(HOURS)
+    dry_bulb = 12 - 12 * np.cos(2 * np.pi * hour / HOURS) + 5 * np.sin(2 * np.pi * hour / 24) + rng.normal(0, 2, HOURS)
+    rel_hum = np.clip(0.65 - 0.2 * np.sin(2 * np.pi * hour / 24) + rng.normal(0, 0.1, HOURS), 0.05, 1.0)
+    return pc.AirStream.from_input(dry_bulb, rel_hum, PRESSURE, SUPPLY_MASS_FLOW)
+
+
+def _ahu(outdoor):
+    return_air = pc.AirStream.from_input(24.0, 0.5, PRESSURE)
+    # Economizer: full outdoor air between 12 and 20 °C, 20% minimum otherwise
+    return_fraction = np.where((outdoor.dry_bulb > 12) & (outdoor.dry_bulb < 20), 0.0, 0.8)
+    return (
+        pc.ProcessChain()
+        .add('mixing', pc.mix_with, other=return_air, fraction=return_fraction)
+        .add('cooling coil', pc.cooling_coil, apparatus_dew_point=10.0, bypass_factor=0.1)
+        .add('heating coil', pc.heating_coil, setpoint=14.0)
+        .add('humidifier', pc.steam_humidifier, hum_ratio=0.005)
+    )
+
+
+def _time(run):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    outdoor = _weather()
+    chain = _ahu(outdoor)
+    elapsed, steps = _time(lambda: chain.run(outdoor))
+    print(f"annual AHU ({HOURS} h x {len(chain)} steps): {elapsed * 1e3:.2f} ms")
+    for step in steps:
+        print(f"  {step.name:<14}{np.sum(step.load) / 1e6:>12.1f} MWh")
+
+    long_chain = pc.ProcessChain()
+    for i in range(LONG_CHAIN_STEPS // 2):
+        long_chain.add(f'heat {i}', pc.sensible, dry_bulb=20.0)
+        long_chain.add(f'coil {i}', pc.cooling_coil, apparatus_dew_point=8.0, bypass_factor=0.2)
+    elapsed, _ = _time(lambda: long_chain.run(outdoor))
+    print(f"{LONG_CHAIN_STEPS} steps x {HOURS} h: {elapsed * 1e3:.1f} ms")
+
+    # Loads of the steps must add up to the change between inlet and outlet
+    # (plus what the mixed-in return air brings)
+    leaving = steps[-1].stream
+    total = leaving.mass_flow * leaving.enthalpy - outdoor.mass_flow * outdoor.enthalpy
+    imbalance = np.max(np.abs(sum(step.load for step in steps) - total))
+    print(f"energy balance error {imbalance:.2e} W")
+    if imbalance > 1e-6 * SUPPLY_MASS_FLOW * 1e5:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
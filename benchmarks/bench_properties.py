@@ -0,0 +1,60 @@
+"""Properties table cost per rerun for many plotted points.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_properties [points]
+
+Compares building one properties table per point (what every rerun did with
+all panels collapsed), the memoized per-point values on a repeat rerun, and
+the single vectorized summary table.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import psychro_engine as engine
+from psychro_calc import PROPERTY_ROWS, point_properties, solve_batch
+
+DEFAULT_POINTS = 500
+PRESSURE = 101.325
+
+
+def _states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(5, 45, n).round(1), rng.uniform(10, 90, n).round(1)
+
+
+def _tables(dry_bulb, rel_hum):
+    for db, rh in zip(dry_bulb.tolist(), rel_hum.tolist()):
+        pd.DataFrame({
+            "Property": [label for label, _ in PROPERTY_ROWS],
+            "Value": point_properties(db, rh, PRESSURE),
+            "Units": [units for _, units in PROPERTY_ROWS],
+        })
+
+
+def _summary(dry_bulb, rel_hum):
+    states = solve_batch(dry_bulb, engine.REL_HUM, rel_hum, PRESSURE)
+    return pd.DataFrame({'dry_bulb': dry_bulb, **states})
+
+
+def _time(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS
+    dry_bulb, rel_hum = _states(n)
+    point_properties.clear()
+    print(f"{n:,} points")
+    print(f"{'per-point tables, cold (ms)':<34}{_time(lambda: _tables(dry_bulb, rel_hum)) * 1e3:>10.1f}")
+    print(f"{'per-point tables, memoized (ms)':<34}{_time(lambda: _tables(dry_bulb, rel_hum)) * 1e3:>10.1f}")
+    print(f"{'summary table (ms)':<34}{_time(lambda: _summary(dry_bulb, rel_hum)) * 1e3:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
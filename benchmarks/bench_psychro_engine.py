@@ -0,0 +1,100 @@
+"""Throughput of the vectorized property engine vs scalar psychrolib.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_psychro_engine
+
+Also checks a random sample of states against psychrolib and reports the
+largest deviation per property.
+"""
+import sys
+import time
+
+import numpy as np
+import psychrolib as psy
+
+import psychro_engine as engine
+
+SIZES = (1_000, 100_000, 10_000_000)
+# Large runs are solved in chunks to keep peak memory bounded
+CHUNK_SIZE = 1_000_000
+# Number of states run through scalar psychrolib
+SCALAR_SAMPLE = 1_000
+
+
+def _random_states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    dry_bulb = rng.uniform(-20.0, 50.0, n)
+    rel_hum = rng.uniform(0.05, 1.0, n)
+    pressure = rng.uniform(80_000.0, 105_000.0, n)
+    return dry_bulb, rel_hum, pressure
+
+
+def _psychrolib_states(dry_bulb, rel_hum, pressure):
+    rows = []
+    for db, rh, p in zip(dry_bulb, rel_hum, pressure):
+        hr = psy.GetHumRatioFromRelHum(db, rh, p)
+        rows.append({
+            'hum_ratio': hr,
+            'wet_bulb': psy.GetTWetBulbFromRelHum(db, rh, p),
+            'dew_point': psy.GetTDewPointFromRelHum(db, rh),
+            'enthalpy': psy.GetMoistAirEnthalpy(db, hr),
+            'volume': psy.GetMoistAirVolume(db, hr, p),
+            'density': psy.GetMoistAirDensity(db, hr, p),
+            'degree_of_saturation': psy.GetDegreeOfSaturation(db, hr, p),
+            'vap_pres': psy.GetVapPresFromHumRatio(hr, p),
+            'sat_vap_pres': psy.GetSatVapPres(db),
+        })
+    return rows
+
+
+def check_accuracy():
+    states = _random_states(SCALAR_SAMPLE, seed=1)
+    result = engine.solve_states(*states)
+    reference = _psychrolib_states(*states)
+    ok = True
+    print(f"{'property':<22}{'max deviation':>16}")
+    for key in reference[0]:
+        ref = np.array([row[key] for row in reference])
+        if key in ('wet_bulb', 'dew_point'):
+            dev = np.max(np.abs(result[key] - ref))
+            limit = engine.TEMPERATURE_TOLERANCE
+            unit = '°C'
+        else:
+            dev = np.max(np.abs(result[key] - ref) / np.abs(ref))
+            limit = 1e-9
+            unit = 'rel'
+        ok &= dev <= limit
+        print(f"{key:<22}{dev:>12.2e} {unit}")
+    return ok
+
+
+def main():
+    psy.SetUnitSystem(psy.SI)
+    ok = check_accuracy()
+    print()
+
+    states = _random_states(SCALAR_SAMPLE)
+    start = time.perf_counter()
+    _psychrolib_states(*states)
+    scalar_rate = SCALAR_SAMPLE / (time.perf_counter() - start)
+
+    print(f"{'states':>12}{'time (s)':>12}{'states/s':>14}{'vs psychrolib':>16}")
+    print(f"{'psychrolib':>12}{SCALAR_SAMPLE / scalar_rate:>12.3f}{scalar_rate:>14,.0f}{'1.0x':>16}")
+    for n in SIZES:
+        elapsed = 0.0
+        for offset in range(0, n, CHUNK_SIZE):
+            chunk = _random_states(min(CHUNK_SIZE, n - offset), seed=offset)
+            start = time.perf_counter()
+            engine.solve_states(*chunk)
+            elapsed += time.perf_counter() - start
+        rate = n / elapsed
+        print(f"{n:>12,}{elapsed:>12.3f}{rate:>14,.0f}{rate / scalar_rate:>15.0f}x")
+
+    if not ok:
+        print("accuracy check FAILED")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Fast table lookups vs exact solving at a fixed pressure.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_psychro_tables
+
+Reports table build and disk load times, throughput of table lookups vs the
+exact vectorized solver, and the largest deviation from psychrolib.
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import psychrolib as psy
+
+import psychro_engine as engine
+import psychro_tables
+
+PRESSURE = 101325.0
+ROWS = 1_000_000
+# States checked one by one against psychrolib
+SCALAR_SAMPLE = 2_000
+
+
+def _states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(psychro_tables.DRY_BULB_MIN, psychro_tables.DRY_BULB_MAX, n), rng.uniform(0.0, 1.0, n)
+
+
+def _max_error_vs_psychrolib():
+    dry_bulb, rel_hum = _states(SCALAR_SAMPLE, seed=1)
+    fast = psychro_tables.solve_states(dry_bulb, rel_hum, PRESSURE)
+    worst = {'dew_point': 0.0, 'wet_bulb': 0.0}
+    for i, (db, rh) in enumerate(zip(dry_bulb, rel_hum)):
+        try:
+            reference = {
+                'dew_point': psy.GetTDewPointFromRelHum(db, rh),
+                'wet_bulb': psy.GetTWetBulbFromRelHum(db, rh, PRESSURE),
+            }
+        except ValueError:
+            # Outside psychrolib's range of validity
+            continue
+        for key, value in reference.items():
+            worst[key] = max(worst[key], abs(fast[key][i] - value))
+    return worst
+
+
+def main():
+    psy.SetUnitSystem(psy.SI)
+    with tempfile.TemporaryDirectory() as tmp:
+        psychro_tables.TABLE_DIR = tmp
+        start = time.perf_counter()
+        table = psychro_tables.get_table(PRESSURE)
+        build = time.perf_counter() - start
+        psychro_tables._load_or_build.cache_clear()
+        start = time.perf_counter()
+        psychro_tables.get_table(PRESSURE)
+        load = time.perf_counter() - start
+    print(f"table build {build:.2f} s, load from disk {load * 1e3:.0f} ms, "
+          f"{table.exact_cells.mean():.1%} of cells solved exactly")
+
+    dry_bulb, rel_hum = _states(ROWS)
+    start = time.perf_counter()
+    exact = engine.solve_states(dry_bulb, rel_hum, PRESSURE)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = psychro_tables.solve_states(dry_bulb, rel_hum, PRESSURE)
+    fast_time = time.perf_counter() - start
+    print(f"{'mode':<8}{'time (s)':>10}{'states/s':>14}")
+    print(f"{'exact':<8}{exact_time:>10.3f}{ROWS / exact_time:>14,.0f}")
+    print(f"{'table':<8}{fast_time:>10.3f}{ROWS / fast_time:>14,.0f}   {exact_time / fast_time:.1f}x")
+
+    ok = True
+    worst = _max_error_vs_psychrolib()
+    print(f"{'property':<12}{'vs engine':>12}{'vs psychrolib':>16}{'documented':>12}")
+    for key, limit in psychro_tables.MAX_ERROR.items():
+        vs_engine = np.nanmax(np.abs(fast[key] - exact[key]))
+        ok &= worst[key] <= limit and vs_engine <= limit
+        print(f"{key:<12}{vs_engine:>12.2e}{worst[key]:>16.2e}{limit:>12.0e}")
+    if not ok:
+        print("error above documented maximum")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Trend replay frame rate: blitted frames against re-rendering the chart per frame.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_replay [samples]
+
+Replays a day of 1-minute samples with a ring-buffered trail. Each frame is
+drawn by blitting, both without and with JPEG encoding. For comparison, a
+few frames are rendered the way a static chart is: a base chart copy, the
+trail plotted on it and a PNG export.
+"""
+import sys
+import time
+
+import numpy as np
+
+import replay
+from chart_cache import figure_to_image, get_base_chart
+
+DEFAULT_SAMPLES = 1440
+# Frames re-rendered in full (each takes most of a second)
+FULL_FRAMES = 3
+TARGET_FPS = 30
+
+
+def _trend(n):
+    minute = np.arange(n)
+    dry_bulb = 24 + 8 * np.sin(2 * np.pi * minute / 1440)
+    hum_ratio = 10 + 2 * np.cos(2 * np.pi * minute / 1440)
+    return replay.Trend(minute.astype(str), dry_bulb, hum_ratio)
+
+
+def _full_frame(trend, end):
+    import matplotlib.pyplot as plt
+    chart = get_base_chart()
+    lo = max(0, end - replay.TRAIL_LENGTH)
+    chart.axes.plot(trend.dry_bulb[lo:end], trend.hum_ratio[lo:end], color=replay.TRAIL_COLOR)
+    try:
+        return figure_to_image(chart.axes.figure)
+    finally:
+        plt.close(chart.axes.figure)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SAMPLES
+    trend = _trend(n)
+    get_base_chart()  # render the base chart once, outside the timings
+
+    start = time.perf_counter()
+    for end in range(1, FULL_FRAMES + 1):
+        _full_frame(trend, end)
+    full = (time.perf_counter() - start) / FULL_FRAMES
+
+    start = time.perf_counter()
+    renderer = replay.BlitRenderer(get_base_chart())
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for end in range(1, n + 1):
+        renderer.push(trend.dry_bulb[end - 1], trend.hum_ratio[end - 1])
+        renderer.draw(trend.time[end - 1])
+    drawn = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    frames = sum(1 for _ in replay.replay_frames(trend, renderer, fps=None))
+    encoded = (time.perf_counter() - start) / frames
+
+    print(f"{n:,} samples, trail of {replay.TRAIL_LENGTH}")
+    print(f"{'full re-render (PNG)':<24}{full * 1e3:>9.1f} ms/frame{1 / full:>9.1f} fps")
+    print(f"{'blit setup':<24}{setup * 1e3:>9.1f} ms")
+    print(f"{'blit (draw only)':<24}{drawn * 1e3:>9.2f} ms/frame{1 / drawn:>9.0f} fps")
+    print(f"{'blit + JPEG':<24}{encoded * 1e3:>9.2f} ms/frame{1 / encoded:>9.0f} fps")
+    if 1 / encoded < TARGET_FPS:
+        print(f"below {TARGET_FPS} fps")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Import time and cold start of the Streamlit app.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [repeats]
+
+Each measurement runs in a fresh interpreter, so nothing is cached between
+them: importing the app's own modules, the app's first script run (a new
+session in a new process, no points) and a rerun of the same session. The
+heavy plotting and table libraries loaded by each step are listed.
+"""
+import os
+import subprocess
+import sys
+
+DEFAULT_REPEATS = 3
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+HEAVY_MODULES = ('pandas', 'matplotlib', 'psychrochart', 'distinctipy')
+# Every module streamlit_app.py imports at the top
+APP_MODULES = ('psychro_engine', 'psychro_calc', 'point_store', 'point_io', 'process_chain', 'goal_seek', 'uncertainty',
+               'envelopes', 'chart_cache', 'chart_overlays', 'state_memo', 'timings')
+
+_IMPORTS = f"""
+import sys, time
+import numpy, psychrolib, streamlit
+start = time.perf_counter()
+import {', '.join(APP_MODULES)}
+print(time.perf_counter() - start)
+print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+_COLD_START = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({APP!r}, default_timeout=120).run()
+first = time.perf_counter() - start
+loaded = ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules)
+start = time.perf_counter()
+at.run()
+print(first)
+print(loaded)
+print(time.perf_counter() - start)
+"""
+
+
+def _run(code):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(APP))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return out.stdout.split('\n')
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+    imports = [_run(_IMPORTS) for _ in range(repeats)]
+    starts = [_run(_COLD_START) for _ in range(repeats)]
+    print(f"{'step':<24}{'best (s)':>10}  heavy modules loaded")
+    print(f"{'import app modules':<24}{min(float(r[0]) for r in imports):>10.3f}  {imports[0][1] or '-'}")
+    print(f"{'first run':<24}{min(float(r[0]) for r in starts):>10.3f}  {starts[0][1] or '-'}")
+    print(f"{'rerun':<24}{min(float(r[2]) for r in starts):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
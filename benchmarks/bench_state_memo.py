@@ -0,0 +1,67 @@
+"""Psychrolib time with and without the shared state memo under simulated sessions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_state_memo [sessions] [reruns]
+
+Each session thread reruns the app's per-rerun state solving (the add form
+state plus the properties of a few open panels) on widget-rounded inputs
+drawn from a shared pool of states, first calling the functions directly,
+then through the memo.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import psychro_engine as engine
+from psychro_calc import point_properties, solve_state
+from state_memo import clear_memos, memo_stats
+
+DEFAULT_SESSIONS = 20
+DEFAULT_RERUNS = 50
+POOL_STATES = 200
+OPEN_PANELS = 5
+PRESSURE = 101.325
+
+
+def _pool(seed=0):
+    rng = np.random.default_rng(seed)
+    # Inputs as the widgets produce them: 0.1 °C / 0.1 %RH steps
+    return list(zip(rng.uniform(5, 45, POOL_STATES).round(1).tolist(), rng.uniform(10, 90, POOL_STATES).round(1).tolist()))
+
+
+def _session(seed, reruns, pool, solve, properties):
+    rng = np.random.default_rng(seed)
+    for _ in range(reruns):
+        dry_bulb, rel_hum = pool[rng.integers(len(pool))]
+        solve(dry_bulb, engine.REL_HUM, rel_hum, PRESSURE)
+        for i in rng.integers(len(pool), size=OPEN_PANELS):
+            properties(*pool[i], PRESSURE)
+
+
+def _run(sessions, reruns, pool, solve, properties):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        for future in [executor.submit(_session, s, reruns, pool, solve, properties) for s in range(sessions)]:
+            future.result()
+    return time.perf_counter() - start
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SESSIONS
+    reruns = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RERUNS
+    pool = _pool()
+    clear_memos()
+    direct = _run(sessions, reruns, pool, solve_state.__wrapped__, point_properties.__wrapped__)
+    memoized = _run(sessions, reruns, pool, solve_state, point_properties)
+    print(f"{sessions} sessions x {reruns} reruns, {POOL_STATES} distinct states")
+    print(f"{'direct (s)':<16}{direct:>10.3f}")
+    print(f"{'memoized (s)':<16}{memoized:>10.3f}{direct / memoized:>9.1f}x")
+    for row in memo_stats():
+        print(f"  {row['Function']:<36}{row['Hits']:>8} hits{row['Misses']:>8} misses{row['Hit rate (%)']:>8}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Monte Carlo uncertainty propagation time for dozens of points.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_uncertainty [points] [samples]
+
+Times sampling and solving every point (plus mixes of pairs of them),
+the confidence intervals and the chart ellipses, and checks the intervals
+against np.quantile.
+"""
+import sys
+import time
+
+import numpy as np
+
+import uncertainty
+
+DEFAULT_POINTS = 40
+REPEATS = 3
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    points = [{
+        'name': f"Point_{i + 1}", 'type': 'input', 'pressure': 101.325,
+        'dry_bulb': float(rng.uniform(10, 35)), 'rel_hum': float(rng.uniform(20, 90)),
+    } for i in range(n)]
+    points.extend({
+        'name': f"Mixed_{i + 1}", 'type': 'mixed', 'source1': f"Point_{i + 1}", 'source2': f"Point_{i + 2}",
+        'ratio1': 30.0, 'ratio2': 70.0,
+    } for i in range(0, n - 1, 4))
+    return points
+
+
+def _best(run):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else uncertainty.DEFAULT_SAMPLES
+    points = _points(n)
+    uncertainty.sample_points(points[:2], 101.325, 10)  # warm up outside the timings
+
+    sampling, states = _best(lambda: uncertainty.sample_points(points, 101.325, samples))
+    summarizing, summary = _best(lambda: uncertainty.summarize(states))
+    drawing, _ = _best(lambda: uncertainty.ellipses(states))
+    print(f"{len(points)} points ({n} measured) x {samples:,} samples")
+    print(f"{'sample and solve':<20}{sampling * 1e3:>9.0f} ms")
+    print(f"{'intervals':<20}{summarizing * 1e3:>9.0f} ms")
+    print(f"{'ellipses':<20}{drawing * 1e3:>9.1f} ms")
+
+    expected = np.nanquantile(states['enthalpy'], [0.025, 0.975], axis=1)
+    error = np.nanmax(np.abs(np.stack(summary['enthalpy'][1:]) - expected))
+    width = np.nanmedian(summary['enthalpy'][2] - summary['enthalpy'][1])
+    print(f"median 95% enthalpy interval {width:.2f} kJ/kg, quantile error {error:.1e}")
+    if error > 1e-9:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
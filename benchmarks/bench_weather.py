@@ -0,0 +1,87 @@
+"""Weather file analysis time and memory for one and several years of hourly records.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_weather [years]
+
+Writes a synthetic EPW file (one year) and a CSV of several years, then
+reports the time to analyse each and the peak traced memory, which should
+stay flat as the number of years grows.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import weather
+
+HOURS = 8760
+DEFAULT_YEARS = 30
+EPW_HEADER = [
+    "LOCATION,Synthetic,,,TMY,000000,0.0,0.0,0,0",
+    "DESIGN CONDITIONS,0",
+    "TYPICAL/EXTREME PERIODS,0",
+    "GROUND TEMPERATURES,0",
+    "HOLIDAYS/DAYLIGHT SAVINGS,No,0,0,0",
+    "COMMENTS 1,",
+    "COMMENTS 2,",
+    "DATA PERIODS,1,1,Data,Sunday, 1/ 1,12/31",
+]
+
+
+def _records(years, seed=0):
+    rng = np.random.default_rng(seed)
+    hour = np.arange(HOURS * years)
+    dry_bulb = 15 - 10 * np.cos(2 * np.pi * hour / HOURS) + 5 * np.sin(2 * np.pi * hour / 24) + rng.normal(0, 2, hour.size)
+    dew_point = dry_bulb - rng.uniform(0.5, 12, hour.size)
+    return pd.DataFrame({
+        'dry_bulb': dry_bulb.round(1),
+        'dew_point': dew_point.round(1),
+        'pressure': rng.normal(101.3, 0.5, hour.size).round(2),
+    })
+
+
+def _write_epw(path, records):
+    # EPW data rows: date/time and source fields, then dry bulb, dew point, RH, pressure (Pa)
+    n = len(records)
+    rows = pd.DataFrame({
+        'year': 2001, 'month': 1, 'day': 1, 'hour': np.arange(n) % 24 + 1, 'minute': 60, 'source': '?9',
+        'dry_bulb': records['dry_bulb'], 'dew_point': records['dew_point'], 'rel_hum': 999,
+        'pressure': (records['pressure'] * 1000).round(),
+    })
+    with open(path, 'w') as f:
+        f.write("\n".join(EPW_HEADER) + "\n")
+    rows.to_csv(path, mode='a', header=False, index=False)
+
+
+def _measure(path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    bins = weather.analyse(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return bins, elapsed, peak
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_YEARS
+    with tempfile.TemporaryDirectory() as tmp:
+        epw = os.path.join(tmp, 'weather.epw')
+        _write_epw(epw, _records(1))
+        csv = os.path.join(tmp, 'weather.csv')
+        _records(years).to_csv(csv, index=False)
+
+        print(f"{'file':<22}{'hours':>10}{'time (s)':>10}{'peak MB':>10}")
+        for label, path in (('EPW, 1 year', epw), (f'CSV, {years} years', csv)):
+            bins, elapsed, peak = _measure(path)
+            print(f"{label:<22}{bins.hours:>10,}{elapsed:>10.3f}{peak / 1e6:>10.1f}")
+    print(bins.design_conditions().round(1).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
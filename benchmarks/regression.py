@@ -0,0 +1,299 @@
+"""Performance and accuracy regression suite for the app's hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.regression --save-baseline   # on a known-good tree
+    python -m benchmarks.regression                   # after an upgrade or change
+
+Times single-state solving per humidity input method, mixed points, the
+per-point properties table, full chart renders at 1, 100 and 10k points and
+the points export/import (JSON and NDJSON). The best of --repeats runs is compared with the
+stored baseline, and any case more than --tolerance percent slower fails.
+The baseline also stores the results of a fixed set of states, so a
+psychrolib or engine change that moves any value is reported too.
+
+Accuracy is checked on every run, baseline or not, against ASHRAE
+reference values and between the vectorized engine and psychrolib.
+
+Exits with status 1 on any failure. Baselines are machine specific and are
+not committed; the default location is benchmarks/baseline.json. Without a
+baseline (and without --save-baseline) the suite fails rather than pass
+with nothing compared. On a clean checkout or in CI, save one from the
+known-good revision on the same machine first, e.g.:
+
+    git checkout main && python -m benchmarks.regression --save-baseline --baseline /tmp/baseline.json
+    git checkout my-change && python -m benchmarks.regression --baseline /tmp/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from importlib import metadata
+
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+import psychro_engine as engine
+from chart_cache import figure_to_image, get_base_chart, render_base_chart
+from chart_overlays import plot_points
+from point_io import export_points, read_points
+from point_store import PointStore, mixed_state
+from psychro_calc import PROPERTY_ROWS, point_properties, pressure_from_elevation, solve_batch, solve_state
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 20.0  # % slower than the baseline
+DEFAULT_REPEATS = 5
+# Relative change in a stored result that counts as a changed result
+RESULT_TOLERANCE = 1e-6
+PRESSURE = 101.325
+STATES = 200
+EXPORT_POINTS = 10_000
+CHART_POINTS = (1, 100, 10_000)
+PACKAGES = ('psychrolib', 'psychrochart', 'matplotlib', 'numpy')
+
+# ASHRAE Handbook - Fundamentals (2017), ch. 1: saturation pressure over
+# water/ice (Pa, Table 3), as (dry bulb °C, value, relative tolerance)
+ASHRAE_SAT_VAP_PRES = (
+    (0.01, 611.657, 0.0005),
+    (20.0, 2339.3, 0.001),
+    (25.0, 3169.9, 0.001),
+    (50.0, 12352.0, 0.001),
+    (100.0, 101418.0, 0.001),
+)
+# Standard atmosphere (Table 1): elevation (m), pressure (kPa); absolute tolerance 0.005 kPa
+ASHRAE_STANDARD_ATMOSPHERE = ((0, 101.325), (500, 95.461), (1000, 89.875), (2000, 79.495), (5000, 54.020))
+# Worked example: 40 °C dry bulb, 20 °C wet bulb at 101.325 kPa, as
+# (property, value, absolute tolerance), in solve_state units
+ASHRAE_EXAMPLE = (
+    ('hum_ratio', 0.0065, 0.0001),
+    ('dew_point', 7.0, 0.5),
+    ('rel_hum', 0.14, 0.01),
+    ('enthalpy', 56.7, 0.1),
+    ('specific_volume', 0.896, 0.01),
+)
+# Fixed inputs whose results are stored in the baseline
+REFERENCE_STATES = (
+    (engine.REL_HUM, 25.0, 50.0),
+    (engine.REL_HUM, -10.0, 80.0),
+    (engine.WET_BULB, 40.0, 20.0),
+    (engine.WET_BULB, 5.0, 2.0),
+    (engine.DEW_POINT, 30.0, 15.0),
+    (engine.DEW_POINT, 0.0, -5.0),
+)
+
+
+def _inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    dry_bulb = rng.uniform(5, 45, n).round(1)
+    rel_hum = rng.uniform(10, 90, n).round(1)
+    # Wet bulb and dew point below the dry bulb
+    wet_bulb = (dry_bulb - rng.uniform(1, 10, n)).round(1)
+    dew_point = (dry_bulb - rng.uniform(2, 15, n)).round(1)
+    return dry_bulb.tolist(), rel_hum.tolist(), wet_bulb.tolist(), dew_point.tolist()
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    dry_bulb = rng.uniform(5, 45, n).round(1).tolist()
+    rel_hum = rng.uniform(10, 90, n).round(1).tolist()
+    return [
+        {'name': f"Point_{i + 1}", 'type': 'input', 'dry_bulb': db, 'rel_hum': rh, 'wet_bulb': None,
+         'color': '#1f77b4', 'connects_to': None, 'pressure': PRESSURE}
+        for i, (db, rh) in enumerate(zip(dry_bulb, rel_hum))
+    ]
+
+
+def _render(points):
+    chart = get_base_chart('ashrae')
+    plot_points(chart, points, PRESSURE)
+    fig = chart.axes.figure
+    try:
+        return figure_to_image(fig)
+    finally:
+        plt.close(fig)
+
+
+def _cases():
+    # name -> callable; the memoized functions are called unwrapped so every
+    # run does the full work
+    dry_bulb, rel_hum, wet_bulb, dew_point = _inputs(STATES)
+    solve = solve_state.__wrapped__
+    properties = point_properties.__wrapped__
+    mix = mixed_state.__wrapped__
+    points = _points(EXPORT_POINTS)
+    store = PointStore(_points(EXPORT_POINTS))
+    exported = {fmt: export_points(store.points, EXPORT_POINTS + 1, fmt) for fmt in ('JSON', 'NDJSON')}
+
+    def table():
+        for db, rh in zip(dry_bulb, rel_hum):
+            values = properties(db, rh, PRESSURE)
+            {"Property": [label for label, _ in PROPERTY_ROWS], "Value": values,
+             "Units": [units for _, units in PROPERTY_ROWS]}
+
+    cases = {
+        f'solve_state rel_hum x{STATES}': lambda: [solve(db, engine.REL_HUM, rh, PRESSURE) for db, rh in zip(dry_bulb, rel_hum)],
+        f'solve_state wet_bulb x{STATES}': lambda: [solve(db, engine.WET_BULB, wb, PRESSURE) for db, wb in zip(dry_bulb, wet_bulb)],
+        f'solve_state dew_point x{STATES}': lambda: [solve(db, engine.DEW_POINT, dp, PRESSURE) for db, dp in zip(dry_bulb, dew_point)],
+        f'mixed point x{STATES}': lambda: [
+            mix(db, rh, PRESSURE, 30.0, 24.0, 50.0, PRESSURE, 70.0) for db, rh in zip(dry_bulb, rel_hum)
+        ],
+        f'properties table x{STATES}': table,
+        'base chart': lambda: plt.close(render_base_chart().axes.figure),
+    }
+    for n in CHART_POINTS:
+        cases[f'chart render {n:,} points'] = lambda n=n: _render(points[:n])
+    for fmt, data in exported.items():
+        cases[f'{fmt} export {EXPORT_POINTS:,} points'] = lambda fmt=fmt: export_points(store.points, EXPORT_POINTS + 1, fmt)
+        cases[f'{fmt} import {EXPORT_POINTS:,} points'] = (
+            lambda fmt=fmt, data=data: PointStore(read_points(io.BytesIO(data), fmt.lower())[0])
+        )
+    return cases
+
+
+def _time(run, repeats):
+    # One untimed warm-up run, then the best of repeats
+    run()
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def reference_results():
+    """Results of REFERENCE_STATES and a reference mix, keyed by case name."""
+    results = {}
+    for method, dry_bulb, humidity in REFERENCE_STATES:
+        state = solve_state.__wrapped__(dry_bulb, method, humidity, PRESSURE)
+        results[f'{method} {dry_bulb} {humidity}'] = {key: float(value) for key, value in state.items()}
+    results['mix'] = dict(zip(
+        ('dry_bulb', 'rel_hum', 'wet_bulb', 'pressure'),
+        mixed_state.__wrapped__(35.0, 40.0, PRESSURE, 30.0, 24.0, 50.0, PRESSURE, 70.0),
+    ))
+    return results
+
+
+def accuracy_failures():
+    """ASHRAE reference and engine-vs-psychrolib checks; one message per failure."""
+    import psychrolib as psy
+
+    failures = []
+    for dry_bulb, expected, rel in ASHRAE_SAT_VAP_PRES:
+        for label, value in (('psychrolib', psy.GetSatVapPres(dry_bulb)), ('engine', float(engine.sat_vap_pres(dry_bulb)))):
+            if abs(value - expected) > rel * expected:
+                failures.append(f"{label} saturation pressure at {dry_bulb} °C: {value:.1f} Pa, ASHRAE {expected} Pa")
+    for elevation, expected in ASHRAE_STANDARD_ATMOSPHERE:
+        value = pressure_from_elevation(elevation)
+        if abs(value - expected) > 0.005:
+            failures.append(f"pressure at {elevation} m: {value:.3f} kPa, ASHRAE {expected} kPa")
+
+    scalar = solve_state.__wrapped__(40.0, engine.WET_BULB, 20.0, PRESSURE)
+    vector = solve_batch(40.0, engine.WET_BULB, 20.0, PRESSURE)
+    for key, expected, tolerance in ASHRAE_EXAMPLE:
+        # solve_batch gives RH in %
+        for label, value in (('psychrolib', scalar[key]), ('engine', float(vector[key]) / (100 if key == 'rel_hum' else 1))):
+            if abs(value - expected) > tolerance:
+                failures.append(f"{label} {key} of the 40/20 °C example: {value:.4f}, ASHRAE {expected}")
+
+    # The vectorized engine against psychrolib over the app's range
+    dry_bulb, rel_hum, _, _ = _inputs(STATES, seed=1)
+    batch = solve_batch(dry_bulb, engine.REL_HUM, rel_hum, PRESSURE)
+    for db, rh, wb, dp in zip(dry_bulb, rel_hum, batch['wet_bulb'], batch['dew_point']):
+        state = solve_state.__wrapped__(db, engine.REL_HUM, rh, PRESSURE)
+        if max(abs(wb - state['wet_bulb']), abs(dp - state['dew_point'])) > engine.TEMPERATURE_TOLERANCE:
+            failures.append(f"engine differs from psychrolib at {db} °C, {rh} %: wet bulb {wb:.4f} vs "
+                            f"{state['wet_bulb']:.4f}, dew point {dp:.4f} vs {state['dew_point']:.4f}")
+            break
+    return failures
+
+
+def _changed_results(baseline, current):
+    changes = []
+    for case, values in baseline.items():
+        for key, expected in values.items():
+            value = current.get(case, {}).get(key)
+            if value is None or abs(value - expected) > RESULT_TOLERANCE * max(abs(expected), 1e-12):
+                changes.append(f"{case} {key}: {value} (baseline {expected})")
+    return changes
+
+
+def _versions():
+    versions = {'python': platform.python_version()}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and accuracy regression suite.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="fail when a case is more than this many percent slower than the baseline")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="runs per case (best is kept)")
+    args = parser.parse_args()
+
+    failures = accuracy_failures()
+    print(f"accuracy: {'ok' if not failures else f'{len(failures)} failed'}")
+    for failure in failures:
+        print(f"  {failure}")
+
+    baseline = None
+    if not args.save_baseline:
+        if not os.path.exists(args.baseline):
+            # Nothing to compare with: every timing would pass unchecked
+            print(f"\nFAILED: no baseline at {args.baseline}. Run with --save-baseline on a known-good "
+                  "tree first, or point --baseline at a saved one.")
+            sys.exit(1)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # Warm the base chart cache and the import of psychrochart
+    get_base_chart('ashrae')
+    timings = {}
+    print(f"\n{'case':<34}{'baseline (ms)':>14}{'now (ms)':>10}{'change':>9}")
+    for name, run in _cases().items():
+        timings[name] = _time(run, args.repeats)
+        before = (baseline or {}).get('timings', {}).get(name)
+        line = f"{name:<34}{before * 1e3 if before else float('nan'):>14.1f}{timings[name] * 1e3:>10.1f}"
+        if before:
+            change = (timings[name] / before - 1) * 100
+            line += f"{change:>+8.0f}%"
+            if change > args.tolerance:
+                line += "  SLOWER"
+                failures.append(f"{name} is {change:.0f}% slower than the baseline")
+        print(line)
+
+    results = reference_results()
+    versions = _versions()
+    if baseline is not None:
+        if baseline.get('versions') != versions:
+            print(f"\nbaseline versions {baseline.get('versions')}\ncurrent versions  {versions}")
+        changes = _changed_results(baseline.get('results', {}), results)
+        print(f"\nresults: {'unchanged' if not changes else f'{len(changes)} changed'}")
+        for change in changes:
+            print(f"  {change}")
+        failures += changes
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'versions': versions, 'timings': timings, 'results': results}, f, indent=2)
+        print(f"\nbaseline saved to {args.baseline}")
+
+    if failures:
+        print(f"\nFAILED: {len(failures)} regression(s)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Headless bulk psychrometric calculator for CSV and Parquet files.
+
+Streams the input in chunks, solves every row with the vectorized engine and
+appends the full property set to the output, so memory use depends on the
+chunk size and not on the file size. Input columns are passed through;
+properties whose name is already an input column (e.g. rel_hum) are written
+with a '_calc' suffix.
+
+Example (BMS trend log with dry bulb, RH and pressure columns):
+
+    python -m bulk_calc trend.csv trend_props.parquet \\
+        --dry-bulb OAT --humidity OARH --pressure-col BARO
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+import psychro_engine as engine
+from parallel_calc import default_workers, make_executor, solve_batch_parallel
+from psychro_calc import BATCH_COLUMNS, pressure_from_elevation, solve_batch
+
+# Rows solved per chunk
+DEFAULT_CHUNK_SIZE = 100_000
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+# Added to the name of a property that is already an input column
+CALC_SUFFIX = '_calc'
+
+
+def _is_parquet(path):
+    return os.path.splitext(str(path))[1].lower() in PARQUET_EXTENSIONS
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the input file as DataFrames of at most chunk_size rows."""
+    if _is_parquet(path):
+        pa = _pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class _Writer:
+    # Appends chunks to a CSV or Parquet file
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.parquet:
+            pa = _pyarrow()
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pa.parquet.ParquetWriter(self.path, self._schema(pa, table))
+            # Types are inferred per chunk; later chunks take the file's
+            try:
+                table = table.cast(self._writer.schema)
+            except pa.ArrowException as e:
+                raise ValueError(f"column types changed after the first chunk ({e}); "
+                                 "try a larger --chunk-size") from None
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    @staticmethod
+    def _schema(pa, table):
+        # Columns with no values in the first chunk have no type to infer
+        # (pandas makes them float); write them as strings, which any later
+        # values can be cast to
+        schema = table.schema
+        for i, field in enumerate(schema):
+            if len(table) and table.column(i).null_count == len(table):
+                schema = schema.set(i, field.with_type(pa.string()))
+        return schema
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def solve_chunk(df, dry_bulb_col, humidity_col, method=engine.REL_HUM,
+                pressure_col=None, pressure=101.325, workers=1, executor=None, fast=False):
+    """Return df with the BATCH_COLUMNS properties appended.
+
+    A property whose name is already a column of df is appended with
+    CALC_SUFFIX, so input columns are never overwritten.
+
+    Pressure comes from pressure_col (kPa) when given, else the constant
+    pressure (kPa). Relative humidity columns are in %. With workers > 1 the
+    rows are split across that many processes of executor. fast=True uses
+    the per-pressure lookup tables of psychro_tables.
+    """
+    if pressure_col is not None:
+        pressure = df[pressure_col].to_numpy(dtype=float)
+    args = (
+        df[dry_bulb_col].to_numpy(dtype=float),
+        method,
+        df[humidity_col].to_numpy(dtype=float),
+        pressure,
+    )
+    if workers > 1:
+        props = solve_batch_parallel(*args, workers=workers, executor=executor, fast=fast)
+    else:
+        props = solve_batch(*args, fast=fast)
+    return df.assign(**{key + CALC_SUFFIX if key in df.columns else key: values for key, values in props.items()})
+
+
+def process_file(input_path, output_path, dry_bulb_col, humidity_col, method=engine.REL_HUM,
+                 pressure_col=None, pressure=101.325, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, fast=False):
+    """Stream input_path through solve_chunk into output_path.
+
+    workers > 1 solves each chunk on a process pool of that size.
+    Returns the number of rows written. On an error the partly written
+    output is removed.
+    """
+    writer = _Writer(output_path)
+    executor = make_executor(workers) if workers > 1 else None
+    rows = 0
+    try:
+        for chunk in iter_chunks(input_path, chunk_size):
+            writer.write(solve_chunk(
+                chunk, dry_bulb_col, humidity_col, method, pressure_col, pressure, workers, executor, fast
+            ))
+            rows += len(chunk)
+    except BaseException:
+        writer.close()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    else:
+        writer.close()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Calculate psychrometric properties for every row of a CSV or Parquet file.",
+        epilog="Output columns: " + ", ".join(f"{k} ({u})" for k, u in BATCH_COLUMNS.items())
+               + f", with a {CALC_SUFFIX} suffix where the input already has the column.",
+    )
+    parser.add_argument('input', help="input .csv or .parquet file")
+    parser.add_argument('output', help="output .csv or .parquet file")
+    parser.add_argument('--dry-bulb', default='dry_bulb', help="dry bulb column (°C)")
+    parser.add_argument('--humidity', default='rel_hum', help="humidity column")
+    parser.add_argument('--method', choices=engine.HUMIDITY_METHODS, default=engine.REL_HUM,
+                        help="what the humidity column holds: RH (%%), wet bulb or dew point (°C), humidity ratio (kg/kg)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--pressure-col', help="barometric pressure column (kPa)")
+    group.add_argument('--pressure', type=float, default=101.325, help="constant barometric pressure (kPa)")
+    group.add_argument('--elevation', type=float, help="site elevation (m), sets a constant pressure")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"worker processes, 0 for all CPUs ({default_workers()} here)")
+    parser.add_argument('--fast', action='store_true',
+                        help="interpolate dew point and wet bulb from per-pressure lookup tables")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pressure = args.pressure if args.elevation is None else pressure_from_elevation(args.elevation)
+    workers = args.workers or default_workers()
+    try:
+        rows = process_file(
+            args.input, args.output, args.dry_bulb, args.humidity, args.method,
+            args.pressure_col, pressure, args.chunk_size, workers, args.fast,
+        )
+    except KeyError as e:
+        print(f"Error: column {e} not found in {args.input}", file=sys.stderr)
+        return 1
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {rows} rows to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Cache of rendered base psychrometric charts.
+
+Building a PsychroChart and plotting its saturation, RH, enthalpy, volume and
+wet bulb families takes far longer than drawing a handful of points on top of
+it. Rendered base charts are stored here (pickled, so every caller gets its
+own independent figure) and keyed by chart style and barometric pressure,
+so each site pressure gets its own saturation, RH, volume and wet bulb
+curves.
+
+Finished chart images (base chart plus points, as PNG bytes) are cached
+too, keyed by a hash of everything drawn on them, so a rerun that plots the
+same state serves the stored image without touching Matplotlib.
+"""
+import hashlib
+import io
+import json
+import pickle
+import threading
+from collections import OrderedDict
+
+# Chart style used by the app
+DEFAULT_STYLE = 'ashrae'
+# Standard sea level pressure (kPa)
+SEA_LEVEL_PRESSURE = 101.325
+# Number of rendered base charts kept in memory
+MAX_CACHED_CHARTS = 8
+# Number of finished chart images kept in memory
+MAX_CACHED_IMAGES = 32
+# Same output settings as st.pyplot
+IMAGE_FORMAT = 'png'
+IMAGE_DPI = 200
+
+
+def _cache_key(style, pressure):
+    # Pressures within 1 Pa of each other share a chart
+    return (style, round(float(pressure), 3))
+
+
+def _scale_volume_lines(params, pressure):
+    # Specific volume grows as pressure falls (v ~ 1/p); the styles' fixed
+    # volume range is for sea level and would leave no volume lines on a
+    # chart for a site at altitude
+    scale = SEA_LEVEL_PRESSURE / float(pressure)
+    step = params.constant_v_step
+
+    def scaled(volume):
+        # On the line step; psychrochart matches labels to lines at 3 decimals
+        return round(round(volume * scale / step) * step, 3)
+
+    low, high = params.range_vol_m3_kg
+    params.range_vol_m3_kg = (scaled(low), scaled(high))
+    params.constant_v_labels = [scaled(label) for label in params.constant_v_labels]
+
+
+def render_base_chart(style=DEFAULT_STYLE, pressure=SEA_LEVEL_PRESSURE):
+    """Build and plot a base chart for a barometric pressure (kPa) from scratch (no caching)."""
+    # psychrochart pulls in Matplotlib; import it only when a chart is drawn
+    from psychrochart import PsychroChart
+    chart = PsychroChart.create(style)
+    chart.config.limits.pressure_kpa = float(pressure)
+    _scale_volume_lines(chart.config.chart_params, pressure)
+    if round(float(pressure), 3) != SEA_LEVEL_PRESSURE:
+        # The styles' titles say "sea level"
+        chart.config.figure.title = f"Psychrometric Chart ({float(pressure):.3f} kPa)"
+    chart.plot()
+    return chart
+
+
+class ChartCache:
+    """Bounded LRU cache of rendered base charts."""
+
+    def __init__(self, maxsize=MAX_CACHED_CHARTS):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._charts)
+
+    def __contains__(self, key):
+        return _cache_key(*key) in self._charts
+
+    def get(self, style=DEFAULT_STYLE, pressure=SEA_LEVEL_PRESSURE):
+        """Return a fresh copy of the rendered base chart for style and pressure."""
+        key = _cache_key(style, pressure)
+        with self._lock:
+            payload = self._charts.get(key)
+            if payload is not None:
+                self._charts.move_to_end(key)
+                self.hits += 1
+        if payload is None:
+            # Render outside the lock so other sessions are not blocked
+            payload = pickle.dumps(render_base_chart(*key))
+            with self._lock:
+                self.misses += 1
+                self._charts[key] = payload
+                self._charts.move_to_end(key)
+                while len(self._charts) > self.maxsize:
+                    self._charts.popitem(last=False)
+        return pickle.loads(payload)
+
+    def clear(self):
+        with self._lock:
+            self._charts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache shared by every session
+chart_cache = ChartCache()
+
+
+def get_base_chart(style=DEFAULT_STYLE, pressure=SEA_LEVEL_PRESSURE):
+    """Return a rendered base chart ready for points and connectors."""
+    return chart_cache.get(style, pressure)
+
+
+def content_key(*parts):
+    """Stable hash of the JSON-serializable state drawn on a chart."""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def figure_to_image(fig, fmt=IMAGE_FORMAT):
+    """Encode a figure the way st.pyplot does."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=IMAGE_DPI, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+class ImageCache:
+    """Bounded LRU cache of finished chart images keyed by content_key."""
+
+    def __init__(self, maxsize=MAX_CACHED_IMAGES):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, key, render):
+        """Return the image for key, calling render() to produce it on a miss.
+
+        Returns (image bytes, True if it was rendered by this call).
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image, False
+        image = render()
+        with self._lock:
+            self.misses += 1
+            self._images[key] = image
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+        return image, True
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Finished images shared by every session
+image_cache = ImageCache()
@@ -0,0 +1,235 @@
+"""Aggregated overlays drawn on top of a rendered psychrometric chart.
+
+PsychroChart axes are dry bulb (°C) against humidity ratio (g/kg), so binned
+data can be drawn directly in those coordinates as one artist, instead of
+one marker per state through ``plot_points_dbt_rh``.
+"""
+import re
+
+import numpy as np
+
+import psychro_engine as engine
+
+# Colormap and opacity of density overlays
+DENSITY_CMAP = 'YlOrRd'
+DENSITY_ALPHA = 0.75
+# Draw overlays above the chart's curves but below the points
+DENSITY_ZORDER = 2
+
+# Above this many points the chart aggregates unnamed points instead of
+# drawing one labelled marker and legend entry per point
+DENSE_POINT_THRESHOLD = 300
+# Aggregated rendering modes for large point sets
+HEXBIN = 'hexbin'
+HISTOGRAM = 'histogram'
+SCATTER = 'scatter'
+DENSE_MODES = (HEXBIN, HISTOGRAM, SCATTER)
+HEXBIN_GRIDSIZE = 60
+HISTOGRAM_BIN = 0.5  # °C and g/kg
+# Size of the scatter raster cells (screen pixels) and their opacity
+SCATTER_PIXELS = 2
+SCATTER_ALPHA = 0.8
+# Opacity of uncertainty ellipses
+ELLIPSE_ALPHA = 0.35
+# Outline colours and fill opacity of comfort and equipment envelopes
+ENVELOPE_COLORS = ('#2ca02c', '#9467bd', '#8c564b', '#e377c2', '#17becf')
+ENVELOPE_ALPHA = 0.15
+# Names given automatically by the app
+DEFAULT_NAME = re.compile(r'(Point|Mixed)_\d+$')
+# Renamed points kept as markers in a dense chart, mixed and connected
+# points included; the rest join the aggregated layer (imports often name
+# every point, e.g. by sensor ID or timestamp)
+MAX_NAMED_POINTS = 50
+
+
+def plot_bin_density(ax, dry_bulb_edges, hum_ratio_edges, counts, label='Hours', colorbar=True):
+    """Shade dry bulb x humidity ratio (g/kg) bin counts on chart axes; empty bins stay clear."""
+    mesh = ax.pcolormesh(
+        dry_bulb_edges, hum_ratio_edges, np.ma.masked_equal(np.asarray(counts).T, 0),
+        cmap=DENSITY_CMAP, alpha=DENSITY_ALPHA, zorder=DENSITY_ZORDER, shading='flat',
+    )
+    if colorbar:
+        ax.figure.colorbar(mesh, ax=ax, label=label, shrink=0.6, pad=0.08)
+    return mesh
+
+
+def split_named_points(points, max_named=MAX_NAMED_POINTS):
+    """Split point dicts into (named, others) for dense rendering.
+
+    Named points keep their own marker, label and legend entry: mixed
+    points and points at either end of a connector, then the first points
+    renamed from the app's default Point_N name up to max_named in all.
+    """
+    connected = {p['connects_to'] for p in points if p.get('connects_to')}
+    named = []
+    renamed = []
+    others = []
+    for point in points:
+        if point.get('type') == 'mixed' or point.get('connects_to') or point['name'] in connected:
+            named.append(point)
+        elif not DEFAULT_NAME.match(point['name']):
+            renamed.append(point)
+        else:
+            others.append(point)
+    kept = max(max_named - len(named), 0)
+    # Order within the aggregated layer doesn't matter
+    return named + renamed[:kept], others + renamed[kept:]
+
+
+def points_to_chart_xy(points, pressure):
+    """Dry bulb (°C) and humidity ratio (g/kg) arrays of point dicts.
+
+    Points without their own pressure (kPa) use pressure (kPa).
+    """
+    dry_bulb = np.array([p['dry_bulb'] for p in points], dtype=np.float64)
+    rel_hum = np.array([p['rel_hum'] for p in points], dtype=np.float64) / 100
+    pressure_pa = np.array([p.get('pressure', pressure) for p in points], dtype=np.float64) * 1000
+    with np.errstate(invalid='ignore'):
+        return dry_bulb, engine.hum_ratio_from_rel_hum(dry_bulb, rel_hum, pressure_pa) * 1000
+
+
+def plot_points(chart, points, pressure, dense_threshold=DENSE_POINT_THRESHOLD, dense_mode=HEXBIN):
+    """Draw the app's point dicts on a PsychroChart.
+
+    Each point gets a marker and legend entry, and a dashed connector to the
+    point it connects to. Above dense_threshold points, unnamed points (see
+    split_named_points) are drawn as one dense_mode layer instead.
+
+    Points are placed by dry bulb and humidity ratio at their own pressure
+    (kPa; pressure for points without one), not by RH at the chart's
+    pressure, so states from sites at other altitudes sit where they belong
+    on a chart drawn for any one pressure.
+    """
+    ax = chart.axes
+    named_points = points
+    if len(named_points) > dense_threshold:
+        # Too many points for one marker and legend entry each
+        named_points, other_points = split_named_points(named_points)
+        if other_points:
+            dry_bulb_xy, hum_ratio_xy = points_to_chart_xy(other_points, pressure)
+            plot_point_cloud(ax, dry_bulb_xy, hum_ratio_xy, dense_mode, [p['color'] for p in other_points])
+    if not named_points:
+        return
+
+    dry_bulb_xy, hum_ratio_xy = points_to_chart_xy(named_points, pressure)
+    xy = {p['name']: (x, y) for p, x, y in zip(named_points, dry_bulb_xy.tolist(), hum_ratio_xy.tolist())}
+    colors = {}
+    for point in named_points:
+        # Convert hex color to RGB
+        hex_color = point['color'].lstrip('#')
+        colors[point['name']] = [int(hex_color[i:i+2], 16) / 255 for i in (0, 2, 4)]
+
+    # Connectors under the markers, styled as psychrochart's plot_points_dbt_rh draws them
+    for point in named_points:
+        end = point['connects_to']
+        if end and end in xy:
+            (x_start, y_start), (x_end, y_end) = xy[point['name']], xy[end]
+            ax.plot(
+                [x_start, x_end], [y_start, y_end], label=f"{point['name']} → {end}", dash_capstyle='round',
+                color=[*colors[point['name']], 0.7], linewidth=5, linestyle='--',
+            )
+    for point in named_points:
+        x, y = xy[point['name']]
+        ax.plot(x, y, label=point['name'], color=[*colors[point['name']], 0.8], marker='o', markersize=15, linewidth=0)
+
+    chart.plot_legend(markerscale=.7, frameon=False, fontsize=10, labelspacing=1.2)
+
+
+def plot_point_cloud(ax, dry_bulb, hum_ratio, mode=HEXBIN, colors=None):
+    """Draw many states (°C, g/kg) as a single aggregated or rasterized artist."""
+    valid = ~(np.isnan(dry_bulb) | np.isnan(hum_ratio))
+    dry_bulb = dry_bulb[valid]
+    hum_ratio = hum_ratio[valid]
+    x_min, x_max = ax.get_xlim()
+    y_min, y_max = ax.get_ylim()
+    if mode == HEXBIN:
+        collection = ax.hexbin(
+            dry_bulb, hum_ratio, gridsize=HEXBIN_GRIDSIZE, extent=(x_min, x_max, y_min, y_max), mincnt=1,
+            cmap=DENSITY_CMAP, alpha=DENSITY_ALPHA, zorder=DENSITY_ZORDER, linewidths=0,
+        )
+        ax.figure.colorbar(collection, ax=ax, label='Points', shrink=0.6, pad=0.08)
+        return collection
+    if mode == HISTOGRAM:
+        x_edges = np.arange(x_min, x_max + HISTOGRAM_BIN, HISTOGRAM_BIN)
+        y_edges = np.arange(y_min, y_max + HISTOGRAM_BIN, HISTOGRAM_BIN)
+        counts, _, _ = np.histogram2d(dry_bulb, hum_ratio, bins=(x_edges, y_edges))
+        return plot_bin_density(ax, x_edges, y_edges, counts, label='Points')
+    if mode == SCATTER:
+        if colors is not None:
+            colors = np.asarray(colors)[valid]
+        return _plot_raster(ax, dry_bulb, hum_ratio, colors)
+    raise ValueError(f"Unknown dense rendering mode '{mode}', expected one of {DENSE_MODES}")
+
+
+def plot_ellipses(ax, centre_x, centre_y, width, height, angle, colors):
+    """Draw uncertainty ellipses (see uncertainty.ellipses) in the points' colours, under the markers."""
+    from matplotlib.collections import PatchCollection
+    from matplotlib.patches import Ellipse
+
+    valid = ~np.isnan(np.asarray(centre_x) + np.asarray(centre_y))
+    patches = [
+        Ellipse((x, y), w, h, angle=a)
+        for x, y, w, h, a, ok in zip(centre_x, centre_y, width, height, angle, valid) if ok
+    ]
+    colors = [color for color, ok in zip(colors, valid) if ok]
+    collection = PatchCollection(
+        patches, facecolors=colors, edgecolors=colors, alpha=ELLIPSE_ALPHA, linewidths=1.5, zorder=DENSITY_ZORDER,
+    )
+    ax.add_collection(collection)
+    return collection
+
+
+def plot_envelopes(ax, envelopes, colors=ENVELOPE_COLORS):
+    """Draw envelopes (see envelopes.Envelope) as outlined, lightly filled
+    polygons, labelled for the chart legend."""
+    from matplotlib.patches import Polygon
+
+    artists = []
+    for i, envelope in enumerate(envelopes):
+        color = colors[i % len(colors)]
+        vertices = np.column_stack((envelope.dry_bulb, envelope.hum_ratio))
+        patch = Polygon(vertices, closed=True, facecolor=color, edgecolor=color, alpha=ENVELOPE_ALPHA,
+                        linewidth=2, zorder=DENSITY_ZORDER, label=envelope.name)
+        ax.add_patch(patch)
+        # Outline at full strength; the fill stays faint
+        ax.plot(*np.vstack((vertices, vertices[:1])).T, color=color, linewidth=2, zorder=DENSITY_ZORDER)
+        artists.append(patch)
+    return artists
+
+
+def _plot_raster(ax, x, y, colors=None):
+    # Scatter drawn as one image at screen resolution, each cell coloured with
+    # the mean colour of its points, so drawing cost does not depend on the
+    # number of points
+    from matplotlib.colors import to_rgba_array
+
+    x_min, x_max = ax.get_xlim()
+    y_min, y_max = ax.get_ylim()
+    bbox = ax.get_window_extent()
+    width = max(int(bbox.width) // SCATTER_PIXELS, 1)
+    height = max(int(bbox.height) // SCATTER_PIXELS, 1)
+    col = np.floor((x - x_min) / (x_max - x_min) * width).astype(np.intp)
+    row = np.floor((y - y_min) / (y_max - y_min) * height).astype(np.intp)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    cells = row[inside] * width + col[inside]
+    counts = np.bincount(cells, minlength=width * height)
+    if colors is None:
+        rgb = np.tile(to_rgba_array('C0')[:, :3], (cells.size, 1))
+    else:
+        # Convert each distinct colour once
+        unique, index = np.unique(np.asarray(colors)[inside], return_inverse=True)
+        rgb = to_rgba_array(unique)[index.ravel(), :3]
+    image = np.zeros((width * height, 4))
+    with np.errstate(invalid='ignore'):
+        for channel in range(3):
+            image[:, channel] = np.bincount(cells, weights=rgb[:, channel], minlength=width * height) / counts
+    image[:, 3] = np.where(counts > 0, SCATTER_ALPHA, 0.0)
+    image = np.nan_to_num(image)
+    artist = ax.imshow(
+        image.reshape(height, width, 4), origin='lower', extent=(x_min, x_max, y_min, y_max),
+        aspect='auto', interpolation='nearest', zorder=DENSITY_ZORDER,
+    )
+    # imshow resets the limits to the image extent; keep the chart's
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(y_min, y_max)
+    return artist
@@ -0,0 +1,237 @@
+"""Comfort zones and equipment envelopes as polygons on the chart, and bulk classification of states.
+
+Envelopes are polygons in the chart's coordinates: dry bulb (°C) against
+humidity ratio (g/kg). ``Envelope.from_limits`` builds one from dry bulb,
+humidity ratio, dew point and RH limits; RH limits follow the curved RH
+lines. Each envelope keeps a grid over its bounding box with every cell
+marked inside, outside or on the boundary. Classifying a state is one
+array lookup, and only states in boundary cells get an exact
+point-in-polygon test. Large logs are cheap to classify that way.
+
+Example, for a CSV of logged states (dry_bulb and rel_hum or dew_point
+columns, as for weather files):
+
+    python -m envelopes hall_log.csv --envelope "Data hall A1 recommended"
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import psychro_engine as engine
+
+SEA_LEVEL_PRESSURE = 101.325
+# Envelope name -> limits for Envelope.from_limits (°C, g/kg, %)
+PRESETS = {
+    # ASHRAE 55 caps humidity ratio at 0.012. The dry bulb band stands in for
+    # the operative temperature range, which depends on clothing, activity
+    # and air speed; adjust it for the space.
+    'Comfort zone (ASHRAE 55 humidity limit)': {'dry_bulb': (20.0, 26.0), 'hum_ratio': (0.0, 12.0)},
+    # ASHRAE TC 9.9 thermal guidelines, class A1
+    'Data hall A1 recommended': {'dry_bulb': (18.0, 27.0), 'dew_point': (-9.0, 15.0), 'rel_hum': (0.0, 60.0)},
+    'Data hall A1 allowable': {'dry_bulb': (15.0, 32.0), 'dew_point': (-12.0, 17.0), 'rel_hum': (8.0, 80.0)},
+}
+# Dry bulb step of the curved edges of envelopes built from limits (°C)
+EDGE_STEP = 0.25
+# Grid cell size in °C and g/kg
+GRID_CELL = 0.1
+OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+
+
+def inside_polygon(vertex_x, vertex_y, x, y):
+    """Even-odd point-in-polygon test of arrays of points, vectorized over the points."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    inside = np.zeros(x.shape, dtype=bool)
+    previous_x, previous_y = vertex_x[-1], vertex_y[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for vx, vy in zip(vertex_x, vertex_y):
+            crosses = (vy > y) != (previous_y > y)
+            crossing_x = (previous_x - vx) * (y - vy) / (previous_y - vy) + vx
+            inside ^= crosses & (x < crossing_x)
+            previous_x, previous_y = vx, vy
+    return inside
+
+
+class Envelope:
+    """A named polygon in chart coordinates (dry bulb °C, humidity ratio g/kg)."""
+
+    def __init__(self, name, dry_bulb, hum_ratio, cell=GRID_CELL):
+        self.name = name
+        self.dry_bulb = np.asarray(dry_bulb, dtype=np.float64)
+        self.hum_ratio = np.asarray(hum_ratio, dtype=np.float64)
+        if self.dry_bulb.size < 3 or self.dry_bulb.shape != self.hum_ratio.shape:
+            raise ValueError(f"Envelope '{name}' needs at least 3 vertices")
+        self.cell = cell
+        self._grid = None
+
+    @classmethod
+    def from_limits(cls, name, dry_bulb, hum_ratio=None, dew_point=None, rel_hum=None,
+                    pressure=SEA_LEVEL_PRESSURE, step=EDGE_STEP):
+        """Envelope of the states within (low, high) limits of dry bulb (°C)
+        and any of humidity ratio (g/kg), dew point (°C) and RH (%), at
+        pressure (kPa). States above saturation are never inside."""
+        lo, hi = dry_bulb
+        x = np.linspace(lo, hi, max(int(np.ceil((hi - lo) / step)), 1) + 1)
+        pressure_pa = pressure * 1000
+        lower = np.zeros_like(x)
+        upper = engine.sat_hum_ratio(x, pressure_pa) * 1000
+        if hum_ratio is not None:
+            lower = np.maximum(lower, hum_ratio[0])
+            upper = np.minimum(upper, hum_ratio[1])
+        if dew_point is not None:
+            # The humidity ratio of a dew point is saturation at that temperature
+            lower = np.maximum(lower, engine.sat_hum_ratio(dew_point[0], pressure_pa) * 1000)
+            upper = np.minimum(upper, engine.sat_hum_ratio(dew_point[1], pressure_pa) * 1000)
+        if rel_hum is not None:
+            lower = np.maximum(lower, engine.hum_ratio_from_rel_hum(x, rel_hum[0] / 100, pressure_pa) * 1000)
+            upper = np.minimum(upper, engine.hum_ratio_from_rel_hum(x, rel_hum[1] / 100, pressure_pa) * 1000)
+        keep = lower < upper
+        if keep.sum() < 2:
+            raise ValueError(f"Envelope '{name}' is empty: its limits leave no states")
+        x, lower, upper = x[keep], lower[keep], upper[keep]
+        # Along the lower edge, then back along the upper edge
+        return cls(name, np.concatenate((x, x[::-1])), np.concatenate((lower, upper[::-1])))
+
+    @property
+    def grid(self):
+        """Cell codes (OUTSIDE, INSIDE or BOUNDARY) over the bounding box, built on first use."""
+        if self._grid is None:
+            self._grid = self._build_grid()
+        return self._grid
+
+    def _build_grid(self):
+        self._x0 = self.dry_bulb.min()
+        self._y0 = self.hum_ratio.min()
+        nx = int(np.ceil((self.dry_bulb.max() - self._x0) / self.cell)) + 1
+        ny = int(np.ceil((self.hum_ratio.max() - self._y0) / self.cell)) + 1
+        # Cells an edge passes through: points along each edge, a quarter cell apart
+        start_x, start_y = self.dry_bulb, self.hum_ratio
+        end_x, end_y = np.roll(start_x, -1), np.roll(start_y, -1)
+        counts = np.ceil(np.hypot(end_x - start_x, end_y - start_y) / (self.cell / 4)).astype(np.intp) + 1
+        edge = np.repeat(np.arange(len(counts)), counts)
+        t = np.concatenate([np.linspace(0, 1, n) for n in counts])
+        col = ((start_x[edge] + t * (end_x[edge] - start_x[edge]) - self._x0) / self.cell).astype(np.intp)
+        row = ((start_y[edge] + t * (end_y[edge] - start_y[edge]) - self._y0) / self.cell).astype(np.intp)
+        boundary = np.zeros((nx + 2, ny + 2), dtype=bool)
+        boundary[np.clip(col, 0, nx - 1) + 1, np.clip(row, 0, ny - 1) + 1] = True
+        # One cell of margin, so rounding at the cell edges can't misclassify
+        boundary = (boundary[1:-1, 1:-1] | boundary[:-2, 1:-1] | boundary[2:, 1:-1]
+                    | boundary[1:-1, :-2] | boundary[1:-1, 2:])
+        # Other cells are wholly inside or outside: their centre decides
+        centre_x, centre_y = np.meshgrid(
+            self._x0 + (np.arange(nx) + 0.5) * self.cell, self._y0 + (np.arange(ny) + 0.5) * self.cell, indexing='ij'
+        )
+        grid = inside_polygon(self.dry_bulb, self.hum_ratio, centre_x, centre_y).astype(np.int8)
+        grid[boundary] = BOUNDARY
+        return grid
+
+    def contains(self, dry_bulb, hum_ratio):
+        """Boolean array: which states (°C, g/kg) lie inside. NaN states are outside."""
+        grid = self.grid
+        x = np.asarray(dry_bulb, dtype=np.float64)
+        y = np.asarray(hum_ratio, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            col = np.floor((x - self._x0) / self.cell)
+            row = np.floor((y - self._y0) / self.cell)
+            in_box = (col >= 0) & (col < grid.shape[0]) & (row >= 0) & (row < grid.shape[1])
+        code = np.full(x.shape, OUTSIDE, dtype=np.int8)
+        code[in_box] = grid[col[in_box].astype(np.intp), row[in_box].astype(np.intp)]
+        inside = code == INSIDE
+        edge = code == BOUNDARY
+        inside[edge] = inside_polygon(self.dry_bulb, self.hum_ratio, x[edge], y[edge])
+        return inside
+
+
+def preset_envelopes(names=None, pressure=SEA_LEVEL_PRESSURE):
+    """Envelopes of PRESETS (all, or those named) at pressure (kPa)."""
+    return [Envelope.from_limits(name, pressure=pressure, **PRESETS[name]) for name in (names or PRESETS)]
+
+
+class EnvelopeTally:
+    """Counts of states inside and outside each envelope, added chunk by chunk."""
+
+    def __init__(self, envelopes):
+        self.envelopes = list(envelopes)
+        self.inside = np.zeros(len(self.envelopes), dtype=np.int64)
+        self.states = 0
+        # States that could not be solved (not counted in or out)
+        self.missing = 0
+
+    def add(self, dry_bulb, hum_ratio):
+        """Add states: dry bulb (°C) and humidity ratio (g/kg) arrays."""
+        dry_bulb = np.asarray(dry_bulb, dtype=np.float64)
+        hum_ratio = np.asarray(hum_ratio, dtype=np.float64)
+        valid = ~(np.isnan(dry_bulb) | np.isnan(hum_ratio))
+        self.missing += int(valid.size - valid.sum())
+        dry_bulb, hum_ratio = dry_bulb[valid], hum_ratio[valid]
+        self.states += dry_bulb.size
+        for i, envelope in enumerate(self.envelopes):
+            self.inside[i] += np.count_nonzero(envelope.contains(dry_bulb, hum_ratio))
+
+    def table(self, hours_per_state=None):
+        """One row per envelope: states inside and outside, % outside and,
+        with hours_per_state (e.g. 1 for hourly weather), hours outside."""
+        # Import pandas only when a table is made, not with the app
+        import pandas as pd
+        outside = self.states - self.inside
+        table = pd.DataFrame({
+            'Envelope': [envelope.name for envelope in self.envelopes],
+            'Inside': self.inside,
+            'Outside': outside,
+            '% Outside': 100 * outside / max(self.states, 1),
+        })
+        if hours_per_state is not None:
+            table['Hours Outside'] = outside * hours_per_state
+        return table
+
+
+def classify(envelopes, dry_bulb, hum_ratio, hours_per_state=None):
+    """EnvelopeTally.table of arrays of states (°C, g/kg)."""
+    tally = EnvelopeTally(envelopes)
+    tally.add(dry_bulb, hum_ratio)
+    return tally.table(hours_per_state)
+
+
+def classify_file(source, envelopes, fmt=None, pressure=SEA_LEVEL_PRESSURE, hours_per_state=None):
+    """Classify every record of a weather or logged-states file (see
+    weather.iter_weather), chunk by chunk. Returns the EnvelopeTally."""
+    from weather import iter_weather, solve_weather
+    tally = EnvelopeTally(envelopes)
+    for records in iter_weather(source, fmt):
+        states = solve_weather(records, pressure)
+        tally.add(states['dry_bulb'], states['hum_ratio'] * 1000)
+    return tally
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Count the states of an EPW, CSV or Parquet file inside and outside comfort and equipment envelopes.",
+    )
+    parser.add_argument('input', help="input .epw, .csv or .parquet file")
+    parser.add_argument('--envelope', action='append', choices=list(PRESETS),
+                        help="envelope to check (repeatable; default all presets)")
+    parser.add_argument('--pressure', type=float, default=SEA_LEVEL_PRESSURE,
+                        help="barometric pressure (kPa) of the envelopes and of records without one")
+    parser.add_argument('--hours', type=float, default=None,
+                        help="hours per record, to report hours outside (1 for hourly data)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        tally = classify_file(args.input, preset_envelopes(args.envelope, args.pressure), pressure=args.pressure)
+    except KeyError as e:
+        print(f"Error: column {e} not found in {args.input}", file=sys.stderr)
+        return 1
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{tally.states} states, {tally.missing} missing or invalid")
+    print(tally.table(args.hours).to_string(index=False, float_format='{:.1f}'.format))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Inverse (goal-seek) problems for design targets, solved for arrays of targets.
+
+Instead of adjusting a ratio or temperature until a point lands on a target,
+these functions solve for it directly:
+
+- ``mixing_fraction``: share of stream 1 in an adiabatic mix that reaches a
+  target dry bulb, humidity ratio, enthalpy or RH
+- ``leaving_dry_bulb_for_rel_hum``: leaving dry bulb of a sensible (dry)
+  heating or cooling coil for a target RH
+- ``coil_adp_for_rel_hum``: apparatus dew point of a ``cooling_coil`` with a
+  given bypass factor for a target leaving RH
+- ``state_from_enthalpy_rel_hum``: the state with a given enthalpy and RH
+
+Problems that are linear in the unknown are solved in closed form. The rest
+use ``find_root``, a bracketed root finder that iterates every problem at
+once, so thousands of targets cost a few dozen array evaluations.
+Problems without a solution in range return NaN.
+
+Units follow psychro_engine: temperatures in °C, pressures in Pa, relative
+humidity in [0, 1], humidity ratio in kg_v/kg_a and enthalpy in J/kg of dry
+air. Streams are ``process_chain.AirStream``; their fields may be arrays.
+"""
+import numpy as np
+
+import psychro_engine as engine
+from process_chain import cooling_coil
+
+DRY_BULB = 'dry_bulb'
+HUM_RATIO = 'hum_ratio'
+ENTHALPY = 'enthalpy'
+REL_HUM = 'rel_hum'
+MIX_TARGETS = (DRY_BULB, HUM_RATIO, ENTHALPY, REL_HUM)
+# Convergence of mixing fractions (0 to 1)
+FRACTION_TOLERANCE = 1e-6
+# Relative difference within which a mix counts as reaching its target
+# without solving, e.g. for equal streams
+TARGET_TOLERANCE = 1e-9
+# Parts of [0, 1] scanned for a sign change when solving a mix for RH
+MIX_SAMPLES = 16
+# Lowest apparatus dew point searched by coil_adp_for_rel_hum (°C)
+MIN_APPARATUS_DEW_POINT = -20.0
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _bracket(func, lo, hi, rows, samples):
+    # First of samples equal parts of [lo, hi], from lo, over which func
+    # changes sign: (a, b, func(a), func(b)), ends NaN where there is none
+    a, fa = lo, func(lo, rows)
+    found_a, found_b = np.full(lo.size, np.nan), np.full(lo.size, np.nan)
+    found_fa, found_fb = np.full(lo.size, np.nan), np.full(lo.size, np.nan)
+    for k in range(1, samples + 1):
+        b = lo + (hi - lo) * (k / samples)
+        fb = func(b, rows)
+        new = np.isnan(found_a) & np.isfinite(fa) & np.isfinite(fb) & (np.sign(fa) * np.sign(fb) <= 0)
+        found_a[new], found_b[new], found_fa[new], found_fb[new] = a[new], b[new], fa[new], fb[new]
+        a, fa = b, fb
+    return found_a, found_b, found_fa, found_fb
+
+
+def find_root(func, lo, hi, tolerance=engine.PSYCHROLIB_TOLERANCE, max_iter=engine.MAX_ITER_COUNT, samples=1):
+    """Roots of func between lo and hi for many problems at once.
+
+    func(x, rows) returns the function of problems rows (indices into the
+    flattened lo/hi) at x. Regula falsi with the Illinois modification keeps
+    each root bracketed while converging superlinearly; steps that leave the
+    bracket fall back to bisection. Converged problems leave the working
+    set. Problems without a sign change (or with non-finite values) get NaN.
+
+    func need not be monotone if samples > 1: the range is split into that
+    many equal parts and the first part from lo with a sign change is
+    searched, so the root nearest lo is found if the parts are fine enough.
+    """
+    lo, hi = np.broadcast_arrays(_as_float(lo), _as_float(hi))
+    shape = lo.shape
+    rows = np.arange(lo.size)
+    root = np.full(lo.size, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        a, b, fa, fb = _bracket(func, lo.ravel(), hi.ravel(), rows, samples)
+        root[fa == 0] = a[fa == 0]
+        root[fb == 0] = b[fb == 0]
+        bracketed = np.sign(fa) * np.sign(fb) < 0
+        active = np.flatnonzero(bracketed)
+        a, b, fa, fb = a[active], b[active], fa[active], fb[active]
+        # Which end the last step replaced: 1 for a, -1 for b
+        side = np.zeros(active.size, dtype=np.int8)
+        for _ in range(max_iter):
+            if active.size == 0:
+                break
+            x = (a * fb - b * fa) / (fb - fa)
+            outside = ~((x > np.minimum(a, b)) & (x < np.maximum(a, b)))
+            x = np.where(outside, (a + b) / 2, x)
+            fx = func(x, active)
+            replace_a = np.sign(fx) == np.sign(fa)
+            # Illinois: an end kept twice in a row has its value halved
+            fb = np.where(replace_a & (side == 1), fb / 2, fb)
+            fa = np.where(~replace_a & (side == -1), fa / 2, fa)
+            a = np.where(replace_a, x, a)
+            fa = np.where(replace_a, fx, fa)
+            b = np.where(replace_a, b, x)
+            fb = np.where(replace_a, fb, fx)
+            side = np.where(replace_a, 1, -1).astype(np.int8)
+
+            done = (np.abs(b - a) <= tolerance) | (fx == 0)
+            root[active[done]] = x[done]
+            # A non-finite value mid-bracket leaves no side to keep; give up on it
+            keep = ~done & np.isfinite(fx)
+            active, a, b, fa, fb, side = active[keep], a[keep], b[keep], fa[keep], fb[keep], side[keep]
+        # Problems that never converged
+        root[active] = np.nan
+    return root.reshape(shape)
+
+
+def _mix_arrays(stream1, stream2, fraction):
+    # Flattened, broadcast fields of both streams and the fraction of stream 1
+    arrays = np.broadcast_arrays(
+        _as_float(stream1.dry_bulb), _as_float(stream1.hum_ratio), _as_float(stream1.pressure),
+        _as_float(stream2.dry_bulb), _as_float(stream2.hum_ratio), _as_float(stream2.pressure),
+        _as_float(fraction),
+    )
+    return arrays[0].shape, [a.ravel() for a in arrays]
+
+
+def _mixed(fraction, db1, w1, p1, db2, w2, p2):
+    # Adiabatic mix as process_chain.mix: enthalpy, humidity ratio and
+    # pressure weighted by dry air mass
+    h = fraction * engine.moist_air_enthalpy(db1, w1) + (1 - fraction) * engine.moist_air_enthalpy(db2, w2)
+    w = fraction * w1 + (1 - fraction) * w2
+    p = fraction * p1 + (1 - fraction) * p2
+    return engine.dry_bulb_from_enthalpy_and_hum_ratio(h, w), w, p, h
+
+
+def _reaches(value, target):
+    return np.abs(value - target) <= TARGET_TOLERANCE * np.maximum(np.abs(target), 1e-3)
+
+
+def mixing_fraction(stream1, stream2, target, quantity=DRY_BULB, tolerance=FRACTION_TOLERANCE):
+    """Dry air mass fraction of stream1 (0 to 1) that brings the adiabatic
+    mix of stream1 and stream2 to target.
+
+    quantity is one of MIX_TARGETS. Humidity ratio and enthalpy mix
+    linearly and are solved in closed form; dry bulb and RH are found by
+    find_root. RH can peak mid-mix (where the mixing line bends towards
+    saturation), so it may be reached twice; the smallest fraction is
+    returned. Equal streams reach their own state at any fraction: 0.5 is
+    returned. NaN where no fraction in [0, 1] reaches the target (or the
+    target is the peak itself, which touches but never crosses it).
+    """
+    if quantity not in MIX_TARGETS:
+        raise ValueError(f"Unknown mixing target '{quantity}', expected one of {MIX_TARGETS}")
+    shape, (db1, w1, p1, db2, w2, p2, target) = _mix_arrays(stream1, stream2, target)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if quantity in (HUM_RATIO, ENTHALPY):
+            if quantity == HUM_RATIO:
+                v1, v2 = w1, w2
+            else:
+                v1, v2 = engine.moist_air_enthalpy(db1, w1), engine.moist_air_enthalpy(db2, w2)
+            fraction = (target - v2) / (v1 - v2)
+            # Equal streams reach their own value at any fraction; report an even mix
+            fraction = np.where((v1 == v2) & _reaches(v1, target), 0.5, fraction)
+            fraction = np.where((fraction >= 0) & (fraction <= 1), fraction, np.nan)
+            return fraction.reshape(shape)
+
+    def residual(x, rows):
+        db, w, p, _ = _mixed(x, db1[rows], w1[rows], p1[rows], db2[rows], w2[rows], p2[rows])
+        if quantity == DRY_BULB:
+            return db - target[rows]
+        return engine.rel_hum_from_hum_ratio(db, w, p) - target[rows]
+
+    samples = MIX_SAMPLES if quantity == REL_HUM else 1
+    lo, hi = np.zeros_like(target), np.ones_like(target)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = find_root(residual, lo, hi, tolerance, samples=samples)
+        # An end already at the target can sit just off it on the same side
+        # as the other end, leaving no sign change to bracket: equal streams
+        # (any fraction, as above) or a target met by one stream alone
+        rows = np.arange(target.size)
+        values = [residual(x, rows) + target for x in (lo, hi)]
+        equal = (db1 == db2) & (w1 == w2) & (p1 == p2)
+        at_lo, at_hi = (np.isnan(fraction) & _reaches(value, target) for value in values)
+        fraction = np.where(at_hi, 1.0, fraction)
+        fraction = np.where(at_lo, 0.0, fraction)
+        fraction = np.where(equal & at_lo, 0.5, fraction)
+    return fraction.reshape(shape)
+
+
+def leaving_dry_bulb_for_rel_hum(stream, rel_hum):
+    """Leaving dry bulb (°C) at which sensible heating or cooling, at
+    constant humidity ratio, brings stream to rel_hum.
+
+    Saturation pressure at the answer is the stream's vapor pressure over
+    rel_hum, inverted with the engine's Newton dew point solver. NaN for
+    rel_hum above 1 (that needs condensation, see coil_adp_for_rel_hum) or
+    out of range.
+    """
+    rel_hum = _as_float(rel_hum)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vap_pres = engine.vap_pres_from_hum_ratio(stream.hum_ratio, stream.pressure)
+        sat_pres = np.where((rel_hum > 0) & (rel_hum <= 1), vap_pres / rel_hum, np.nan)
+        return engine.dew_point_from_vap_pres(engine.T_MAX, sat_pres)
+
+
+def coil_adp_for_rel_hum(stream, rel_hum, bypass_factor, tolerance=engine.PSYCHROLIB_TOLERANCE):
+    """Apparatus dew point (°C) at which process_chain.cooling_coil with
+    bypass_factor leaves stream at rel_hum.
+
+    Searched between MIN_APPARATUS_DEW_POINT and the entering dew point, so
+    the coil is wet; ``cooling_coil(stream, adp, bypass_factor)`` gives the
+    leaving air. NaN where no apparatus dew point in that range reaches
+    rel_hum.
+    """
+    arrays = np.broadcast_arrays(
+        _as_float(stream.dry_bulb), _as_float(stream.hum_ratio), _as_float(stream.pressure),
+        _as_float(rel_hum), _as_float(bypass_factor),
+    )
+    shape = arrays[0].shape
+    db, w, p, target, bf = [a.ravel() for a in arrays]
+    with np.errstate(invalid='ignore'):
+        dew_point = engine.dew_point_from_hum_ratio(db, w, p)
+
+    def residual(adp, rows):
+        leaving = cooling_coil(stream._replace(dry_bulb=db[rows], hum_ratio=w[rows], pressure=p[rows]), adp, bf[rows])
+        return engine.rel_hum_from_hum_ratio(leaving.dry_bulb, leaving.hum_ratio, p[rows]) - target[rows]
+
+    lo = np.full_like(db, MIN_APPARATUS_DEW_POINT)
+    return find_root(residual, lo, np.maximum(dew_point, lo), tolerance).reshape(shape)
+
+
+def state_from_enthalpy_rel_hum(enthalpy, rel_hum, pressure, tolerance=engine.PSYCHROLIB_TOLERANCE):
+    """Every property (see psychro_engine.solve_states) of the state with a
+    moist air enthalpy (J/kg) and relative humidity (0 to 1).
+
+    Enthalpy rises with dry bulb along a line of constant RH, so the dry
+    bulb is found by find_root between T_MIN and the temperature where the
+    vapor pressure would reach the total pressure. NaN where no state has
+    both values.
+    """
+    enthalpy, rel_hum, pressure = np.broadcast_arrays(_as_float(enthalpy), _as_float(rel_hum), _as_float(pressure))
+    shape = enthalpy.shape
+    h, rh, p = enthalpy.ravel(), rel_hum.ravel(), pressure.ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rh = np.where((rh > 0) & (rh <= 1), rh, np.nan)
+        # Highest dry bulb at which rh * saturation pressure stays below the total pressure
+        limit = np.minimum(0.999 * p / rh, engine.sat_vap_pres(engine.T_MAX))
+        hi = engine.dew_point_from_vap_pres(engine.T_MAX, limit)
+
+    def residual(t, rows):
+        w = engine.hum_ratio_from_rel_hum(t, rh[rows], p[rows])
+        return engine.moist_air_enthalpy(t, w) - h[rows]
+
+    dry_bulb = find_root(residual, np.full_like(h, engine.T_MIN), hi, tolerance)
+    with np.errstate(invalid='ignore'):
+        hum_ratio = engine.hum_ratio_from_rel_hum(dry_bulb, rh, p)
+    states = engine.solve_states(dry_bulb, hum_ratio, p, engine.HUM_RATIO)
+    return {key: value.reshape(shape) for key, value in states.items()}
@@ -0,0 +1,124 @@
+"""Multi-core batch evaluation on top of psychro_calc.solve_batch.
+
+Input and output columns live in shared memory blocks. Workers get only the
+block names and a row range, solve that range in place and return nothing,
+so no row data is pickled and the output keeps the input order.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from psychro_calc import BATCH_COLUMNS, solve_batch
+
+# Upper bound on rows per task, so large batches are spread evenly over workers
+SHARD_SIZE = 250_000
+# Below this many rows per worker, the pool overhead outweighs the gain
+MIN_ROWS_PER_WORKER = 20_000
+
+_INPUTS = 3
+_OUTPUTS = len(BATCH_COLUMNS)
+
+
+def default_workers():
+    """Number of CPUs available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _shards(n, workers):
+    # Row ranges [start, stop) covering 0..n
+    count = max(workers, -(-n // SHARD_SIZE))
+    bounds = np.linspace(0, n, count + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def make_executor(workers=None):
+    """Process pool suitable for solve_batch_parallel.
+
+    The resource tracker is started first so the workers share the parent's
+    tracker; otherwise each worker would track (and try to unlink) the
+    shared blocks it attaches to.
+    """
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers=workers or default_workers())
+
+
+def _attach(name):
+    # The parent owns the block and unlinks it when done
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _solve_shard(in_name, out_name, n, start, stop, humidity_method, fast):
+    # Runs in a worker: attach to the shared blocks and solve rows start:stop
+    shm_in = _attach(in_name)
+    shm_out = _attach(out_name)
+    try:
+        inputs = np.ndarray((_INPUTS, n), dtype=np.float64, buffer=shm_in.buf)
+        outputs = np.ndarray((_OUTPUTS, n), dtype=np.float64, buffer=shm_out.buf)
+        dry_bulb, humidity_value, pressure = inputs[:, start:stop]
+        props = solve_batch(dry_bulb, humidity_method, humidity_value, pressure, fast)
+        for row, key in enumerate(BATCH_COLUMNS):
+            outputs[row, start:stop] = props[key]
+        del inputs, outputs, dry_bulb, humidity_value, pressure
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+def solve_batch_parallel(dry_bulb, humidity_method, humidity_value, pressure, workers=None, executor=None,
+                         fast=False):
+    """Process-pool version of psychro_calc.solve_batch.
+
+    Same arguments and result as solve_batch. workers defaults to every
+    available CPU; pass an existing ProcessPoolExecutor as executor to reuse
+    its processes across calls. Small batches are solved in-process.
+    """
+    dry_bulb, humidity_value, pressure = np.broadcast_arrays(
+        np.asarray(dry_bulb, dtype=np.float64),
+        np.asarray(humidity_value, dtype=np.float64),
+        np.asarray(pressure, dtype=np.float64),
+    )
+    shape = dry_bulb.shape
+    n = dry_bulb.size
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, n // MIN_ROWS_PER_WORKER))
+    if workers == 1:
+        return solve_batch(dry_bulb, humidity_method, humidity_value, pressure, fast)
+
+    shm_in = shared_memory.SharedMemory(create=True, size=_INPUTS * n * 8)
+    shm_out = shared_memory.SharedMemory(create=True, size=_OUTPUTS * n * 8)
+    try:
+        inputs = np.ndarray((_INPUTS, n), dtype=np.float64, buffer=shm_in.buf)
+        inputs[0] = dry_bulb.ravel()
+        inputs[1] = humidity_value.ravel()
+        inputs[2] = pressure.ravel()
+        own_executor = executor is None
+        if own_executor:
+            executor = make_executor(workers)
+        try:
+            futures = [
+                executor.submit(_solve_shard, shm_in.name, shm_out.name, n, start, stop, humidity_method, fast)
+                for start, stop in _shards(n, workers)
+            ]
+            for future in futures:
+                future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+        outputs = np.ndarray((_OUTPUTS, n), dtype=np.float64, buffer=shm_out.buf)
+        result = {key: outputs[row].reshape(shape).copy() for row, key in enumerate(BATCH_COLUMNS)}
+        del inputs, outputs
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+    return result
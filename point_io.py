@@ -0,0 +1,314 @@
+"""Export and import of the app's points in JSON, NDJSON and Parquet.
+
+Exports are built only when asked for (the app passes a callable to
+``st.download_button``). Besides the original indented JSON there is
+compact JSON, NDJSON (an optional ``{"point_counter": N}`` header line, then
+one point per line) and Parquet (one column per point field, the counter in
+the schema metadata; needs pyarrow).
+
+Imports are streamed: ``PointReader`` decodes one point at a time from the
+uploaded file, checks it and converts it to a compact ``Point`` record, so a
+large file is never held as decoded text plus a tree of dicts. The first
+bad point stops the import with its index in the error.
+"""
+import codecs
+import json
+import math
+import os
+import re
+
+from point_store import NUMERIC_FIELDS, Point
+
+# label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'JSON': ('.json', 'application/json'),
+    'JSON (compact)': ('.json', 'application/json'),
+    'NDJSON': ('.ndjson', 'application/x-ndjson'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+IMPORT_TYPES = ('json', 'ndjson', 'jsonl', 'parquet')
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+# Bytes decoded per read when streaming JSON, rows per Parquet batch
+READ_CHUNK_SIZE = 1 << 20
+PARQUET_BATCH_ROWS = 10_000
+# Points between progress callbacks in read_points
+PROGRESS_EVERY = 5000
+POINT_TYPES = ('input', 'mixed')
+_REQUIRED_INPUT = ('dry_bulb', 'rel_hum')
+_REQUIRED_MIXED = ('source1', 'source2', 'ratio1', 'ratio2')
+_STRINGS = ('color', 'connects_to', 'source1', 'source2')
+# bool is excluded on purpose: true/false are not temperatures
+_NUMBER_TYPES = (int, float)
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def export_formats():
+    """Labels of the export formats usable here (Parquet only with pyarrow)."""
+    try:
+        _pyarrow()
+    except RuntimeError:
+        return [label for label in EXPORT_FORMATS if label != 'Parquet']
+    return list(EXPORT_FORMATS)
+
+
+def export_points(points, point_counter, fmt='JSON'):
+    """The points and the app's point counter as file contents (bytes)."""
+    if fmt == 'JSON':
+        records = [p.to_dict() for p in points]
+        return json.dumps({'points_data': records, 'point_counter': point_counter}, indent=2).encode()
+    if fmt == 'JSON (compact)':
+        records = [p.to_dict() for p in points]
+        return json.dumps({'points_data': records, 'point_counter': point_counter}, separators=(',', ':')).encode()
+    if fmt == 'NDJSON':
+        lines = [json.dumps({'point_counter': point_counter})]
+        lines.extend(json.dumps(p.to_dict(), separators=(',', ':')) for p in points)
+        return ('\n'.join(lines) + '\n').encode()
+    if fmt == 'Parquet':
+        return _export_parquet(points, point_counter)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _export_parquet(points, point_counter):
+    pa = _pyarrow()
+    columns = {
+        field: pa.array([getattr(p, field) for p in points],
+                        type=pa.float64() if field in NUMERIC_FIELDS else pa.string())
+        for field in Point.__slots__
+    }
+    table = pa.table(columns).replace_schema_metadata({'point_counter': str(point_counter)})
+    sink = pa.BufferOutputStream()
+    pa.parquet.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def _format_of(name):
+    extension = os.path.splitext(str(name))[1].lower()
+    if extension in NDJSON_EXTENSIONS:
+        return 'ndjson'
+    if extension in PARQUET_EXTENSIONS:
+        return 'parquet'
+    return 'json'
+
+
+def check_point(data, index):
+    """Raise ValueError if an imported point dict is malformed."""
+    if not isinstance(data, dict):
+        raise ValueError(f"point {index}: expected an object, got {type(data).__name__}")
+    name = data.get('name')
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"point {index}: missing name")
+    point_type = data.get('type', 'input')
+    if point_type not in POINT_TYPES:
+        raise ValueError(f"point {index} ({name}): unknown type {point_type!r}")
+    # Mixed points are re-solved from their sources, so their state may be unset
+    required = _REQUIRED_MIXED if point_type == 'mixed' else _REQUIRED_INPUT
+    for field in required:
+        if data.get(field) is None:
+            raise ValueError(f"point {index} ({name}): missing {field}")
+    for field in NUMERIC_FIELDS:
+        value = data.get(field)
+        if value is not None and (type(value) not in _NUMBER_TYPES or not math.isfinite(value)):
+            raise ValueError(f"point {index} ({name}): {field} must be a number, got {value!r}")
+    for field in _STRINGS:
+        value = data.get(field)
+        if value is not None and type(value) is not str:
+            raise ValueError(f"point {index} ({name}): {field} must be a string, got {value!r}")
+
+
+class _JSONStream:
+    # Decodes one JSON value at a time from a binary file, reading and
+    # UTF-8 decoding it in chunks as the values are consumed
+
+    def __init__(self, source, chunk_size=READ_CHUNK_SIZE):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.source.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """Next non-whitespace character, '' at the end of the file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON: expected {' or '.join(repr(c) for c in chars)} "
+                             f"near byte {self.bytes_read}, got {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # A number or literal at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+class PointReader:
+    """Iterate over the checked Point records of an exported points file.
+
+    source is a path or a binary file object (e.g. a Streamlit upload); fmt
+    ('json', 'ndjson' or 'parquet') overrides detection by file name.
+    Points without a pressure (files from before points stored one) get
+    pressure (kPa) if given. The point counter, if the file has one, is set
+    once iteration has finished.
+    """
+
+    def __init__(self, source, fmt=None, pressure=None):
+        self.source = source
+        self.fmt = fmt or _format_of(getattr(source, 'name', source))
+        self.pressure = pressure
+        self.point_counter = None
+        self.count = 0
+        self._size = None
+        self._done = 0
+
+    def __iter__(self):
+        if isinstance(self.source, (str, os.PathLike)):
+            with open(self.source, 'rb') as f:
+                yield from self._points(f)
+        else:
+            yield from self._points(self.source)
+
+    def _points(self, f):
+        names = set()
+        records = {'json': self._json, 'ndjson': self._ndjson, 'parquet': self._parquet}[self.fmt](f)
+        for data in records:
+            check_point(data, self.count)
+            if data['name'] in names:
+                raise ValueError(f"point {self.count}: duplicate name '{data['name']}'")
+            names.add(data['name'])
+            self.count += 1
+            point = Point.from_dict(data)
+            if point.pressure is None:
+                point.pressure = self.pressure
+            yield point
+        counter = self.point_counter
+        if counter is not None and (type(counter) is not int or counter < 1):
+            raise ValueError(f"point_counter must be a positive integer, got {counter!r}")
+
+    @property
+    def progress(self):
+        """Share of the file read so far, 0 to 1."""
+        if not self._size:
+            return 0.0
+        return min(self._done / self._size, 1.0)
+
+    def _measure(self, f):
+        try:
+            position = f.tell()
+            self._size = f.seek(0, os.SEEK_END) - position
+            f.seek(position)
+        except (AttributeError, OSError):
+            self._size = None
+
+    def _json(self, f):
+        self._measure(f)
+        stream = _JSONStream(f)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == 'points_data':
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield stream.value()
+                        self._done = stream.bytes_read
+                        if stream.expect(',]') == ']':
+                            break
+            elif key == 'point_counter':
+                self.point_counter = stream.value()
+            else:
+                stream.value()
+            if stream.expect(',}') == '}':
+                break
+        self._done = self._size or 0
+
+    def _ndjson(self, f):
+        self._measure(f)
+        for line_number, line in enumerate(f, 1):
+            self._done += len(line)
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line_number}: {e}") from None
+            if isinstance(data, dict) and 'name' not in data and 'point_counter' in data:
+                self.point_counter = data['point_counter']
+                continue
+            yield data
+
+    def _parquet(self, f):
+        pa = _pyarrow()
+        parquet_file = pa.parquet.ParquetFile(f)
+        metadata = parquet_file.schema_arrow.metadata or {}
+        if b'point_counter' in metadata:
+            self.point_counter = int(metadata[b'point_counter'])
+        self._size = parquet_file.metadata.num_rows
+        fields = [field for field in Point.__slots__ if field in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=fields):
+            for data in batch.to_pylist():
+                self._done += 1
+                yield {field: value for field, value in data.items() if value is not None}
+
+
+def read_points(source, fmt=None, progress=None, pressure=None):
+    """Read a whole points file. Returns (list of Point, point counter).
+
+    progress, if given, is called with the share of the file read every
+    PROGRESS_EVERY points. Files without a counter get one past the number
+    of points, so new points don't reuse imported names. pressure is as for
+    PointReader.
+    """
+    reader = PointReader(source, fmt, pressure)
+    points = []
+    for point in reader:
+        points.append(point)
+        if progress is not None and len(points) % PROGRESS_EVERY == 0:
+            progress(reader.progress)
+    counter = reader.point_counter if reader.point_counter is not None else len(points) + 1
+    return points, counter
@@ -0,0 +1,320 @@
+"""Point records, name index and mixing dependency graph for the app's points.
+
+``st.session_state.points_data`` holds compact ``Point`` records (``__slots__``,
+interned names and colours) that keep the dict-style access the app uses,
+e.g. ``point['dry_bulb']`` and ``point.get('pressure', default)``. The store
+indexes them by name, tracks which mixed points use which sources, only
+re-solves a mixed point when its inputs have changed, and gives NumPy
+columns of the numeric fields for vectorized work.
+
+The JSON export format is unchanged: ``Point.to_dict`` writes the same keys
+the app always has, and ``Point.from_dict`` reads old files.
+"""
+import sys
+
+import numpy as np
+
+from process_chain import AirStream, mix
+from state_memo import PRESSURE_QUANTUM, RATIO_QUANTUM, REL_HUM_QUANTUM, TEMPERATURE_QUANTUM, memoize
+
+SOURCE_KEYS = ('source1', 'source2')
+# Exported keys per point type, in the app's original order
+INPUT_FIELDS = ('name', 'type', 'dry_bulb', 'rel_hum', 'wet_bulb', 'color', 'connects_to', 'pressure')
+MIXED_FIELDS = (
+    'name', 'type', 'source1', 'source2', 'ratio1', 'ratio2', 'color', 'connects_to',
+    'dry_bulb', 'rel_hum', 'wet_bulb', 'pressure',
+)
+NUMERIC_FIELDS = ('dry_bulb', 'rel_hum', 'wet_bulb', 'pressure', 'ratio1', 'ratio2')
+# Fields exported even when unset (null in JSON)
+ALWAYS_EXPORTED = ('connects_to',)
+_STRING_FIELDS = ('name', 'type', 'color', 'connects_to', 'source1', 'source2')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Point:
+    """One plotted condition, readable and writable like the dict it replaces.
+
+    Unset fields are None and behave as missing keys: ``'pressure' in point``
+    is False and ``point.get('pressure', default)`` returns default.
+    """
+
+    __slots__ = ('name', 'type', 'dry_bulb', 'rel_hum', 'wet_bulb', 'color', 'connects_to', 'pressure',
+                 'source1', 'source2', 'ratio1', 'ratio2')
+
+    def __init__(self, name, type='input', **fields):
+        for field in self.__slots__:
+            object.__setattr__(self, field, None)
+        self.name = name
+        self.type = type
+        for field, value in fields.items():
+            self[field] = value
+
+    def __setattr__(self, field, value):
+        object.__setattr__(self, field, _intern(value) if field in _STRING_FIELDS else value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record from an exported point dict; unknown keys are ignored."""
+        if 'name' not in data:
+            raise TypeError("Point needs a name")
+        # Fills the slots directly: imports build one record per point
+        point = object.__new__(cls)
+        for field in cls.__slots__:
+            value = data.get(field)
+            object.__setattr__(point, field, sys.intern(value) if type(value) is str else value)
+        if point.type is None:
+            object.__setattr__(point, 'type', 'input')
+        return point
+
+    def to_dict(self):
+        fields = MIXED_FIELDS if self.type == 'mixed' else INPUT_FIELDS
+        return {
+            f: getattr(self, f) for f in fields
+            if getattr(self, f) is not None or f in ALWAYS_EXPORTED
+        }
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field):
+        return field in self.__slots__ and getattr(self, field) is not None
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def __eq__(self, other):
+        if isinstance(other, Point):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Point({self.to_dict()!r})"
+
+
+@memoize(*(TEMPERATURE_QUANTUM, REL_HUM_QUANTUM, PRESSURE_QUANTUM, RATIO_QUANTUM) * 2)
+def mixed_state(dry_bulb1, rel_hum1, pressure1, ratio1, dry_bulb2, rel_hum2, pressure2, ratio2):
+    """Adiabatic mix of two streams given as dry bulb (°C), RH (%), pressure
+    (kPa) and dry air mass ratio (%).
+
+    Returns (dry_bulb, rel_hum, wet_bulb, pressure) rounded as stored on
+    mixed points, or None if the mix has no valid state. Memoized across
+    sessions, see state_memo.
+    """
+    mixed = mix(
+        AirStream.from_input(dry_bulb1, rel_hum1 / 100, pressure1 * 1000, ratio1 / 100),
+        AirStream.from_input(dry_bulb2, rel_hum2 / 100, pressure2 * 1000, ratio2 / 100),
+    )
+    state = mixed.states()
+    if np.isnan(state['wet_bulb']):
+        return None
+    return (
+        round(float(state['dry_bulb']), 1),
+        round(float(state['rel_hum']) * 100, 1),
+        round(float(state['wet_bulb']), 1),
+        round(float(state['pressure']) / 1000, 3),
+    )
+
+
+class PointStore:
+    """Index over a list of Point records, kept in sync through its methods.
+
+    Point dicts in the list (e.g. from a JSON import) are converted to
+    records in place, so the list object stays the same.
+    """
+
+    def __init__(self, points):
+        for i, point in enumerate(points):
+            if not isinstance(point, Point):
+                points[i] = Point.from_dict(point)
+        self.points = points
+        self._by_name = {p['name']: p for p in points}
+        # source name -> names of mixed points using it
+        self._dependents = {}
+        # mixed point name -> inputs of its last evaluation
+        self._signatures = {}
+        for point in points:
+            self._link(point)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def names(self, point_type=None):
+        """Point names in list order, optionally only one type."""
+        return [p['name'] for p in self.points if point_type is None or p.get('type', 'input') == point_type]
+
+    def _link(self, point):
+        for key in SOURCE_KEYS:
+            if point.get(key) is not None:
+                self._dependents.setdefault(point[key], set()).add(point['name'])
+
+    def _unlink(self, point):
+        for key in SOURCE_KEYS:
+            users = self._dependents.get(point.get(key))
+            if users is not None:
+                users.discard(point['name'])
+
+    def add(self, point):
+        """Append a Point or point dict. Returns the stored record."""
+        if not isinstance(point, Point):
+            point = Point.from_dict(point)
+        if point.name in self._by_name:
+            raise ValueError(f"Point name '{point.name}' already exists")
+        self.points.append(point)
+        self._by_name[point.name] = point
+        self._link(point)
+        return point
+
+    def column(self, field, point_type=None):
+        """One field of every point (optionally of one type) as an array.
+
+        Numeric fields are float64 with NaN where unset; other fields are
+        object arrays.
+        """
+        points = self.points if point_type is None else [p for p in self.points if p.type == point_type]
+        if field in NUMERIC_FIELDS:
+            # None converts to NaN
+            return np.array([getattr(p, field) for p in points], dtype=np.float64)
+        return np.array([getattr(p, field) for p in points], dtype=object)
+
+    def to_records(self):
+        """Points as plain dicts in the JSON export format."""
+        return [p.to_dict() for p in self.points]
+
+    def remove(self, name):
+        """Delete a point and drop connectors that pointed at it."""
+        point = self._by_name.pop(name)
+        del self.points[next(i for i, p in enumerate(self.points) if p is point)]
+        self._unlink(point)
+        self._signatures.pop(name, None)
+        for other in self.points:
+            if other.get('connects_to') == name:
+                other['connects_to'] = None
+
+    def rename(self, old, new):
+        """Rename a point and every source1/source2/connects_to reference to it."""
+        if new in self._by_name:
+            raise ValueError(f"Point name '{new}' already exists")
+        point = self._by_name.pop(old)
+        self._unlink(point)
+        point['name'] = new
+        self._by_name[new] = point
+        self._link(point)
+        if old in self._signatures:
+            self._signatures[new] = self._signatures.pop(old)
+        users = self._dependents.pop(old, set())
+        for user in users:
+            mixed = self._by_name[user]
+            for key in SOURCE_KEYS:
+                if mixed.get(key) == old:
+                    mixed[key] = new
+        if users:
+            self._dependents[new] = users
+        for other in self.points:
+            if other.get('connects_to') == old:
+                other['connects_to'] = new
+
+    def set_sources(self, name, source1, source2):
+        """Point a mixed point at new sources."""
+        point = self._by_name[name]
+        self._unlink(point)
+        point['source1'] = source1
+        point['source2'] = source2
+        self._link(point)
+
+    def _in_order(self, names):
+        # Sort mixed point names so that sources come before their users
+        names = set(names)
+        order = []
+        done = set()
+
+        def visit(name):
+            if name in done:
+                return
+            done.add(name)
+            for key in SOURCE_KEYS:
+                source = self._by_name[name].get(key)
+                if source in names:
+                    visit(source)
+            order.append(name)
+
+        for point in self.points:
+            if point['name'] in names:
+                visit(point['name'])
+        return order
+
+    def dependents(self, name):
+        """Names of mixed points downstream of a point, sources before users."""
+        found = set()
+        stack = [name]
+        while stack:
+            for user in self._dependents.get(stack.pop(), ()):
+                if user not in found:
+                    found.add(user)
+                    stack.append(user)
+        return self._in_order(found)
+
+    def refresh_mixed(self, point, pressure_pa):
+        """Re-solve a mixed point if its sources, ratios or pressures changed.
+
+        Each source is taken at its own pressure (kPa in the point dict),
+        falling back to pressure_pa (Pa). The ratios are dry air mass
+        fractions. Returns True when the point was recalculated.
+        """
+        sources = [self._by_name.get(point[key]) for key in SOURCE_KEYS]
+        if not all(source and 'dry_bulb' in source for source in sources):
+            return False
+        pressures = [source.get('pressure', pressure_pa / 1000) * 1000 for source in sources]
+        ratios = (point['ratio1'], point['ratio2'])
+        signature = tuple((s['dry_bulb'], s['rel_hum']) for s in sources) + (ratios, tuple(pressures))
+        if self._signatures.get(point['name']) == signature:
+            return False
+
+        (source1, source2), (pressure1, pressure2) = sources, pressures
+        state = mixed_state(
+            source1['dry_bulb'], source1['rel_hum'], pressure1 / 1000, ratios[0],
+            source2['dry_bulb'], source2['rel_hum'], pressure2 / 1000, ratios[1],
+        )
+        if state is None:
+            return False
+
+        # Update point data
+        point['dry_bulb'], point['rel_hum'], point['wet_bulb'], point['pressure'] = state
+        self._signatures[point['name']] = signature
+        return True
+
+    def refresh(self, pressure_pa, changed=None):
+        """Re-solve mixed points, sources before users.
+
+        With changed (an iterable of point names) only the points downstream
+        of those are visited. Returns the names that were recalculated.
+        """
+        if changed is None:
+            names = self._in_order(p['name'] for p in self.points if p.get('type') == 'mixed')
+        else:
+            downstream = set()
+            for name in changed:
+                downstream.update(self.dependents(name))
+            names = self._in_order(downstream)
+        return [name for name in names if self.refresh_mixed(self._by_name[name], pressure_pa)]
@@ -0,0 +1,177 @@
+"""Air-handling processes and process chains on arrays of states.
+
+Every process takes an ``AirStream`` and returns the leaving stream. Stream
+fields may be scalars or NumPy arrays, e.g. one entry per hour of an
+8760-hour weather year, so an annual AHU simulation costs a handful of array
+operations per process rather than a Python loop over hours.
+
+Units follow psychro_engine: temperatures in °C, pressures in Pa, humidity
+ratio in kg_v/kg_a, enthalpy in J/kg of dry air. Mass flows are kg/s of dry
+air, so loads come out in W.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import psychro_engine as engine
+
+# Enthalpy of the steam injected by a steam humidifier, saturated at 100 °C (J/kg)
+STEAM_ENTHALPY = 2676e3
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+class AirStream(namedtuple('AirStream', 'dry_bulb hum_ratio pressure mass_flow')):
+    """Moist air stream: dry bulb (°C), humidity ratio, pressure (Pa) and dry air mass flow (kg/s)."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_input(cls, dry_bulb, humidity, pressure, mass_flow=1.0, method=engine.REL_HUM):
+        """Stream from dry bulb and any humidity input accepted by psychro_engine."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hum_ratio = engine.hum_ratio_from_input(dry_bulb, humidity, pressure, method)
+        return cls(_as_float(dry_bulb), hum_ratio, _as_float(pressure), _as_float(mass_flow))
+
+    @property
+    def enthalpy(self):
+        return engine.moist_air_enthalpy(self.dry_bulb, self.hum_ratio)
+
+    def states(self):
+        """Every property of the app's properties table, see psychro_engine.solve_states."""
+        return engine.solve_states(self.dry_bulb, self.hum_ratio, self.pressure, engine.HUM_RATIO)
+
+
+def _from_enthalpy(stream, enthalpy, hum_ratio):
+    return stream._replace(
+        dry_bulb=engine.dry_bulb_from_enthalpy_and_hum_ratio(enthalpy, hum_ratio), hum_ratio=hum_ratio
+    )
+
+
+def mix(*streams):
+    """Adiabatic mixing of any number of streams.
+
+    Enthalpy, humidity ratio and pressure are weighted by dry air mass flow;
+    the leaving mass flow is the total.
+    """
+    if not streams:
+        raise ValueError("mix needs at least one stream")
+    mass_flow = sum(s.mass_flow for s in streams)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hum_ratio = sum(s.mass_flow * s.hum_ratio for s in streams) / mass_flow
+        enthalpy = sum(s.mass_flow * s.enthalpy for s in streams) / mass_flow
+        pressure = sum(s.mass_flow * s.pressure for s in streams) / mass_flow
+        dry_bulb = engine.dry_bulb_from_enthalpy_and_hum_ratio(enthalpy, hum_ratio)
+    return AirStream(dry_bulb, hum_ratio, pressure, _as_float(mass_flow))
+
+
+def mix_with(stream, other, fraction):
+    """Mix in another stream (e.g. return air) at a mass fraction of the leaving flow.
+
+    The leaving mass flow stays that of stream, so a chain keeps its supply
+    flow however the fraction varies (economizer control).
+    """
+    fraction = _as_float(fraction)
+    mixed = mix(
+        stream._replace(mass_flow=stream.mass_flow * (1 - fraction)),
+        other._replace(mass_flow=stream.mass_flow * fraction),
+    )
+    return mixed._replace(pressure=stream.pressure)
+
+
+def sensible(stream, dry_bulb):
+    """Sensible heating or cooling to a leaving dry bulb at constant humidity ratio.
+
+    Condensation is not modelled; use cooling_coil below the dew point.
+    """
+    return stream._replace(dry_bulb=np.broadcast_to(_as_float(dry_bulb), np.shape(stream.dry_bulb)).copy())
+
+
+def heating_coil(stream, setpoint):
+    """Heat to a leaving dry bulb setpoint; air already warmer passes through."""
+    return stream._replace(dry_bulb=np.maximum(stream.dry_bulb, setpoint))
+
+
+def cooling_coil(stream, apparatus_dew_point, bypass_factor):
+    """Cooling coil described by its apparatus dew point (ADP) and bypass factor.
+
+    Leaving air lies on the line from the entering state to saturation at the
+    ADP, bypass_factor of the way back towards the entering state. Where the
+    ADP is above the entering dew point the coil runs dry (sensible cooling
+    only), and air already below the ADP passes through.
+    """
+    adp = _as_float(apparatus_dew_point)
+    bypass_factor = _as_float(bypass_factor)
+    with np.errstate(invalid='ignore'):
+        w_adp = engine.sat_hum_ratio(adp, stream.pressure)
+        dry_bulb = adp + bypass_factor * (stream.dry_bulb - adp)
+        hum_ratio = np.minimum(stream.hum_ratio, w_adp + bypass_factor * (stream.hum_ratio - w_adp))
+        cooling = stream.dry_bulb > adp
+    return stream._replace(
+        dry_bulb=np.where(cooling, dry_bulb, stream.dry_bulb),
+        hum_ratio=np.where(cooling, hum_ratio, stream.hum_ratio),
+    )
+
+
+def steam_humidifier(stream, hum_ratio, steam_enthalpy=STEAM_ENTHALPY):
+    """Inject steam up to a minimum humidity ratio; drier air is humidified, moister air passes.
+
+    The steam's enthalpy is added to the air, which warms it slightly.
+    """
+    w = np.maximum(stream.hum_ratio, hum_ratio)
+    enthalpy = stream.enthalpy + (w - stream.hum_ratio) * steam_enthalpy
+    return _from_enthalpy(stream, enthalpy, w)
+
+
+def adiabatic_humidifier(stream, effectiveness):
+    """Evaporative (spray or wetted media) humidifier with a saturation effectiveness.
+
+    Follows the wet bulb line from the entering state towards saturation at
+    the entering wet bulb; effectiveness 1 leaves the air saturated.
+    """
+    effectiveness = _as_float(effectiveness)
+    with np.errstate(invalid='ignore'):
+        wet_bulb = engine.wet_bulb_from_hum_ratio(stream.dry_bulb, stream.hum_ratio, stream.pressure)
+        w_wet_bulb = engine.sat_hum_ratio(wet_bulb, stream.pressure)
+    return stream._replace(
+        dry_bulb=stream.dry_bulb - effectiveness * (stream.dry_bulb - wet_bulb),
+        hum_ratio=stream.hum_ratio + effectiveness * (w_wet_bulb - stream.hum_ratio),
+    )
+
+
+# Result of one step of a chain; load (W) and moisture (kg/s) added to the air
+ChainStep = namedtuple('ChainStep', 'name stream load moisture')
+
+
+class ProcessChain:
+    """Ordered processes applied to a stream, e.g. the sections of an AHU.
+
+    Each step is (name, process, kwargs) and evaluates
+    ``process(stream, **kwargs)`` on the previous step's leaving stream.
+    """
+
+    def __init__(self, steps=()):
+        self.steps = list(steps)
+
+    def add(self, name, process, **kwargs):
+        self.steps.append((name, process, kwargs))
+        return self
+
+    def __len__(self):
+        return len(self.steps)
+
+    def run(self, stream):
+        """Evaluate every step. Returns a list of ChainStep, one per step.
+
+        For mixing steps load and moisture are what the mixed-in stream brings.
+        """
+        results = []
+        for name, process, kwargs in self.steps:
+            leaving = process(stream, **kwargs)
+            load = leaving.mass_flow * leaving.enthalpy - stream.mass_flow * stream.enthalpy
+            moisture = leaving.mass_flow * leaving.hum_ratio - stream.mass_flow * stream.hum_ratio
+            results.append(ChainStep(name, leaving, load, moisture))
+            stream = leaving
+        return results
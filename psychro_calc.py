@@ -0,0 +1,222 @@
+"""UI-free state solving shared by the Streamlit app and the batch tools.
+
+Pressures are in kPa and relative humidity in % at this level, the same as
+the app's inputs; conversion to psychrolib's Pa and [0, 1] happens here.
+"""
+import numpy as np
+import psychrolib as psy
+
+import psychro_engine as engine
+import psychro_tables
+from state_memo import PRESSURE_QUANTUM, REL_HUM_QUANTUM, TEMPERATURE_QUANTUM, memoize
+
+psy.SetUnitSystem(psy.SI)
+
+# App humidity input labels mapped to engine humidity methods
+HUMIDITY_METHODS = {
+    "Relative Humidity (%)": engine.REL_HUM,
+    "Wet Bulb (°C)": engine.WET_BULB,
+    "Dew Point (°C)": engine.DEW_POINT,
+}
+
+# Fast table mode falls back to exact solving above this many distinct pressures
+MAX_TABLE_PRESSURES = 8
+
+# Columns written by solve_batch, with units
+BATCH_COLUMNS = {
+    'hum_ratio': 'kg_v/kg_a',
+    'rel_hum': '%',
+    'wet_bulb': '°C',
+    'dew_point': '°C',
+    'enthalpy': 'kJ/kg',
+    'specific_volume': 'm³/kg_a',
+    'density': 'kg/m³',
+    'degree_of_saturation': '%',
+    'vapor_pressure': 'kPa',
+}
+
+# Rows of the app's per-point properties table: label and units
+PROPERTY_ROWS = (
+    ("Barometric Pressure", "kPa"),
+    ("Dry Bulb", "°C"),
+    ("Wet Bulb", "°C"),
+    ("Dew Point", "°C"),
+    ("Relative Humidity", "%"),
+    ("Humidity Ratio", "kg_v/kg_a"),
+    ("Enthalpy", "kJ/kg"),
+    ("Specific Volume", "m³/kg_a"),
+    ("Density", "kg/m³"),
+    ("Degree of Saturation", "%"),
+    ("Absolute Humidity", "kg_v/m³"),
+    ("Partial Pressure of Water Vapor", "kPa"),
+    ("Saturation Vapor Pressure", "kPa"),
+)
+
+
+def pressure_from_elevation(elevation):
+    """Barometric pressure (kPa) at an elevation (m), standard atmosphere."""
+    return 101.325 * (1 - 2.25577e-5 * elevation) ** 5.2559
+
+
+# The humidity value is RH (%) or a temperature (°C); both use the same step
+@memoize(TEMPERATURE_QUANTUM, None, REL_HUM_QUANTUM, PRESSURE_QUANTUM)
+def solve_state(dry_bulb, humidity_method, humidity_value, pressure):
+    """Solve a single state with psychrolib (memoized, see state_memo).
+
+    Args:
+        dry_bulb: dry bulb temperature (°C)
+        humidity_method: engine.REL_HUM, engine.WET_BULB or engine.DEW_POINT
+        humidity_value: relative humidity (%), wet bulb (°C) or dew point (°C)
+        pressure: barometric pressure (kPa)
+
+    Returns:
+        dict with hum_ratio, rel_hum (0-1), wet_bulb, dew_point, enthalpy
+        (kJ/kg), specific_volume, density, sat_hum_ratio,
+        degree_of_saturation and vapor_pressure (Pa).
+
+    Raises:
+        ValueError: if psychrolib rejects the inputs, e.g. a wet bulb above
+        the dry bulb.
+    """
+    # Convert pressure from kPa to Pa for PsychroLib
+    pressure_pa = pressure * 1000
+
+    if humidity_method == engine.REL_HUM:
+        rel_hum = humidity_value / 100.0
+        hum_ratio = psy.GetHumRatioFromRelHum(dry_bulb, rel_hum, pressure_pa)
+        wet_bulb = psy.GetTWetBulbFromRelHum(dry_bulb, rel_hum, pressure_pa)
+        dew_point = psy.GetTDewPointFromRelHum(dry_bulb, rel_hum)
+    elif humidity_method == engine.WET_BULB:
+        wet_bulb = humidity_value
+        hum_ratio = psy.GetHumRatioFromTWetBulb(dry_bulb, wet_bulb, pressure_pa)
+        rel_hum = psy.GetRelHumFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
+        dew_point = psy.GetTDewPointFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
+    elif humidity_method == engine.DEW_POINT:
+        dew_point = humidity_value
+        hum_ratio = psy.GetHumRatioFromTDewPoint(dew_point, pressure_pa)
+        rel_hum = psy.GetRelHumFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
+        wet_bulb = psy.GetTWetBulbFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
+    else:
+        raise ValueError(f"Unknown humidity method '{humidity_method}'")
+
+    return {
+        'hum_ratio': hum_ratio,
+        'rel_hum': rel_hum,
+        'wet_bulb': wet_bulb,
+        'dew_point': dew_point,
+        'enthalpy': psy.GetMoistAirEnthalpy(dry_bulb, hum_ratio) / 1000,  # Convert to kJ/kg
+        'specific_volume': psy.GetMoistAirVolume(dry_bulb, hum_ratio, pressure_pa),
+        'density': psy.GetMoistAirDensity(dry_bulb, hum_ratio, pressure_pa),
+        'sat_hum_ratio': psy.GetSatHumRatio(dry_bulb, pressure_pa),
+        'degree_of_saturation': psy.GetDegreeOfSaturation(dry_bulb, hum_ratio, pressure_pa),
+        'vapor_pressure': psy.GetVapPresFromHumRatio(hum_ratio, pressure_pa),
+    }
+
+
+@memoize(TEMPERATURE_QUANTUM, REL_HUM_QUANTUM, PRESSURE_QUANTUM)
+def point_properties(dry_bulb, rel_hum, pressure):
+    """Formatted values of PROPERTY_ROWS for one state, with psychrolib.
+
+    Args:
+        dry_bulb: dry bulb temperature (°C)
+        rel_hum: relative humidity (%)
+        pressure: barometric pressure (kPa)
+
+    Returns:
+        tuple of value strings in PROPERTY_ROWS order. Results are memoized
+        per quantized (dry_bulb, rel_hum, pressure).
+
+    Raises:
+        ValueError: if psychrolib rejects the state.
+    """
+    pressure_pa = pressure * 1000
+    rh = rel_hum / 100
+    hum_ratio = psy.GetHumRatioFromRelHum(dry_bulb, rh, pressure_pa)
+    wet_bulb = psy.GetTWetBulbFromRelHum(dry_bulb, rh, pressure_pa)
+    dew_point = psy.GetTDewPointFromRelHum(dry_bulb, rh)
+    enthalpy = psy.GetMoistAirEnthalpy(dry_bulb, hum_ratio) / 1000
+    volume = psy.GetMoistAirVolume(dry_bulb, hum_ratio, pressure_pa)
+    density = psy.GetMoistAirDensity(dry_bulb, hum_ratio, pressure_pa)
+    vap_pres = psy.GetVapPresFromHumRatio(hum_ratio, pressure_pa) / 1000
+    sat_vap_pres = psy.GetSatVapPres(dry_bulb) / 1000
+    deg_sat = psy.GetDegreeOfSaturation(dry_bulb, hum_ratio, pressure_pa)
+    return (
+        f"{pressure:.3f}",
+        f"{dry_bulb:.2f}",
+        f"{wet_bulb:.2f}",
+        f"{dew_point:.2f}",
+        f"{rel_hum:.2f}",
+        f"{hum_ratio:.6f}",
+        f"{enthalpy:.2f}",
+        f"{volume:.4f}",
+        f"{density:.4f}",
+        f"{deg_sat * 100:.2f}",
+        f"{hum_ratio * density:.6f}",
+        f"{vap_pres:.3f}",
+        f"{sat_vap_pres:.3f}",
+    )
+
+
+@memoize(TEMPERATURE_QUANTUM, TEMPERATURE_QUANTUM, PRESSURE_QUANTUM)
+def rel_hum_from_wet_bulb(dry_bulb, wet_bulb, pressure):
+    """Relative humidity (%) from dry and wet bulb (°C) at pressure (kPa), with psychrolib.
+
+    Raises:
+        ValueError: if the wet bulb is above the dry bulb.
+    """
+    return psy.GetRelHumFromTWetBulb(dry_bulb, wet_bulb, pressure * 1000) * 100
+
+
+def _solve_with_tables(dry_bulb, humidity_value, pressure_pa, humidity_method):
+    # One lookup table per distinct pressure (rounded to 1 Pa)
+    dry_bulb, humidity_value, pressure_pa = np.broadcast_arrays(dry_bulb, humidity_value, pressure_pa)
+    levels, index = np.unique(np.round(pressure_pa), return_inverse=True)
+    if levels.size > MAX_TABLE_PRESSURES:
+        return engine.solve_states(dry_bulb, humidity_value, pressure_pa, humidity_method)
+    if levels.size == 1:
+        table = psychro_tables.get_table(levels[0])
+        return engine.solve_states(dry_bulb, humidity_value, pressure_pa, humidity_method, table=table)
+    index = index.reshape(dry_bulb.shape)
+    states = {key: np.empty(dry_bulb.shape) for key in engine.PROPERTY_KEYS}
+    for level, p in enumerate(levels):
+        rows = index == level
+        part = engine.solve_states(
+            dry_bulb[rows], humidity_value[rows], pressure_pa[rows], humidity_method,
+            table=psychro_tables.get_table(p),
+        )
+        for key in engine.PROPERTY_KEYS:
+            states[key][rows] = part[key]
+    return states
+
+
+def solve_batch(dry_bulb, humidity_method, humidity_value, pressure, fast=False):
+    """Vectorized counterpart of solve_state for arrays of states.
+
+    Inputs use the same units as solve_state (RH in %, pressure in kPa) and
+    may be scalars or arrays. Returns a dict of arrays keyed by
+    BATCH_COLUMNS, in the units listed there. Invalid states are NaN.
+
+    fast=True interpolates dew point and wet bulb from per-pressure lookup
+    tables (see psychro_tables for the error bounds), which pays off when
+    the states share a few fixed pressures.
+    """
+    dry_bulb = np.asarray(dry_bulb, dtype=np.float64)
+    humidity_value = np.asarray(humidity_value, dtype=np.float64)
+    if humidity_method == engine.REL_HUM:
+        humidity_value = humidity_value / 100.0
+    pressure_pa = np.asarray(pressure, dtype=np.float64) * 1000
+    if fast:
+        states = _solve_with_tables(dry_bulb, humidity_value, pressure_pa, humidity_method)
+    else:
+        states = engine.solve_states(dry_bulb, humidity_value, pressure_pa, humidity_method)
+    return {
+        'hum_ratio': states['hum_ratio'],
+        'rel_hum': states['rel_hum'] * 100,
+        'wet_bulb': states['wet_bulb'],
+        'dew_point': states['dew_point'],
+        'enthalpy': states['enthalpy'] / 1000,
+        'specific_volume': states['volume'],
+        'density': states['density'],
+        'degree_of_saturation': states['degree_of_saturation'] * 100,
+        'vapor_pressure': states['vap_pres'] / 1000,
+    }
@@ -0,0 +1,309 @@
+"""Vectorized psychrometric property engine (SI units).
+
+NumPy ports of the psychrolib functions used by the app, so that whole arrays
+of states are solved in one pass instead of one scalar ``psy.Get*`` call per
+property per point. Equations and constants follow psychrolib 2.5 (ASHRAE
+Handbook - Fundamentals 2017, ch. 1) and units match psychrolib in SI mode:
+temperatures in °C, pressures in Pa, relative humidity in [0, 1], enthalpy in
+J/kg of dry air.
+
+Accuracy against psychrolib: the closed-form properties agree to floating
+point round-off. The iterative temperatures (dew point and wet bulb) are
+solved to the same 0.001 °C tolerance psychrolib uses, so they agree within
+``TEMPERATURE_TOLERANCE`` (0.002 °C). Invalid inputs (RH outside [0, 1], wet
+bulb above dry bulb, temperatures outside [-100, 200] °C) give NaN for that
+state rather than raising, so one bad sample does not abort a batch.
+"""
+import numpy as np
+
+ZERO_CELSIUS_AS_KELVIN = 273.15
+# Universal gas constant for dry air (J/kg/K)
+R_DA_SI = 287.042
+TRIPLE_POINT_WATER_SI = 0.01
+FREEZING_POINT_WATER_SI = 0.0
+MIN_HUM_RATIO = 1e-7
+MAX_ITER_COUNT = 100
+# Convergence tolerance of the iterative solvers (°C), same as psychrolib
+PSYCHROLIB_TOLERANCE = 0.001
+# Maximum difference from psychrolib for iterated temperatures (°C)
+TEMPERATURE_TOLERANCE = 2 * PSYCHROLIB_TOLERANCE
+# Range of validity of the saturation pressure equations (°C)
+T_MIN = -100.0
+T_MAX = 200.0
+
+# Humidity input methods accepted by solve_states
+REL_HUM = 'rel_hum'
+WET_BULB = 'wet_bulb'
+DEW_POINT = 'dew_point'
+HUM_RATIO = 'hum_ratio'
+HUMIDITY_METHODS = (REL_HUM, WET_BULB, DEW_POINT, HUM_RATIO)
+
+# Output keys of solve_states, in the order of the app's properties table
+PROPERTY_KEYS = (
+    'pressure',
+    'dry_bulb',
+    'wet_bulb',
+    'dew_point',
+    'rel_hum',
+    'hum_ratio',
+    'enthalpy',
+    'volume',
+    'density',
+    'degree_of_saturation',
+    'absolute_humidity',
+    'vap_pres',
+    'sat_vap_pres',
+)
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def sat_vap_pres(t_dry_bulb):
+    """Saturation vapor pressure (Pa), ASHRAE eqn 5 & 6."""
+    t_c = _as_float(t_dry_bulb)
+    t = t_c + ZERO_CELSIUS_AS_KELVIN
+    ln_t = np.log(t)
+    ln_pws = np.where(
+        t_c <= TRIPLE_POINT_WATER_SI,
+        -5.6745359E+03 / t + 6.3925247 - 9.677843E-03 * t + 6.2215701E-07 * t**2
+        + 2.0747825E-09 * t**3 - 9.484024E-13 * t**4 + 4.1635019 * ln_t,
+        -5.8002206E+03 / t + 1.3914993 - 4.8640239E-02 * t + 4.1764768E-05 * t**2
+        - 1.4452093E-08 * t**3 + 6.5459673 * ln_t,
+    )
+    out = np.exp(ln_pws)
+    return np.where((t_c < T_MIN) | (t_c > T_MAX), np.nan, out)
+
+
+def _d_ln_pws(t_dry_bulb):
+    # Derivative of ln(sat_vap_pres) with respect to temperature
+    t_c = _as_float(t_dry_bulb)
+    t = t_c + ZERO_CELSIUS_AS_KELVIN
+    return np.where(
+        t_c <= TRIPLE_POINT_WATER_SI,
+        5.6745359E+03 / t**2 - 9.677843E-03 + 2 * 6.2215701E-07 * t
+        + 3 * 2.0747825E-09 * t**2 - 4 * 9.484024E-13 * t**3 + 4.1635019 / t,
+        5.8002206E+03 / t**2 - 4.8640239E-02 + 2 * 4.1764768E-05 * t
+        - 3 * 1.4452093E-08 * t**2 + 6.5459673 / t,
+    )
+
+
+def hum_ratio_from_vap_pres(vap_pres, pressure):
+    """Humidity ratio (kg_v/kg_a) from vapor pressure, ASHRAE eqn 20."""
+    vap_pres = _as_float(vap_pres)
+    w = 0.621945 * vap_pres / (_as_float(pressure) - vap_pres)
+    return np.where(vap_pres < 0, np.nan, np.maximum(w, MIN_HUM_RATIO))
+
+
+def vap_pres_from_hum_ratio(hum_ratio, pressure):
+    """Partial pressure of water vapor (Pa) from humidity ratio."""
+    hum_ratio = _as_float(hum_ratio)
+    w = np.maximum(hum_ratio, MIN_HUM_RATIO)
+    out = _as_float(pressure) * w / (0.621945 + w)
+    return np.where(hum_ratio < 0, np.nan, out)
+
+
+def sat_hum_ratio(t_dry_bulb, pressure):
+    """Humidity ratio of saturated air (kg_v/kg_a)."""
+    pws = sat_vap_pres(t_dry_bulb)
+    return np.maximum(0.621945 * pws / (_as_float(pressure) - pws), MIN_HUM_RATIO)
+
+
+def hum_ratio_from_rel_hum(t_dry_bulb, rel_hum, pressure):
+    """Humidity ratio (kg_v/kg_a) from relative humidity in [0, 1]."""
+    rel_hum = _as_float(rel_hum)
+    vap_pres = np.where((rel_hum < 0) | (rel_hum > 1), np.nan, rel_hum * sat_vap_pres(t_dry_bulb))
+    return hum_ratio_from_vap_pres(vap_pres, pressure)
+
+
+def rel_hum_from_hum_ratio(t_dry_bulb, hum_ratio, pressure):
+    """Relative humidity in [0, 1] from humidity ratio."""
+    return vap_pres_from_hum_ratio(hum_ratio, pressure) / sat_vap_pres(t_dry_bulb)
+
+
+def hum_ratio_from_wet_bulb(t_dry_bulb, t_wet_bulb, pressure):
+    """Humidity ratio (kg_v/kg_a) from wet bulb, ASHRAE eqn 33 & 35."""
+    t_db = _as_float(t_dry_bulb)
+    t_wb = _as_float(t_wet_bulb)
+    ws_star = sat_hum_ratio(t_wb, pressure)
+    w = np.where(
+        t_wb >= FREEZING_POINT_WATER_SI,
+        ((2501. - 2.326 * t_wb) * ws_star - 1.006 * (t_db - t_wb)) / (2501. + 1.86 * t_db - 4.186 * t_wb),
+        ((2830. - 0.24 * t_wb) * ws_star - 1.006 * (t_db - t_wb)) / (2830. + 1.86 * t_db - 2.1 * t_wb),
+    )
+    return np.where(t_wb > t_db, np.nan, np.maximum(w, MIN_HUM_RATIO))
+
+
+def hum_ratio_from_dew_point(t_dew_point, pressure):
+    """Humidity ratio (kg_v/kg_a) from dew point."""
+    return hum_ratio_from_vap_pres(sat_vap_pres(t_dew_point), pressure)
+
+
+def dew_point_from_vap_pres(t_dry_bulb, vap_pres, tolerance=PSYCHROLIB_TOLERANCE):
+    """Dew point (°C) from vapor pressure.
+
+    Newton-Raphson on ln(vapor pressure) as in psychrolib, iterating all
+    states together and dropping each one from the working set once it has
+    converged.
+    """
+    t_db, vap_pres = np.broadcast_arrays(_as_float(t_dry_bulb), _as_float(vap_pres))
+    shape = t_db.shape
+    t_db = t_db.ravel()
+    vap_pres = vap_pres.ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid = (vap_pres >= sat_vap_pres(T_MIN)) & (vap_pres <= sat_vap_pres(T_MAX)) & np.isfinite(t_db)
+        t_dp = np.where(valid, t_db, np.nan)
+        active = np.flatnonzero(valid)
+        t_iter = t_db[active]
+        ln_vp = np.log(vap_pres[active])
+        for _ in range(MAX_ITER_COUNT):
+            if active.size == 0:
+                break
+            t_next = t_iter - (np.log(sat_vap_pres(t_iter)) - ln_vp) / _d_ln_pws(t_iter)
+            t_next = np.clip(t_next, T_MIN, T_MAX)
+            done = np.abs(t_next - t_iter) <= tolerance
+            t_dp[active[done]] = t_next[done]
+            keep = ~done
+            active = active[keep]
+            t_iter = t_next[keep]
+            ln_vp = ln_vp[keep]
+        # States that never converged
+        t_dp[active] = np.nan
+    return np.minimum(t_dp, t_db).reshape(shape)
+
+
+def dew_point_from_hum_ratio(t_dry_bulb, hum_ratio, pressure, tolerance=PSYCHROLIB_TOLERANCE):
+    """Dew point (°C) from humidity ratio."""
+    return dew_point_from_vap_pres(t_dry_bulb, vap_pres_from_hum_ratio(hum_ratio, pressure), tolerance)
+
+
+def wet_bulb_from_hum_ratio(t_dry_bulb, hum_ratio, pressure, tolerance=PSYCHROLIB_TOLERANCE):
+    """Wet bulb (°C) from humidity ratio.
+
+    Bisection between dew point and dry bulb as in psychrolib, with every
+    state bisected at once. Converged states leave the working set.
+    """
+    t_db, w, p = np.broadcast_arrays(_as_float(t_dry_bulb), _as_float(hum_ratio), _as_float(pressure))
+    shape = t_db.shape
+    t_db = t_db.ravel()
+    p = p.ravel()
+    w = np.where(w.ravel() < 0, np.nan, np.maximum(w.ravel(), MIN_HUM_RATIO))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lo = dew_point_from_hum_ratio(t_db, w, p, tolerance)
+        hi = t_db.copy()
+        t_wb = (lo + hi) / 2
+        active = np.flatnonzero((hi - lo) > tolerance)
+        lo, hi = lo[active], hi[active]
+        t_a, w_a, p_a = t_db[active], w[active], p[active]
+        for _ in range(MAX_ITER_COUNT):
+            if active.size == 0:
+                break
+            mid = (lo + hi) / 2
+            above = hum_ratio_from_wet_bulb(t_a, mid, p_a) > w_a
+            hi = np.where(above, mid, hi)
+            lo = np.where(above, lo, mid)
+            t_wb[active] = (lo + hi) / 2
+            keep = (hi - lo) > tolerance
+            if not keep.all():
+                active, lo, hi = active[keep], lo[keep], hi[keep]
+                t_a, w_a, p_a = t_a[keep], w_a[keep], p_a[keep]
+        t_wb[active] = np.nan
+    return t_wb.reshape(shape)
+
+
+def moist_air_enthalpy(t_dry_bulb, hum_ratio):
+    """Moist air enthalpy (J/kg of dry air), ASHRAE eqn 30."""
+    t_db = _as_float(t_dry_bulb)
+    w = np.maximum(_as_float(hum_ratio), MIN_HUM_RATIO)
+    return (1.006 * t_db + w * (2501. + 1.86 * t_db)) * 1000
+
+
+def dry_bulb_from_enthalpy_and_hum_ratio(enthalpy, hum_ratio):
+    """Dry bulb (°C) from moist air enthalpy (J/kg) and humidity ratio, ASHRAE eqn 30."""
+    w = np.maximum(_as_float(hum_ratio), MIN_HUM_RATIO)
+    return (_as_float(enthalpy) / 1000 - 2501. * w) / (1.006 + 1.86 * w)
+
+
+def moist_air_volume(t_dry_bulb, hum_ratio, pressure):
+    """Moist air specific volume (m³/kg of dry air), ASHRAE eqn 26."""
+    w = np.maximum(_as_float(hum_ratio), MIN_HUM_RATIO)
+    return R_DA_SI * (_as_float(t_dry_bulb) + ZERO_CELSIUS_AS_KELVIN) * (1 + 1.607858 * w) / _as_float(pressure)
+
+
+def moist_air_density(t_dry_bulb, hum_ratio, pressure):
+    """Moist air density (kg/m³), ASHRAE eqn 11."""
+    w = np.maximum(_as_float(hum_ratio), MIN_HUM_RATIO)
+    return (1 + w) / moist_air_volume(t_dry_bulb, w, pressure)
+
+
+def hum_ratio_from_input(t_dry_bulb, humidity, pressure, method=REL_HUM):
+    """Humidity ratio from dry bulb and one of the supported humidity inputs."""
+    if method == REL_HUM:
+        return hum_ratio_from_rel_hum(t_dry_bulb, humidity, pressure)
+    if method == WET_BULB:
+        return hum_ratio_from_wet_bulb(t_dry_bulb, humidity, pressure)
+    if method == DEW_POINT:
+        # Dew point above dry bulb is not a valid state
+        t_dp = _as_float(humidity)
+        return np.where(t_dp > _as_float(t_dry_bulb), np.nan, hum_ratio_from_dew_point(t_dp, pressure))
+    if method == HUM_RATIO:
+        w = _as_float(humidity)
+        return np.where(w < 0, np.nan, w)
+    raise ValueError(f"Unknown humidity method '{method}', expected one of {HUMIDITY_METHODS}")
+
+
+def solve_states(t_dry_bulb, humidity, pressure, method=REL_HUM, tolerance=PSYCHROLIB_TOLERANCE, table=None):
+    """Solve every property of the app's properties table for arrays of states.
+
+    Args:
+        t_dry_bulb: dry bulb temperatures (°C)
+        humidity: relative humidity in [0, 1], wet bulb (°C), dew point (°C)
+            or humidity ratio (kg_v/kg_a), depending on method
+        pressure: barometric pressures (Pa), scalar or array
+        method: one of REL_HUM, WET_BULB, DEW_POINT, HUM_RATIO
+        table: optional psychro_tables.PsychroTable built for this pressure;
+            dew point and wet bulb are then interpolated instead of iterated
+
+    Returns:
+        dict of float64 arrays keyed by PROPERTY_KEYS (psychrolib SI units),
+        broadcast to a common shape.
+    """
+    t_db, humidity, pressure = np.broadcast_arrays(_as_float(t_dry_bulb), _as_float(humidity), _as_float(pressure))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = hum_ratio_from_input(t_db, humidity, pressure, method)
+        invalid = np.isnan(w)
+        vap_pres = vap_pres_from_hum_ratio(w, pressure)
+        pws = sat_vap_pres(t_db)
+        rel_hum = np.where(invalid, np.nan, humidity if method == REL_HUM else vap_pres / pws)
+        if method == DEW_POINT:
+            t_dp = np.where(invalid, np.nan, humidity)
+        else:
+            # psychrolib solves the dew point from RH directly, not via W
+            dp_vap_pres = np.where(invalid, np.nan, humidity * pws) if method == REL_HUM else vap_pres
+            if table is None:
+                t_dp = dew_point_from_vap_pres(t_db, dp_vap_pres, tolerance)
+            else:
+                t_dp = table.dew_point_from_vap_pres(t_db, dp_vap_pres)
+        if method == WET_BULB:
+            t_wb = np.where(invalid, np.nan, humidity)
+        elif table is None:
+            t_wb = wet_bulb_from_hum_ratio(t_db, w, pressure, tolerance)
+        else:
+            t_wb = np.where(invalid, np.nan, table.wet_bulb(t_db, rel_hum))
+        density = moist_air_density(t_db, w, pressure)
+        return {
+            'pressure': pressure.astype(np.float64, copy=True),
+            'dry_bulb': t_db.astype(np.float64, copy=True),
+            'wet_bulb': t_wb,
+            'dew_point': t_dp,
+            'rel_hum': rel_hum,
+            'hum_ratio': w,
+            'enthalpy': moist_air_enthalpy(t_db, w),
+            'volume': moist_air_volume(t_db, w, pressure),
+            'density': density,
+            'degree_of_saturation': np.maximum(w, MIN_HUM_RATIO) / sat_hum_ratio(t_db, pressure),
+            'absolute_humidity': w * density,
+            'vap_pres': vap_pres,
+            'sat_vap_pres': pws,
+        }
@@ -0,0 +1,196 @@
+"""Precomputed lookup tables for fixed-pressure batch solving ("fast table" mode).
+
+Most sites run at a single barometric pressure, so the iterative dew point
+and wet bulb solves can be replaced by interpolation in tables built once per
+pressure over the app's -50 to 100 °C input range:
+
+- dew point: 1-D table of ln(p_ws) against temperature, inverted by linear
+  interpolation (pressure independent)
+- wet bulb: 2-D table over (dry bulb, relative humidity) at the table's
+  pressure, bilinear interpolation
+
+Saturation vapor pressure itself stays closed-form: the ASHRAE correlation is
+cheaper to evaluate than a table lookup.
+
+Maximum error against psychrolib over the full range (random sampling at
+50-110 kPa, see ``MAX_ERROR``): dew point 0.001 °C, wet bulb 0.002 °C. The
+wet bulb equations switch between ice and water at 0 °C wet bulb, which makes
+wet bulb discontinuous there. Cells within ``ICE_MARGIN`` of that switch,
+cells too curved to interpolate (checked at every cell centre when the table
+is built), cells next to invalid states and inputs outside the grid are
+solved exactly instead, so lookups are never less valid than exact solving.
+
+Built tables are kept in memory and saved as .npz files under
+``TABLE_DIR`` (override with the ``PSYCHRO_TABLE_DIR`` environment variable).
+"""
+import functools
+import os
+
+import numpy as np
+
+import psychro_engine as engine
+
+# Bump when the grid layout or the solver changes, to invalidate saved tables
+TABLE_VERSION = 1
+TABLE_DIR = os.environ.get(
+    'PSYCHRO_TABLE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'hvac-psychrometric-tool', 'tables')
+)
+
+# Dry bulb range of the app's inputs (°C)
+DRY_BULB_MIN = -50.0
+DRY_BULB_MAX = 100.0
+DRY_BULB_STEP = 0.1
+REL_HUM_STEP = 0.005
+# Saturation table covers every dew point the engine can return (°C)
+SAT_STEP = 0.01
+# Wet bulb cells this close to 0 °C are solved exactly (°C)
+ICE_MARGIN = 1.0
+# Cells whose centre interpolates worse than this are solved exactly (°C)
+CELL_TOLERANCE = 0.0005
+
+# Documented worst-case deviation from psychrolib
+MAX_ERROR = {
+    'dew_point': 0.001,  # °C
+    'wet_bulb': 0.002,  # °C
+}
+
+
+def _solve_wet_bulb(t_dry_bulb, rel_hum, pressure):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = engine.hum_ratio_from_rel_hum(t_dry_bulb, rel_hum, pressure)
+        return engine.wet_bulb_from_hum_ratio(t_dry_bulb, w, pressure)
+
+
+def _grid(start, stop, step):
+    return np.linspace(start, stop, int(round((stop - start) / step)) + 1)
+
+
+@functools.lru_cache(maxsize=1)
+def _saturation_table():
+    # ln(p_ws) on a uniform temperature grid, monotonic so it also inverts
+    t_grid = _grid(engine.T_MIN, engine.T_MAX, SAT_STEP)
+    return t_grid, np.log(engine.sat_vap_pres(t_grid))
+
+
+def dew_point_from_vap_pres(t_dry_bulb, vap_pres):
+    """Dew point (°C) from vapor pressure by inverse table lookup."""
+    t_grid, ln_pws = _saturation_table()
+    vap_pres = np.asarray(vap_pres, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ln_vp = np.log(vap_pres)
+        t_dp = np.interp(ln_vp, ln_pws, t_grid)
+        t_dp = np.where((ln_vp < ln_pws[0]) | (ln_vp > ln_pws[-1]) | np.isnan(ln_vp), np.nan, t_dp)
+    return np.minimum(t_dp, t_dry_bulb)
+
+
+class PsychroTable:
+    """Lookup tables for one pressure (Pa).
+
+    Wet bulb is tabulated over a (dry bulb, relative humidity) grid; the
+    dew point lookup is shared by every pressure.
+    """
+
+    dew_point_from_vap_pres = staticmethod(dew_point_from_vap_pres)
+
+    def __init__(self, pressure, wet_bulb, exact_cells):
+        self.pressure = float(pressure)
+        self.wet_bulb_grid = wet_bulb
+        # Cells solved exactly instead of interpolated
+        self.exact_cells = exact_cells
+
+    @classmethod
+    def build(cls, pressure):
+        dry_bulb = _grid(DRY_BULB_MIN, DRY_BULB_MAX, DRY_BULB_STEP)
+        rel_hum = _grid(0.0, 1.0, REL_HUM_STEP)
+        wet_bulb = _solve_wet_bulb(*np.meshgrid(dry_bulb, rel_hum, indexing='ij'), pressure)
+        # Solve the centre of every cell and compare with the interpolated value
+        centres = np.meshgrid(dry_bulb[:-1] + DRY_BULB_STEP / 2, rel_hum[:-1] + REL_HUM_STEP / 2, indexing='ij')
+        exact_centre = _solve_wet_bulb(*centres, pressure)
+        corners = np.stack([wet_bulb[:-1, :-1], wet_bulb[1:, :-1], wet_bulb[:-1, 1:], wet_bulb[1:, 1:]])
+        with np.errstate(invalid='ignore'):
+            exact_cells = (
+                # Invalid states
+                np.isnan(corners).any(axis=0) | np.isnan(exact_centre)
+                # Close to the ice/water switch at 0 °C wet bulb
+                | ((corners.min(axis=0) < ICE_MARGIN) & (corners.max(axis=0) > -ICE_MARGIN))
+                # Too curved to interpolate, e.g. vapor pressure near total pressure
+                | (np.abs(corners.mean(axis=0) - exact_centre) > CELL_TOLERANCE)
+            )
+        return cls(pressure, wet_bulb, exact_cells)
+
+    def wet_bulb(self, t_dry_bulb, rel_hum):
+        """Wet bulb (°C) for dry bulb (°C) and relative humidity in [0, 1]."""
+        t, rh = np.broadcast_arrays(np.asarray(t_dry_bulb, dtype=np.float64), np.asarray(rel_hum, dtype=np.float64))
+        shape = t.shape
+        t = t.ravel()
+        rh = rh.ravel()
+        n_t, n_rh = self.wet_bulb_grid.shape
+        with np.errstate(invalid='ignore'):
+            inside = (t >= DRY_BULB_MIN) & (t <= DRY_BULB_MAX) & (rh >= 0) & (rh <= 1)
+            fi = np.where(inside, (t - DRY_BULB_MIN) / DRY_BULB_STEP, 0.0)
+            fj = np.where(inside, rh / REL_HUM_STEP, 0.0)
+        i = np.minimum(fi.astype(np.intp), n_t - 2)
+        j = np.minimum(fj.astype(np.intp), n_rh - 2)
+        a = fi - i
+        b = fj - j
+        table = self.wet_bulb_grid
+        out = (
+            table[i, j] * (1 - a) * (1 - b) + table[i + 1, j] * a * (1 - b)
+            + table[i, j + 1] * (1 - a) * b + table[i + 1, j + 1] * a * b
+        )
+        exact = ~inside | self.exact_cells[i, j]
+        if exact.any():
+            out[exact] = _solve_wet_bulb(t[exact], rh[exact], self.pressure)
+        return out.reshape(shape)
+
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp, version=TABLE_VERSION, pressure=self.pressure,
+            wet_bulb=self.wet_bulb_grid, exact_cells=self.exact_cells,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != TABLE_VERSION:
+                raise ValueError(f"{path} is an old table version")
+            return cls(float(data['pressure']), data['wet_bulb'], data['exact_cells'])
+
+
+def _table_path(pressure):
+    return os.path.join(TABLE_DIR, f"wet_bulb_v{TABLE_VERSION}_{int(round(pressure))}Pa.npz")
+
+
+@functools.lru_cache(maxsize=8)
+def _load_or_build(pressure):
+    path = _table_path(pressure)
+    try:
+        return PsychroTable.load(path)
+    except (OSError, ValueError, KeyError):
+        pass
+    table = PsychroTable.build(pressure)
+    try:
+        os.makedirs(TABLE_DIR, exist_ok=True)
+        table.save(path)
+    except OSError:
+        # Read-only home or similar: keep the in-memory table only
+        pass
+    return table
+
+
+def get_table(pressure):
+    """Lookup tables for a pressure (Pa), rounded to 1 Pa.
+
+    Loaded from disk if saved before, otherwise built and saved.
+    """
+    return _load_or_build(float(round(pressure)))
+
+
+def solve_states(t_dry_bulb, humidity, pressure, method=engine.REL_HUM):
+    """Table-based counterpart of psychro_engine.solve_states.
+
+    pressure must be a single value (Pa). Same keys and units as the engine.
+    """
+    return engine.solve_states(t_dry_bulb, humidity, pressure, method, table=get_table(pressure))
@@ -0,0 +1,275 @@
+"""Replay and live display of trend data (e.g. 1-minute BMS trends) on the chart.
+
+Frames are drawn by blitting: the cached base chart is drawn once and its
+pixels kept, and each frame restores them and draws only the trail, the
+current-state marker and the time label on top. The trail is a ring buffer
+of the last samples, so the cost of a frame does not grow with the length
+of the series.
+
+Trends come from a file (see load_trend) or live from a local socket
+sending one JSON sample per line. ``serve`` replays a trend file over such
+a socket, as a stand-in for a BMS:
+
+    python -m replay serve ahu_trend.csv --port 8765 --rate 60
+"""
+import argparse
+import io
+import json
+import socket
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from weather import SEA_LEVEL_PRESSURE, iter_weather, solve_weather
+
+# Columns tried, in order, for the time of each sample
+TIME_COLUMNS = ('timestamp', 'time', 'datetime', 'date')
+# Samples kept on the trail
+TRAIL_LENGTH = 240
+# Resolution of the frames (the app's chart images use 200)
+FRAME_DPI = 72
+# JPEG quality of encoded frames
+FRAME_QUALITY = 80
+FRAME_RATE = 30
+TRAIL_COLOR = '#1f77b4'
+MARKER_COLOR = '#d62728'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Bytes read per poll of a live feed
+RECEIVE_SIZE = 1 << 16
+
+
+class Trend(namedtuple('Trend', 'time dry_bulb hum_ratio')):
+    """Time-indexed states: time labels, dry bulb (°C) and humidity ratio (g/kg, as on the chart)."""
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.dry_bulb)
+
+
+_EMPTY_TREND = Trend(np.array([], dtype=str), np.array([]), np.array([]))
+
+
+def _time_labels(records, start):
+    # Times as strings, or sample numbers if the records have no time column
+    for column in TIME_COLUMNS:
+        if column in records:
+            return records[column].astype(str).to_numpy()
+    return np.arange(start, start + len(records)).astype(str)
+
+
+def solve_trend(records, pressure=SEA_LEVEL_PRESSURE, start=0):
+    """Trend of a DataFrame of samples (columns as for weather.iter_weather, plus a time column)."""
+    states = solve_weather(records, pressure)
+    return Trend(_time_labels(records, start), states['dry_bulb'], states['hum_ratio'] * 1000)
+
+
+def load_trend(source, fmt=None, pressure=SEA_LEVEL_PRESSURE):
+    """Read and solve a whole trend file (CSV, Parquet or EPW).
+
+    Columns as for weather.iter_weather, plus an optional time column (see
+    TIME_COLUMNS); samples without a pressure use pressure (kPa). Samples
+    that can't be solved stay in the trend as NaN (gaps in the trail).
+    """
+    parts = []
+    count = 0
+    for records in iter_weather(source, fmt):
+        parts.append(solve_trend(records, pressure, count))
+        count += len(records)
+    if not parts:
+        return _EMPTY_TREND
+    return Trend(*(np.concatenate(field) for field in zip(*parts)))
+
+
+class RingBuffer:
+    """The last capacity (x, y) samples, in fixed arrays."""
+
+    def __init__(self, capacity=TRAIL_LENGTH):
+        self.capacity = int(capacity)
+        self._data = np.full((2, self.capacity), np.nan)
+        # Samples appended since the last clear
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def clear(self):
+        self._count = 0
+
+    def extend(self, x, y):
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))[-self.capacity:]
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))[-self.capacity:]
+        index = (self._count + np.arange(len(x))) % self.capacity
+        self._data[0, index] = x
+        self._data[1, index] = y
+        self._count += len(x)
+
+    def arrays(self):
+        """(x, y) arrays, oldest sample first."""
+        if self._count <= self.capacity:
+            return self._data[0, :self._count], self._data[1, :self._count]
+        start = self._count % self.capacity
+        ordered = np.concatenate((self._data[:, start:], self._data[:, :start]), axis=1)
+        return ordered[0], ordered[1]
+
+
+class BlitRenderer:
+    """Draws trail frames over a rendered base chart (e.g. from chart_cache.get_base_chart).
+
+    The chart is drawn once at dpi and kept as a background; the chart is
+    taken over by the renderer.
+    """
+
+    def __init__(self, chart, trail_length=TRAIL_LENGTH, dpi=FRAME_DPI):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.axes = chart.axes
+        figure = self.axes.figure
+        figure.set_dpi(dpi)
+        self.canvas = FigureCanvasAgg(figure)
+        self.trail = RingBuffer(trail_length)
+        # Animated artists are left out of canvas.draw(), so the background is the bare chart
+        self._line, = self.axes.plot([], [], color=TRAIL_COLOR, linewidth=2, alpha=0.6, animated=True)
+        self._marker, = self.axes.plot([], [], color=MARKER_COLOR, marker='o', markersize=10,
+                                       linewidth=0, animated=True)
+        self._label = self.axes.text(0.02, 0.96, '', transform=self.axes.transAxes, fontsize=12,
+                                     verticalalignment='top', animated=True)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(figure.bbox)
+
+    def push(self, dry_bulb, hum_ratio):
+        """Add samples (°C, g/kg) to the trail."""
+        self.trail.extend(dry_bulb, hum_ratio)
+
+    def draw(self, label=''):
+        """Draw the trail on the background. Returns the frame as an RGBA array (a view, valid until the next draw)."""
+        self.canvas.restore_region(self._background)
+        x, y = self.trail.arrays()
+        self._line.set_data(x, y)
+        self._marker.set_data(x[-1:], y[-1:])
+        self._label.set_text(label)
+        for artist in (self._line, self._marker, self._label):
+            self.axes.draw_artist(artist)
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def frame(self, label='', quality=FRAME_QUALITY):
+        """Draw the trail and encode the frame as JPEG bytes."""
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.fromarray(self.draw(label)[:, :, :3]).save(buffer, 'JPEG', quality=quality)
+        return buffer.getvalue()
+
+
+def seek(trend, renderer, position):
+    """Refill the renderer's trail with the samples of trend before position."""
+    renderer.trail.clear()
+    lo = max(0, position - renderer.trail.capacity)
+    renderer.push(trend.dry_bulb[lo:position], trend.hum_ratio[lo:position])
+
+
+def replay_frames(trend, renderer, start=0, step=1, fps=FRAME_RATE):
+    """Yield (position, JPEG frame) from sample start to the end of trend.
+
+    Each frame advances step samples; replay can start at any position (see
+    seek). With fps, frames are paced to that rate, the caller's own work
+    included.
+    """
+    seek(trend, renderer, start)
+    interval = 1 / fps if fps else 0
+    next_frame = time.perf_counter()
+    for position in range(start, len(trend), step):
+        end = min(position + step, len(trend))
+        renderer.push(trend.dry_bulb[position:end], trend.hum_ratio[position:end])
+        yield end, renderer.frame(trend.time[end - 1])
+        next_frame += interval
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Behind: drop the lost time rather than rushing to catch up
+            next_frame = time.perf_counter()
+
+
+class SocketFeed:
+    """Live samples from a local socket, one JSON object per line.
+
+    Each sample has the trend file columns (dry_bulb, rel_hum or dew_point,
+    optionally pressure and a time). poll() never blocks.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, pressure=SEA_LEVEL_PRESSURE, timeout=2.0):
+        self.pressure = pressure
+        self.count = 0
+        self._pending = b''
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._socket.setblocking(False)
+        self.closed = False
+
+    def poll(self):
+        """Trend of the samples received since the last poll (may be empty)."""
+        while not self.closed:
+            try:
+                data = self._socket.recv(RECEIVE_SIZE)
+            except BlockingIOError:
+                break
+            if not data:
+                self.close()
+                break
+            self._pending += data
+        lines, _, self._pending = self._pending.rpartition(b'\n')
+        samples = [json.loads(line) for line in lines.splitlines() if line.strip()]
+        if not samples:
+            return _EMPTY_TREND
+        records = pd.DataFrame(samples)
+        trend = solve_trend(records, self.pressure, self.count)
+        self.count += len(records)
+        return trend
+
+    def close(self):
+        self.closed = True
+        self._socket.close()
+
+
+def serve(source, host=DEFAULT_HOST, port=DEFAULT_PORT, rate=FRAME_RATE, loop=False):
+    """Send the samples of a trend file to one client at rate samples per second."""
+    with socket.create_server((host, port)) as server:
+        print(f"Serving {source} on {host}:{port} at {rate} samples/s", file=sys.stderr)
+        client, _ = server.accept()
+        with client:
+            while True:
+                for records in iter_weather(source):
+                    for line in records.to_json(orient='records', lines=True).splitlines():
+                        client.sendall(line.encode() + b'\n')
+                        time.sleep(1 / rate)
+                if not loop:
+                    break
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Trend replay tools.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="send a trend file over a local socket, like a live BMS feed")
+    serve_parser.add_argument('input', help="input .csv, .parquet or .epw trend file")
+    serve_parser.add_argument('--host', default=DEFAULT_HOST)
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--rate', type=float, default=FRAME_RATE, help="samples per second")
+    serve_parser.add_argument('--loop', action='store_true', help="start over at the end of the file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        serve(args.input, args.host, args.port, args.rate, args.loop)
+    except (BrokenPipeError, ConnectionResetError):
+        print("Client disconnected", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
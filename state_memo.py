@@ -0,0 +1,103 @@
+"""Shared memo of solved psychrometric states.
+
+Widgets round their inputs to 0.1 °C / 0.1 %RH, so reruns and sessions ask
+for the same few states over and over. ``memoize`` wraps a state-solving
+function in a bounded, thread-safe LRU keyed on its arguments quantized to
+fixed steps. The memos live at module level, so every session served by the
+process shares them.
+
+The quanta are far finer than any widget or displayed value, so inputs that
+share a key give the same displayed result. Results are shared between
+callers and must be treated as read-only.
+"""
+import threading
+from collections import OrderedDict
+from functools import update_wrapper
+
+# Key resolution per kind of argument
+TEMPERATURE_QUANTUM = 0.001  # °C
+REL_HUM_QUANTUM = 0.001  # %
+PRESSURE_QUANTUM = 0.0001  # kPa
+RATIO_QUANTUM = 0.001  # %
+# Entries kept per memoized function
+MAX_MEMO_ENTRIES = 4096
+
+# Every memo created by memoize, by module-qualified function name
+_memos = {}
+
+
+def _quantize(value, quantum):
+    # Arguments without a quantum (e.g. a method name) are used as they are
+    if quantum is None or value is None:
+        return value
+    return round(value / quantum)
+
+
+class StateMemo:
+    """Bounded LRU of a function's results keyed on quantized arguments."""
+
+    def __init__(self, func, quanta, maxsize=MAX_MEMO_ENTRIES):
+        self.func = func
+        self.quanta = quanta
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        update_wrapper(self, func)
+
+    def __len__(self):
+        return len(self._results)
+
+    def __call__(self, *args):
+        key = tuple(_quantize(arg, quantum) for arg, quantum in zip(args, self.quanta))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+        # Solved outside the lock; errors are raised and not cached
+        result = self.func(*args)
+        with self._lock:
+            self.misses += 1
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def memoize(*quanta, maxsize=MAX_MEMO_ENTRIES):
+    """Decorator: memoize a function of positional arguments, one quantum
+    (or None for exact matching) per argument."""
+    def decorator(func):
+        memo = StateMemo(func, quanta, maxsize)
+        _memos[f"{func.__module__}.{func.__qualname__}"] = memo
+        return memo
+    return decorator
+
+
+def memo_stats():
+    """Entries, hits and misses of every memo, one dict per function."""
+    rows = []
+    for name, memo in _memos.items():
+        calls = memo.hits + memo.misses
+        rows.append({
+            'Function': name,
+            'Entries': len(memo),
+            'Hits': memo.hits,
+            'Misses': memo.misses,
+            'Hit rate (%)': round(100 * memo.hits / calls, 1) if calls else 0.0,
+        })
+    return rows
+
+
+def clear_memos():
+    """Empty every memo and reset its counters."""
+    for memo in _memos.values():
+        memo.clear()
@@ -1,15 +1,64 @@
 import streamlit as st
 import psychrolib as psy
-import pandas as pd
-from psychrochart import PsychroChart
-import matplotlib.pyplot as plt
-import json
-import distinctipy
+import io
+import os
+import time
+import numpy as np
 
-# number of colours to generate
-N = 30
-# generate N visually distinct colours
-colours = distinctipy.get_colors(N)
+import psychro_engine as engine
+from chart_cache import content_key, figure_to_image, get_base_chart, image_cache
+import goal_seek
+from chart_overlays import (DENSE_MODES, DENSE_POINT_THRESHOLD, MAX_NAMED_POINTS, plot_bin_density, plot_ellipses,
+                            plot_envelopes, plot_points, points_to_chart_xy)
+import envelopes
+from point_io import EXPORT_FORMATS, IMPORT_TYPES, export_formats, export_points, read_points
+from point_store import PointStore
+from process_chain import AirStream, cooling_coil
+from psychro_calc import (HUMIDITY_METHODS, PROPERTY_ROWS, point_properties, pressure_from_elevation,
+                          rel_hum_from_wet_bulb, solve_batch, solve_state)
+from state_memo import memo_stats
+from timings import SectionTimer, metrics, profile_report, start_profile
+import uncertainty
+
+# number of colours to generate; point N gets colour (N - 1) % POINT_COLOURS
+POINT_COLOURS = 30
+GOAL_SEEK_MODES = ("Mixing ratio", "Coil leaving condition", "State from enthalpy and RH")
+# Monte Carlo samples per point offered in uncertainty mode, and the cap on
+# samples over all points (fewer per point when there are many points;
+# 500k states solve in about 1.3 s)
+UNCERTAINTY_SAMPLES = (1_000, 5_000, 10_000, 20_000)
+MAX_UNCERTAINTY_STATES = 500_000
+# Summary table columns that get a ± column in uncertainty mode: key and decimals
+UNCERTAINTY_COLUMNS = {
+    "Dry Bulb (°C)": ('dry_bulb', 2),
+    "Wet Bulb (°C)": ('wet_bulb', 2),
+    "Dew Point (°C)": ('dew_point', 2),
+    "RH (%)": ('rel_hum', 2),
+    "Humidity Ratio (kg_v/kg_a)": ('hum_ratio', 6),
+    "Enthalpy (kJ/kg)": ('enthalpy', 2),
+    "Specific Volume (m³/kg_a)": ('specific_volume', 4),
+    "Density (kg/m³)": ('density', 4),
+}
+# Mixing target label -> (goal_seek quantity, app units per engine unit)
+MIX_TARGET_UNITS = {
+    "Dry Bulb (°C)": (goal_seek.DRY_BULB, 1.0),
+    "Humidity Ratio (g/kg)": (goal_seek.HUM_RATIO, 1000.0),
+    "Enthalpy (kJ/kg)": (goal_seek.ENTHALPY, 0.001),
+    "Relative Humidity (%)": (goal_seek.REL_HUM, 100.0),
+}
+
+
+@st.cache_resource(show_spinner=False)
+def point_palette():
+    # distinctipy's search takes a few hundred ms, so it runs once per
+    # process (seeded, so every session gets the same colours)
+    import distinctipy
+    return [distinctipy.get_hex(colour) for colour in distinctipy.get_colors(POINT_COLOURS, rng=0)]
+
+
+def next_point_colour():
+    palette = point_palette()
+    return palette[(st.session_state.point_counter - 1) % len(palette)]
 
 
 # Set the unit system to SI
@@ -17,64 +66,148 @@ psy.SetUnitSystem(psy.SI)
 
 # Initialize session state for points and connectors
 if 'points_data' not in st.session_state:
-    st.session_state.points_data = []  # List of dicts with point info
+    st.session_state.points_data = []  # List of point_store.Point records
 if 'point_counter' not in st.session_state:
     st.session_state.point_counter = 1
-#st.set_page_config(layout="wide")
-st.title("🌡️ Psychrometric Calculator")
-st.write("Calculate and plot psychrometric properties of moist air using SI units.")
+if 'custom_envelopes' not in st.session_state:
+    st.session_state.custom_envelopes = {}  # Envelope name -> limits for envelopes.Envelope.from_limits
 
-# Main page - Input Parameters Section
-st.header("Add New Condition")
-# Main content area - calculations happen automatically
-if True:
-    try:
-        
-        #st.divider()
-        
-        # Point Management Section - Now includes name input
-        #st.header("💾 Save Point to Chart")
-        
-        tab1, tab2 = st.tabs(["➕ Add Condition", "🔀 Add Mixed Condition"])
-        
-        with tab1:
-            col1, col2 = st.columns(2)
-            with col1:
-                pressure_method = st.radio(
-                    "Barometric Pressure Based on:",
-                    ["Actual Pressure (kPa)", "Elevation (meters)"]
-                )
+# Per-point widgets are keyed by list position, so their state goes stale when
+# points are renamed, deleted or replaced
+POINT_WIDGET_PREFIXES = ('panel', 'name', 'db', 'wb', 'conn', 'color', 'src1', 'src2', 'ratio1')
 
-            with col2:
-                if pressure_method == "Actual Pressure (kPa)":
-                    pressure = st.number_input(
-                        "Barometric Pressure (kPa)",
-                        min_value=50.0,
-                        max_value=110.0,
-                        value=101.325,
-                        step=0.1,
-                        format="%.3f"
-                    )
-                else:
-                    elevation = st.number_input(
-                        "Elevation (meters)",
-                        min_value=-500.0,
-                        max_value=5000.0,
-                        value=0.0,
-                        step=10.0
-                    )
-                    # Calculate pressure from elevation using standard atmosphere
-                    pressure = 101.325 * (1 - 2.25577e-5 * elevation) ** 5.2559
-                
-                #st.metric("Calculated Pressure", f"{pressure:.3f} kPa")
-            
+
+def reset_point_widgets():
+    for key in list(st.session_state.keys()):
+        prefix, _, idx = str(key).rpartition('_')
+        if prefix in POINT_WIDGET_PREFIXES and idx.isdigit():
+            del st.session_state[key]
+
+
+@st.cache_data(max_entries=4, show_spinner="Analysing weather file...")
+def analyse_weather(data, name, pressure):
+    # Bins of an uploaded weather file, kept per file content and default pressure
+    import weather
+    return weather.analyse(io.BytesIO(data), fmt='epw' if name.lower().endswith('.epw') else None, pressure=pressure)
+
+
+@st.cache_data(max_entries=4, show_spinner="Reading trend file...")
+def load_trend_file(data, name, pressure):
+    # Solved trend of an uploaded file, kept per file content and default pressure
+    import replay
+    return replay.load_trend(io.BytesIO(data), fmt='epw' if name.lower().endswith('.epw') else None, pressure=pressure)
+
+
+@st.cache_data(max_entries=4, show_spinner="Checking weather hours against the envelopes...")
+def envelope_hours(data, name, pressure, specs):
+    # Hours outside each envelope, kept per file content, pressure and envelope limits
+    tally = envelopes.classify_file(io.BytesIO(data), build_envelopes(specs, pressure),
+                                    fmt='epw' if name.lower().endswith('.epw') else None, pressure=pressure)
+    return tally.table(hours_per_state=1), tally.missing
+
+
+def build_envelopes(specs, pressure):
+    # Envelopes of (name, limits) pairs at the site pressure (kPa)
+    return [envelopes.Envelope.from_limits(name, pressure=pressure, **limits) for name, limits in specs]
+
+
+def replay_renderer(pressure, trail_length):
+    # The blitting renderer keeps its drawn background between reruns; a new
+    # one is only set up when the site pressure changes
+    import replay
+    key = round(pressure, 3)
+    cached = st.session_state.get('replay_renderer')
+    if cached is None or cached[0] != key:
+        cached = (key, replay.BlitRenderer(get_base_chart('ashrae', pressure), trail_length))
+        st.session_state.replay_renderer = cached
+    renderer = cached[1]
+    if renderer.trail.capacity != trail_length:
+        renderer.trail = replay.RingBuffer(trail_length)
+    return renderer
+
+
+@st.cache_data(max_entries=8, show_spinner="Propagating sensor uncertainty...")
+def point_uncertainty(records, pressure, samples, dry_bulb_accuracy, rel_hum_accuracy, confidence):
+    # Intervals and chart ellipses of every point, kept per point state and settings
+    states = uncertainty.sample_points(records, pressure, samples, dry_bulb_accuracy, rel_hum_accuracy)
+    return uncertainty.summarize(states, confidence), uncertainty.ellipses(states, confidence)
+
+
+def properties_summary(pressure, intervals=None):
+    # One row per point, solved for all points in one vectorized pass;
+    # points without their own pressure use pressure (kPa). With intervals
+    # (uncertainty mode), main properties get a ± column of the interval's
+    # half-width.
+    store.refresh(pressure * 1000)
+    point_pressure = store.column('pressure')
+    point_pressure[np.isnan(point_pressure)] = pressure
+    states = solve_batch(store.column('dry_bulb'), engine.REL_HUM, store.column('rel_hum'), point_pressure)
+    summary = {
+        "Name": store.column('name'),
+        "Type": store.column('type'),
+        "Pressure (kPa)": point_pressure.round(3),
+        "Dry Bulb (°C)": store.column('dry_bulb').round(2),
+        "Wet Bulb (°C)": states['wet_bulb'].round(2),
+        "Dew Point (°C)": states['dew_point'].round(2),
+        "RH (%)": states['rel_hum'].round(2),
+        "Humidity Ratio (kg_v/kg_a)": states['hum_ratio'].round(6),
+        "Enthalpy (kJ/kg)": states['enthalpy'].round(2),
+        "Specific Volume (m³/kg_a)": states['specific_volume'].round(4),
+        "Density (kg/m³)": states['density'].round(4),
+        "Degree of Saturation (%)": states['degree_of_saturation'].round(2),
+        "Vapor Pressure (kPa)": states['vapor_pressure'].round(3),
+    }
+    if intervals is None:
+        return summary
+    with_intervals = {}
+    for column, values in summary.items():
+        with_intervals[column] = values
+        if column in UNCERTAINTY_COLUMNS:
+            key, decimals = UNCERTAINTY_COLUMNS[column]
+            _, low, high = intervals[key]
+            with_intervals[column.replace(" (", " ± (", 1)] = ((high - low) / 2).round(decimals)
+    return with_intervals
+
+
+# Name index and mixing graph over points_data, rebuilt when the list is replaced (import, clear)
+if 'point_store' not in st.session_state or st.session_state.point_store.points is not st.session_state.points_data:
+    st.session_state.point_store = PointStore(st.session_state.points_data)
+    reset_point_widgets()
+store = st.session_state.point_store
+# Per-section run times and stage spans, see the Performance panel
+timer = SectionTimer(st.session_state.setdefault('section_timings', {}))
+timer.start_run()
+# The Performance panel is opt-in: ?debug=1 in the URL, or PSYCHRO_DEBUG=1 for every session
+debug = st.query_params.get('debug') == '1' or os.environ.get('PSYCHRO_DEBUG') == '1'
+# Prometheus text file rewritten after every full run, if set
+METRICS_FILE = os.environ.get('PSYCHRO_METRICS_FILE')
+# cProfile capture of this run, requested from the Performance panel
+profiler = start_profile() if st.session_state.pop('profile_next_run', False) else None
+
+
+def point_stream(point, pressure):
+    # Engine-unit AirStream of an input point; pressure (kPa) if it has none
+    point_pressure = point.get('pressure') or pressure
+    return AirStream.from_input(point['dry_bulb'], point['rel_hum'] / 100, point_pressure * 1000)
+
+
+def mark_points_changed():
+    # on_change of the point panel widgets: the chart needs a full rerun
+    st.session_state.points_changed = True
+
+
+@st.fragment
+def add_condition_form(pressure):
+    # Typing in the new condition's inputs reruns only this form
+    with timer.section("Add condition"):
+        try:
             col1, col2 = st.columns([3, 1])
             
             with col1:
                 new_point_name = st.text_input("Point Name", value=f"Point_{st.session_state.point_counter}", key=f"new_point_name_{st.session_state.point_counter}")
             
             with col2:
-                new_point_color = st.color_picker("Color", value=distinctipy.get_hex(colours[st.session_state.point_counter - 1]), key=f"new_point_color_{st.session_state.point_counter}")
+                new_point_color = st.color_picker("Color", value=next_point_colour(), key=f"new_point_color_{st.session_state.point_counter}")
             
             # Temperature and Humidity Parameters
             col1, col2, col3, col4 = st.columns(4)
@@ -128,40 +261,18 @@ if True:
                     dew_point = humidity_value
 
             with col4:
-                # Convert pressure from kPa to Pa for PsychroLib
-                pressure_pa = pressure * 1000
-                
-                # Calculate based on the humidity input method
-                if humidity_method == "Relative Humidity (%)":
-                    # Already have rel_hum
-                    hum_ratio = psy.GetHumRatioFromRelHum(dry_bulb, rel_hum, pressure_pa)
-                    wet_bulb = psy.GetTWetBulbFromRelHum(dry_bulb, rel_hum, pressure_pa)
-                    dew_point = psy.GetTDewPointFromRelHum(dry_bulb, rel_hum)
-                elif humidity_method == "Wet Bulb (°C)":
-                    hum_ratio = psy.GetHumRatioFromTWetBulb(dry_bulb, wet_bulb, pressure_pa)
-                    rel_hum = psy.GetRelHumFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
-                    dew_point = psy.GetTDewPointFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
-                else:  # Dew Point
-                    hum_ratio = psy.GetHumRatioFromTDewPoint(dew_point, pressure_pa)
-                    rel_hum = psy.GetRelHumFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
-                    wet_bulb = psy.GetTWetBulbFromHumRatio(dry_bulb, hum_ratio, pressure_pa)
-                
-                # Calculate all other properties
-                enthalpy = psy.GetMoistAirEnthalpy(dry_bulb, hum_ratio) / 1000  # Convert to kJ/kg
-                specific_volume = psy.GetMoistAirVolume(dry_bulb, hum_ratio, pressure_pa)
-                density = psy.GetMoistAirDensity(dry_bulb, hum_ratio, pressure_pa)
-                
-                # Additional properties
-                sat_hum_ratio = psy.GetSatHumRatio(dry_bulb, pressure_pa)
-                degree_of_saturation = psy.GetDegreeOfSaturation(dry_bulb, hum_ratio, pressure_pa)
-                vapor_pressure = psy.GetVapPresFromHumRatio(hum_ratio, pressure_pa)
+                # Calculate all properties based on the humidity input method
+                with timer.span("Input solving"):
+                    state = solve_state(dry_bulb, HUMIDITY_METHODS[humidity_method], humidity_value, pressure)
+                rel_hum = state['rel_hum']
+                wet_bulb = state['wet_bulb']
+                dew_point = state['dew_point']
 
                 st.write("")  # Spacing
                 st.write("")  # Spacing
                 if st.button("➕ Add Point", type="primary", key="add_input_point", use_container_width=True):
                     # Check for duplicate names
-                    existing_names = [p['name'] for p in st.session_state.points_data]
-                    if new_point_name in existing_names:
+                    if new_point_name in store:
                         st.error(f"❌ Point name '{new_point_name}' already exists. Please use a unique name.")
                     else:
                         # Add the new point
@@ -175,425 +286,900 @@ if True:
                             'connects_to': None if len(st.session_state.points_data) == 0 else st.session_state.points_data[-1]['name'],
                             'pressure': pressure
                         }
-                        st.session_state.points_data.append(new_point)
+                        store.add(new_point)
                         st.session_state.point_counter += 1
                         st.success(f"✅ Added {new_point_name}")
                         st.rerun()
-                        
+        except Exception as e:
+            st.error(f"❌ Error in calculation: {str(e)}")
+            st.info("Please check your input values and try again. Ensure wet bulb temperature is not higher than dry bulb temperature.")
+
 
+@st.fragment
+def add_mixed_form():
+    with timer.section("Add mixed condition"):
+        # Get list of input points only (not mixed points)
+        input_points = store.names('input')
+        
+        if len(input_points) < 2:
+            st.info("You need at least 2 input points to create a mixed condition.")
+        else:
+            col1, col2 = st.columns([3, 1])
             
+            with col1:
+                mixed_point_name = st.text_input("Mixed Point Name", value=f"Mixed_{st.session_state.point_counter}", key=f"mixed_point_name_{st.session_state.point_counter}")
             
-        
-        with tab2:
-            # Get list of input points only (not mixed points)
-            input_points = [p['name'] for p in st.session_state.points_data if p.get('type', 'input') == 'input']
+            with col2:
+                mixed_point_color = st.color_picker("Color", value=next_point_colour(), key=f"mixed_point_color_{st.session_state.point_counter}")
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                source_point1 = st.selectbox("Source Point 1", options=input_points, key="source1")
+            
+            with col2:
+                source_point2 = st.selectbox("Source Point 2", options=input_points, index=min(1, len(input_points)-1), key="source2")
             
+            with col3:
+                mix_ratio1 = st.number_input("Flow Ratio 1", min_value=0.0, max_value=100.0, value=50.0, step=1.0, key="ratio1",
+                                            help="Percentage of Source Point 1 in the mix")
+            
+            mix_ratio2 = 100.0 - mix_ratio1
+            st.write(f"Flow Ratio 2: {mix_ratio2:.1f}%")
+            
+            if st.button("🔀 Add Mixed Condition", type="primary", key="add_mixed_point"):
+                # Check for duplicate names
+                if mixed_point_name in store:
+                    st.error(f"❌ Point name '{mixed_point_name}' already exists. Please use a unique name.")
+                elif source_point1 == source_point2:
+                    st.error(f"❌ Source points must be different.")
+                else:
+                    # Add the mixed point
+                    new_mixed_point = {
+                        'name': mixed_point_name,
+                        'type': 'mixed',
+                        'source1': source_point1,
+                        'source2': source_point2,
+                        'ratio1': mix_ratio1,
+                        'ratio2': mix_ratio2,
+                        'color': mixed_point_color,
+                        'connects_to': None
+                    }
+                    store.add(new_mixed_point)
+                    st.session_state.point_counter += 1
+                    st.success(f"✅ Added mixed condition {mixed_point_name}")
+                    st.rerun()
+
+
+@st.fragment
+def goal_seek_form(pressure):
+    # Solves for a mixing ratio, coil leaving condition or state that meets
+    # a design target, instead of adjusting inputs until a point lands on it
+    with timer.section("Goal seek"):
+        input_points = store.names('input')
+        mode = st.radio("Solve for", list(GOAL_SEEK_MODES), horizontal=True, key="goal_seek_mode")
+        
+        if mode == "Mixing ratio":
             if len(input_points) < 2:
-                st.info("You need at least 2 input points to create a mixed condition.")
-            else:
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    mixed_point_name = st.text_input("Mixed Point Name", value=f"Mixed_{st.session_state.point_counter}", key=f"mixed_point_name_{st.session_state.point_counter}")
+                st.info("You need at least 2 input points to solve for a mixing ratio.")
+                return
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                source_point1 = st.selectbox("Source Point 1", options=input_points, key="goal_source1")
+            with col2:
+                source_point2 = st.selectbox("Source Point 2", options=input_points, index=1, key="goal_source2")
+            with col3:
+                target_label = st.selectbox("Target", list(MIX_TARGET_UNITS), key="goal_mix_target")
+            quantity, scale = MIX_TARGET_UNITS[target_label]
+            with col4:
+                target = st.number_input(target_label, value=25.0, step=0.1, key="goal_mix_value")
+            if source_point1 == source_point2:
+                st.error("❌ Source points must be different.")
+                return
+            stream1 = point_stream(store.get(source_point1), pressure)
+            stream2 = point_stream(store.get(source_point2), pressure)
+            with timer.span("Goal seek"):
+                fraction = float(goal_seek.mixing_fraction(stream1, stream2, target / scale, quantity))
+            # Points with the same state mix to that state at any ratio
+            same_state = stream1[:3] == stream2[:3]
+            if np.isnan(fraction):
+                if same_state:
+                    st.warning(f"{source_point1} and {source_point2} have the same state, so every mix has it too and none reaches {target:g} {target_label}.")
+                else:
+                    st.warning(f"No mix of {source_point1} and {source_point2} reaches {target:g} {target_label}.")
+                return
+            if same_state:
+                st.info(f"{source_point1} and {source_point2} have the same state, so any ratio reaches {target:g} {target_label}; an even mix is shown.")
+            ratio1 = round(fraction * 100, 2)
+            st.metric(f"Flow Ratio of {source_point1}", f"{ratio1:.2f} %")
+            st.caption(f"Dry air mass share; {source_point2} makes up the remaining {100 - ratio1:.2f} %.")
+            if st.button("🔀 Add Mixed Condition", key="goal_add_mixed"):
+                name = f"Mixed_{st.session_state.point_counter}"
+                if name in store:
+                    st.error(f"❌ Point name '{name}' already exists.")
+                    return
+                store.add({
+                    'name': name,
+                    'type': 'mixed',
+                    'source1': source_point1,
+                    'source2': source_point2,
+                    'ratio1': ratio1,
+                    'ratio2': round(100 - ratio1, 2),
+                    'color': next_point_colour(),
+                    'connects_to': None
+                })
+                st.session_state.point_counter += 1
+                st.rerun()
+        
+        elif mode == "Coil leaving condition":
+            if not input_points:
+                st.info("Add an input point to solve for a coil's leaving condition.")
+                return
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                entering = st.selectbox("Entering Point", options=input_points, key="goal_coil_point")
+            with col2:
+                target_rh = st.number_input("Leaving RH (%)", min_value=1.0, max_value=100.0, value=90.0, step=1.0,
+                                            key="goal_coil_rh")
+            with col3:
+                bypass_factor = st.number_input("Bypass Factor", min_value=0.0, max_value=0.99, value=0.15, step=0.01,
+                                                key="goal_coil_bf")
+            stream = point_stream(store.get(entering), pressure)
+            with timer.span("Goal seek"):
+                sensible_db = float(goal_seek.leaving_dry_bulb_for_rel_hum(stream, target_rh / 100))
+                adp = float(goal_seek.coil_adp_for_rel_hum(stream, target_rh / 100, bypass_factor))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Sensible (dry) coil**")
+                if np.isnan(sensible_db):
+                    st.warning("Out of range.")
+                else:
+                    st.metric("Leaving Dry Bulb", f"{sensible_db:.2f} °C")
+            with col2:
+                st.write("**Wet cooling coil**")
+                if np.isnan(adp):
+                    st.warning(f"No apparatus dew point leaves {entering} at {target_rh:g}% RH with this bypass factor.")
+                else:
+                    leaving = cooling_coil(stream, adp, bypass_factor)
+                    st.metric("Apparatus Dew Point", f"{adp:.2f} °C")
+                    st.caption(f"Leaving at {float(leaving.dry_bulb):.2f} °C and "
+                               f"{float(leaving.hum_ratio) * 1000:.2f} g/kg.")
+        
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                enthalpy = st.number_input("Enthalpy (kJ/kg)", min_value=-50.0, max_value=500.0, value=50.0, step=0.5,
+                                           key="goal_state_h")
+            with col2:
+                target_rh = st.number_input("Relative Humidity (%)", min_value=1.0, max_value=100.0, value=50.0,
+                                            step=1.0, key="goal_state_rh")
+            with timer.span("Goal seek"):
+                state = goal_seek.state_from_enthalpy_rel_hum(enthalpy * 1000, target_rh / 100, pressure * 1000)
+            dry_bulb = float(state['dry_bulb'])
+            if np.isnan(dry_bulb):
+                st.warning(f"No state at {pressure:.3f} kPa has {enthalpy:g} kJ/kg and {target_rh:g}% RH.")
+                return
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Dry Bulb", f"{dry_bulb:.2f} °C")
+            col2.metric("Wet Bulb", f"{float(state['wet_bulb']):.2f} °C")
+            col3.metric("Humidity Ratio", f"{float(state['hum_ratio']) * 1000:.2f} g/kg")
+            if st.button("➕ Add Point", key="goal_add_state"):
+                name = f"Point_{st.session_state.point_counter}"
+                if name in store:
+                    st.error(f"❌ Point name '{name}' already exists.")
+                    return
+                store.add({
+                    'name': name,
+                    'type': 'input',
+                    'dry_bulb': round(dry_bulb, 2),
+                    'rel_hum': round(target_rh, 2),
+                    'wet_bulb': round(float(state['wet_bulb']), 2),
+                    'color': next_point_colour(),
+                    'connects_to': None if len(st.session_state.points_data) == 0 else st.session_state.points_data[-1]['name'],
+                    'pressure': pressure
+                })
+                st.session_state.point_counter += 1
+                st.rerun()
+
+
+@st.fragment
+def point_panel(idx, all_point_names, input_point_names, pressure, intervals=None):
+    # One point's editor and properties; edits rerun this panel, and the
+    # whole app only when the plotted state changed
+    with timer.section("Point panels", idx):
+        point = st.session_state.points_data[idx]
+        pressure_pa = pressure * 1000
+        point_type = point.get('type', 'input')
+        
+        # Recalculate mixed points only when their sources, ratios or pressure changed
+        if point_type == 'mixed':
+            with timer.span("Mixed points"):
+                store.refresh_mixed(point, pressure_pa)
+        
+        # Display point based on type
+        if point_type == 'input':
+            expander_title = f"📍 {point['name']}"
+        else:
+            expander_title = f"🔀 {point['name']} (Mixed)"
+        
+        panel = st.expander(expander_title, expanded=False, key=f"panel_{idx}", on_change="rerun")
+        with panel:
+            if point_type == 'input':
+                # Input point - fully editable
+                cols = st.columns([2, 2, 2, 2, 1])
                 
-                with col2:
-                    mixed_point_color = st.color_picker("Color", value=distinctipy.get_hex(colours[st.session_state.point_counter - 1]), key=f"mixed_point_color_{st.session_state.point_counter}")
+                with cols[0]:
+                    new_name = st.text_input(
+                        "Point Name",
+                        value=point['name'],
+                        key=f"name_{idx}"
+                    )
+                    # Check for duplicates when name changes
+                    if new_name != point['name']:
+                        if new_name in store:
+                            st.error("Duplicate name!")
+                        else:
+                            store.rename(point['name'], new_name)
+                            reset_point_widgets()
+                            st.rerun()
                 
-                col1, col2, col3 = st.columns(3)
+                with cols[1]:
+                    point['dry_bulb'] = round(st.number_input(
+                        "Dry Bulb (°C)",
+                        value=float(point['dry_bulb']),
+                        step=0.1,
+                        format="%.1f",
+                        key=f"db_{idx}",
+                        on_change=mark_points_changed
+                    ), 2)
                 
-                with col1:
-                    source_point1 = st.selectbox("Source Point 1", options=input_points, key="source1")
+                with cols[2]:
+                    point['wet_bulb'] = st.number_input(
+                        "Wet Bulb (°C)",
+                        value=float(point['wet_bulb']),
+                        step=0.1,
+                        format="%.1f",
+                        key=f"wb_{idx}",
+                        on_change=mark_points_changed
+                    )
                 
-                with col2:
-                    source_point2 = st.selectbox("Source Point 2", options=input_points, index=min(1, len(input_points)-1), key="source2")
+                # Recalculate wet bulb based on dry bulb and RH
+                try:
+                    calculated_rh = rel_hum_from_wet_bulb(point['dry_bulb'], point['wet_bulb'], point.get('pressure', pressure))
+                    point['rel_hum'] = round(calculated_rh, 1)
+                except:
+                    pass
                 
-                with col3:
-                    mix_ratio1 = st.number_input("Flow Ratio 1", min_value=0.0, max_value=100.0, value=50.0, step=1.0, key="ratio1",
-                                                help="Percentage of Source Point 1 in the mix")
+                with cols[3]:
+                    # Connection dropdown - allow None or any other point
+                    connection_options = ['None'] + [p for p in all_point_names if p != point['name']]
+                    current_connection = point['connects_to'] if point['connects_to'] else 'None'
+                    if current_connection not in connection_options:
+                        current_connection = 'None'
+                    
+                    selected_connection = st.selectbox(
+                        "Next State",
+                        options=connection_options,
+                        index=connection_options.index(current_connection),
+                        key=f"conn_{idx}",
+                        on_change=mark_points_changed
+                    )
+                    point['connects_to'] = None if selected_connection == 'None' else selected_connection
                 
-                mix_ratio2 = 100.0 - mix_ratio1
-                st.write(f"Flow Ratio 2: {mix_ratio2:.1f}%")
+                with cols[4]:
+                    point['color'] = st.color_picker(
+                        "Color",
+                        value=point['color'],
+                        key=f"color_{idx}",
+                        on_change=mark_points_changed
+                    )
                 
-                if st.button("🔀 Add Mixed Condition", type="primary", key="add_mixed_point"):
-                    # Check for duplicate names
-                    existing_names = [p['name'] for p in st.session_state.points_data]
-                    if mixed_point_name in existing_names:
-                        st.error(f"❌ Point name '{mixed_point_name}' already exists. Please use a unique name.")
-                    elif source_point1 == source_point2:
-                        st.error(f"❌ Source points must be different.")
-                    else:
-                        # Add the mixed point
-                        new_mixed_point = {
-                            'name': mixed_point_name,
-                            'type': 'mixed',
-                            'source1': source_point1,
-                            'source2': source_point2,
-                            'ratio1': mix_ratio1,
-                            'ratio2': mix_ratio2,
-                            'color': mixed_point_color,
-                            'connects_to': None
-                        }
-                        st.session_state.points_data.append(new_mixed_point)
-                        st.session_state.point_counter += 1
-                        st.success(f"✅ Added mixed condition {mixed_point_name}")
-                        st.rerun()
-        
-        # Display and edit existing points
-        if st.session_state.points_data:
-            st.subheader("Plotted Conditions")
-            
-            # Get list of all point names for connection dropdown
-            all_point_names = [p['name'] for p in st.session_state.points_data]
-            input_point_names = [p['name'] for p in st.session_state.points_data if p.get('type', 'input') == 'input']
+                # Display calculated wet bulb (read-only)
+                # st.info(f"{point['rel_hum']}% RH")
+                st.caption(f"{point['rel_hum']:.1f}% RH at {point.get('pressure', pressure):.3f} kPa")
             
-            for idx, point in enumerate(st.session_state.points_data):
-                point_type = point.get('type', 'input')
+            else:  # Mixed point
+                cols = st.columns([2, 2, 2, 2, 2, 1])
                 
-                # Calculate properties for mixed points dynamically
-                if point_type == 'mixed':
-                    # Find source points
-                    source1_data = next((p for p in st.session_state.points_data if p['name'] == point['source1']), None)
-                    source2_data = next((p for p in st.session_state.points_data if p['name'] == point['source2']), None)
-                    
-                    if source1_data and source2_data:
-                        # Calculate humidity ratios for both source points
-                        try:
-                            hr1 = psy.GetHumRatioFromRelHum(source1_data['dry_bulb'], source1_data['rel_hum']/100, pressure_pa)
-                            hr2 = psy.GetHumRatioFromRelHum(source2_data['dry_bulb'], source2_data['rel_hum']/100, pressure_pa)
-                            
-                            # Calculate mixed properties
-                            r1 = point['ratio1'] / 100
-                            r2 = point['ratio2'] / 100
-                            
-                            mixed_db = source1_data['dry_bulb'] * r1 + source2_data['dry_bulb'] * r2
-                            mixed_hr = hr1 * r1 + hr2 * r2
-                            mixed_rh = psy.GetRelHumFromHumRatio(mixed_db, mixed_hr, pressure_pa) * 100
-                            mixed_wb = psy.GetTWetBulbFromHumRatio(mixed_db, mixed_hr, pressure_pa)
-                            
-                            # Update point data
-                            point['dry_bulb'] = round(mixed_db, 1)
-                            point['rel_hum'] = round(mixed_rh, 1)
-                            point['wet_bulb'] = round(mixed_wb, 1)
-                        except:
-                            pass
+                with cols[0]:
+                    new_name = st.text_input(
+                        "Point Name",
+                        value=point['name'],
+                        key=f"name_{idx}"
+                    )
+                    if new_name != point['name']:
+                        if new_name in store:
+                            st.error("Duplicate name!")
+                        else:
+                            store.rename(point['name'], new_name)
+                            reset_point_widgets()
+                            st.rerun()
                 
-                # Display point based on type
-                if point_type == 'input':
-                    expander_title = f"📍 {point['name']}"
-                else:
-                    expander_title = f"🔀 {point['name']} (Mixed)"
+                with cols[1]:
+                    source1 = st.selectbox(
+                        "Source 1",
+                        options=input_point_names,
+                        index=input_point_names.index(point['source1']) if point['source1'] in input_point_names else 0,
+                        key=f"src1_{idx}",
+                        on_change=mark_points_changed
+                    )
                 
-                with st.expander(expander_title, expanded=False):
-                    if point_type == 'input':
-                        # Input point - fully editable
-                        cols = st.columns([2, 2, 2, 2, 1])
-                        
-                        with cols[0]:
-                            new_name = st.text_input(
-                                "Point Name",
-                                value=point['name'],
-                                key=f"name_{idx}"
-                            )
-                            # Check for duplicates when name changes
-                            if new_name != point['name']:
-                                other_names = [p['name'] for i, p in enumerate(st.session_state.points_data) if i != idx]
-                                if new_name in other_names:
-                                    st.error("Duplicate name!")
-                                else:
-                                    point['name'] = new_name
-                        
-                        with cols[1]:
-                            point['dry_bulb'] = round(st.number_input(
-                                "Dry Bulb (°C)",
-                                value=float(point['dry_bulb']),
-                                step=0.1,
-                                format="%.1f",
-                                key=f"db_{idx}"
-                            ), 2)
-                        
-                        with cols[2]:
-                            point['wet_bulb'] = st.number_input(
-                                "Wet Bulb (°C)",
-                                value=float(point['wet_bulb']),
-                                step=0.1,
-                                format="%.1f",
-                                key=f"wb_{idx}"
-                            )
-                        
-                        # Recalculate wet bulb based on dry bulb and RH
-                        try:
-                            point_pressure_pa = point.get('pressure', pressure) * 1000
-                            calculated_rh = psy.GetRelHumFromTWetBulb(
-                                point['dry_bulb'], 
-                                point['wet_bulb'], 
-                                point_pressure_pa
-                            ) * 100
-                            point['rel_hum'] = round(calculated_rh, 1)
-                        except:
-                            pass
-                        
-                        with cols[3]:
-                            # Connection dropdown - allow None or any other point
-                            connection_options = ['None'] + [p for p in all_point_names if p != point['name']]
-                            current_connection = point['connects_to'] if point['connects_to'] else 'None'
-                            if current_connection not in connection_options:
-                                current_connection = 'None'
-                            
-                            selected_connection = st.selectbox(
-                                "Next State",
-                                options=connection_options,
-                                index=connection_options.index(current_connection),
-                                key=f"conn_{idx}"
-                            )
-                            point['connects_to'] = None if selected_connection == 'None' else selected_connection
-                        
-                        with cols[4]:
-                            point['color'] = st.color_picker(
-                                "Color",
-                                value=point['color'],
-                                key=f"color_{idx}"
-                            )
-                        
-                        # Display calculated wet bulb (read-only)
-                        # st.info(f"{point['rel_hum']}% RH")
+                with cols[2]:
+                    source2 = st.selectbox(
+                        "Source 2",
+                        options=input_point_names,
+                        index=input_point_names.index(point['source2']) if point['source2'] in input_point_names else 0,
+                        key=f"src2_{idx}",
+                        on_change=mark_points_changed
+                    )
+                
+                if (source1, source2) != (point['source1'], point['source2']):
+                    store.set_sources(point['name'], source1, source2)
+                
+                with cols[3]:
+                    point['ratio1'] = st.number_input(
+                        "Ratio 1 (%)",
+                        value=float(point['ratio1']),
+                        min_value=0.0,
+                        max_value=100.0,
+                        step=1.0,
+                        key=f"ratio1_{idx}",
+                        on_change=mark_points_changed
+                    )
+                    point['ratio2'] = 100.0 - point['ratio1']
+                    st.caption(f"Ratio 2: {point['ratio2']:.1f}%")
+                
+                with cols[4]:
+                    # Connection dropdown
+                    connection_options = ['None'] + [p for p in all_point_names if p != point['name']]
+                    current_connection = point['connects_to'] if point['connects_to'] else 'None'
+                    if current_connection not in connection_options:
+                        current_connection = 'None'
                     
-                    else:  # Mixed point
-                        cols = st.columns([2, 2, 2, 2, 2, 1])
-                        
-                        with cols[0]:
-                            new_name = st.text_input(
-                                "Point Name",
-                                value=point['name'],
-                                key=f"name_{idx}"
-                            )
-                            if new_name != point['name']:
-                                other_names = [p['name'] for i, p in enumerate(st.session_state.points_data) if i != idx]
-                                if new_name in other_names:
-                                    st.error("Duplicate name!")
-                                else:
-                                    point['name'] = new_name
-                        
-                        with cols[1]:
-                            point['source1'] = st.selectbox(
-                                "Source 1",
-                                options=input_point_names,
-                                index=input_point_names.index(point['source1']) if point['source1'] in input_point_names else 0,
-                                key=f"src1_{idx}"
-                            )
-                        
-                        with cols[2]:
-                            point['source2'] = st.selectbox(
-                                "Source 2",
-                                options=input_point_names,
-                                index=input_point_names.index(point['source2']) if point['source2'] in input_point_names else 0,
-                                key=f"src2_{idx}"
-                            )
-                        
-                        with cols[3]:
-                            point['ratio1'] = st.number_input(
-                                "Ratio 1 (%)",
-                                value=float(point['ratio1']),
-                                min_value=0.0,
-                                max_value=100.0,
-                                step=1.0,
-                                key=f"ratio1_{idx}"
-                            )
-                            point['ratio2'] = 100.0 - point['ratio1']
-                            st.caption(f"Ratio 2: {point['ratio2']:.1f}%")
-                        
-                        with cols[4]:
-                            # Connection dropdown
-                            connection_options = ['None'] + [p for p in all_point_names if p != point['name']]
-                            current_connection = point['connects_to'] if point['connects_to'] else 'None'
-                            if current_connection not in connection_options:
-                                current_connection = 'None'
-                            
-                            selected_connection = st.selectbox(
-                                "Next State",
-                                options=connection_options,
-                                index=connection_options.index(current_connection),
-                                key=f"conn_{idx}"
-                            )
-                            point['connects_to'] = None if selected_connection == 'None' else selected_connection
-                        
-                        with cols[5]:
-                            point['color'] = st.color_picker(
-                                "Color",
-                                value=point['color'],
-                                key=f"color_{idx}"
-                            )
+                    selected_connection = st.selectbox(
+                        "Next State",
+                        options=connection_options,
+                        index=connection_options.index(current_connection),
+                        key=f"conn_{idx}",
+                        on_change=mark_points_changed
+                    )
+                    point['connects_to'] = None if selected_connection == 'None' else selected_connection
+                
+                with cols[5]:
+                    point['color'] = st.color_picker(
+                        "Color",
+                        value=point['color'],
+                        key=f"color_{idx}",
+                        on_change=mark_points_changed
+                    )
 
-                        # Display calculated properties (read-only)
-                        #st.info(f"**Calculated:** {point['dry_bulb']:.1f}°C DB, {point['wet_bulb']:.1f}°C WB, {point['rel_hum']:.1f}% RH")
-                    
-                    # Calculate and display full properties table for this point
-                    try:
-                        point_pressure_pa = point.get('pressure', pressure) * 1000
-                        point_db = point['dry_bulb']
-                        point_rh = point['rel_hum'] / 100
-                        
-                        # Calculate all properties
-                        point_hr = psy.GetHumRatioFromRelHum(point_db, point_rh, point_pressure_pa)
-                        point_wb = psy.GetTWetBulbFromRelHum(point_db, point_rh, point_pressure_pa)
-                        point_dp = psy.GetTDewPointFromRelHum(point_db, point_rh)
-                        point_enthalpy = psy.GetMoistAirEnthalpy(point_db, point_hr) / 1000
-                        point_vol = psy.GetMoistAirVolume(point_db, point_hr, point_pressure_pa)
-                        point_density = psy.GetMoistAirDensity(point_db, point_hr, point_pressure_pa)
-                        point_vp = psy.GetVapPresFromHumRatio(point_hr, point_pressure_pa) / 1000
-                        point_sat_vp = psy.GetSatVapPres(point_db) / 1000
-                        point_deg_sat = psy.GetDegreeOfSaturation(point_db, point_hr, point_pressure_pa)
-                        
-                        # Combined properties table
+                # Display calculated properties (read-only)
+                #st.info(f"**Calculated:** {point['dry_bulb']:.1f}°C DB, {point['wet_bulb']:.1f}°C WB, {point['rel_hum']:.1f}% RH")
+                if 'pressure' in point:
+                    st.caption(f"Mixed at {point['pressure']:.3f} kPa (mass-weighted from the sources)")
+            
+            # Properties only for open panels; a collapsed panel skips the work
+            if panel.open:
+                try:
+                    with timer.span("Property tables"):
+                        values = point_properties(point['dry_bulb'], point['rel_hum'], point.get('pressure', pressure))
                         st.subheader("Properties")
-                        combined_data = {
-                            "Property": [
-                                "Barometric Pressure",
-                                "Dry Bulb",
-                                "Wet Bulb",
-                                "Dew Point",
-                                "Relative Humidity",
-                                "Humidity Ratio",
-                                "Enthalpy",
-                                "Specific Volume",
-                                "Density",
-                                "Degree of Saturation",
-                                "Absolute Humidity",
-                                "Partial Pressure of Water Vapor",
-                                "Saturation Vapor Pressure"
-                            ],
-                            "Value": [
-                                f"{point.get('pressure', pressure):.3f}",
-                                f"{point_db:.2f}",
-                                f"{point_wb:.2f}",
-                                f"{point_dp:.2f}",
-                                f"{point_rh * 100:.2f}",
-                                f"{point_hr:.6f}",
-                                f"{point_enthalpy:.2f}",
-                                f"{point_vol:.4f}",
-                                f"{point_density:.4f}",
-                                f"{point_deg_sat * 100:.2f}",
-                                f"{point_hr * point_density:.6f}",
-                                f"{point_vp:.3f}",
-                                f"{point_sat_vp:.3f}"
-                            ],
-                            "Units": [
-                                "kPa",
-                                "°C",
-                                "°C",
-                                "°C",
-                                "%",
-                                "kg_v/kg_a",
-                                "kJ/kg",
-                                "m³/kg_a",
-                                "kg/m³",
-                                "%",
-                                "kg_v/m³",
-                                "kPa",
-                                "kPa"
-                            ]
+                        table = {
+                            "Property": [label for label, _ in PROPERTY_ROWS],
+                            "Value": values,
+                            "Units": [units for _, units in PROPERTY_ROWS],
                         }
-                        combined_df = pd.DataFrame(combined_data)
-                        st.table(combined_df)
-                    except Exception as e:
-                        st.error(f"Error calculating properties: {str(e)}")
-                    
-                    # Delete button
-                    if st.button(f"🗑️ Delete", key=f"del_{idx}"):
-                        st.session_state.points_data.pop(idx)
-                        st.rerun()
+                        if intervals is not None:
+                            table[f"{st.session_state.uncertainty_confidence}% Interval"] = intervals
+                        st.table(table)
+                except Exception as e:
+                    st.error(f"Error calculating properties: {str(e)}")
             
-            # Export/Import and Clear buttons
+            # Delete button
+            if st.button(f"🗑️ Delete", key=f"del_{idx}"):
+                store.remove(point['name'])
+                reset_point_widgets()
+                st.rerun()
+        
+        if st.session_state.pop('points_changed', False):
+            st.rerun()
+
+
+@st.fragment
+def psychrometric_chart(pressure, weather_bins, ellipses=None, envelope_specs=()):
+    # Chart options rerun only the chart; an unchanged plotted state is
+    # served from the image cache
+    with timer.section("Chart"):
+        with st.expander("⚙️ Chart Options"):
             col1, col2 = st.columns(2)
-            
             with col1:
-                # Export points to JSON
-                export_data = {
-                    'points_data': st.session_state.points_data,
-                    'point_counter': st.session_state.point_counter
-                }
-                json_str = json.dumps(export_data, indent=2)
-                st.download_button(
-                    label="📥 Export Points",
-                    data=json_str,
-                    file_name="psychrometric_points.json",
-                    mime="application/json",
-                    use_container_width=True
+                dense_threshold = st.number_input(
+                    "Aggregate points above",
+                    min_value=1,
+                    value=DENSE_POINT_THRESHOLD,
+                    step=50,
+                    help=f"Above this many points, unnamed points are drawn as one density layer. Mixed and connected points, and renamed points up to {MAX_NAMED_POINTS} in all, keep their markers and legend entries.",
+                    key="dense_threshold"
                 )
-            
             with col2:
-                if st.button("🗑️ Clear All Points", use_container_width=True):
-                    st.session_state.points_data = []
-                    st.session_state.point_counter = 1
-                    st.rerun()
-        else:
-            # Show import option even when no points exist
-            st.info("No saved points yet. Add points above or import existing data.")
-            uploaded_file = st.file_uploader("📤 Import Points", type=['json'], key="import_points_empty")
-            if uploaded_file is not None:
-                try:
-                    import_data = json.loads(uploaded_file.getvalue().decode('utf-8'))
-                    st.session_state.points_data = import_data.get('points_data', [])
-                    st.session_state.point_counter = import_data.get('point_counter', 1)
-                    st.success(f"✅ Imported {len(st.session_state.points_data)} points")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Error importing file: {str(e)}")
+                dense_mode = st.selectbox(
+                    "Large point sets",
+                    options=DENSE_MODES,
+                    format_func={'hexbin': "Hexbin", 'histogram': "2D histogram", 'scatter': "Rasterized scatter"}.get,
+                    key="dense_mode"
+                )
+            # Points keep their own site pressure; the curves are drawn for one of them
+            point_pressures = store.column('pressure')
+            point_levels = np.unique(point_pressures[~np.isnan(point_pressures)].round(3)).tolist()
+            levels = sorted(set(point_levels) | {round(pressure, 3)})
+            chart_pressure = round(pressure, 3)
+            if len(levels) > 1:
+                # No key: the choice goes back to the barometric pressure when the pressures change
+                chart_pressure = st.selectbox(
+                    "Chart pressure",
+                    options=levels,
+                    index=levels.index(chart_pressure),
+                    format_func=lambda p: f"{p:.3f} kPa" + (" (barometric pressure above)" if p == round(pressure, 3) else ""),
+                    help="Curves are drawn for this pressure. Every point is placed by its dry bulb and humidity ratio at its own pressure."
+                )
         
-        # Psychrometric Chart
-        st.subheader("Psychrometric Chart")
+        # Everything the image depends on; unchanged inputs reuse the last PNG
+        weather_digest = None if weather_bins is None else content_key(weather_bins.counts.tobytes().hex())
+        ellipse_digest = None if ellipses is None else content_key(np.concatenate(ellipses).tobytes().hex())
+        key = content_key('ashrae', store.to_records(), pressure, chart_pressure, weather_digest, ellipse_digest,
+                          envelope_specs, dense_threshold, dense_mode)
         
-        try:
-            # Create psychrometric chart
-            chart = PsychroChart.create('ashrae')
-            ax = chart.plot()
+        def render():
+            import matplotlib.pyplot as plt
+            
+            # Get a copy of the cached base chart (curves already plotted)
+            with timer.span("Chart: base chart"):
+                chart = get_base_chart('ashrae', chart_pressure)
+            ax = chart.axes
+            
+            # Weather hours as one shaded density layer rather than 8760 markers
+            if weather_bins is not None:
+                with timer.span("Chart: weather overlay"):
+                    plot_bin_density(ax, weather_bins.dry_bulb_edges, weather_bins.hum_ratio_edges, weather_bins.counts)
+            
+            # Comfort and equipment envelopes, drawn for the curves' pressure
+            if envelope_specs:
+                with timer.span("Chart: envelopes"):
+                    plot_envelopes(ax, build_envelopes(envelope_specs, chart_pressure))
+            
+            # Sensor uncertainty of each point as an ellipse under its marker
+            if ellipses is not None:
+                with timer.span("Chart: uncertainty ellipses"):
+                    plot_ellipses(ax, *ellipses, colors=[p['color'] for p in st.session_state.points_data])
             
-            # Convert points_data to psychrochart format
             if st.session_state.points_data:
-                points_dict = {}
-                connectors_list = []
-                arrows_dict = {}
-                
-                for point in st.session_state.points_data:
-                    # Convert hex color to RGBA
-                    hex_color = point['color'].lstrip('#')
-                    r, g, b = tuple(int(hex_color[i:i+2], 16) / 255 for i in (0, 2, 4))
-                    
-                    points_dict[point['name']] = {
-                        'label': point['name'],
-                        'style': {
-                            'color': [r, g, b, 0.8],
-                            'marker': 'o',
-                            'markersize': 15
-                        },
-                        'xy': (point['dry_bulb'], point['rel_hum'])
-                    }
-                    
-                    # Add connector if this point connects to another
-                    if point['connects_to']:
-                        connectors_list.append({
-                            'start': point['name'],
-                            'end': point['connects_to'],
-                            'label': f"{point['name']} → {point['connects_to']}",
-                            'style': {
-                                'color': [r, g, b, 0.7],
-                                'linewidth': 5,
-                                'linestyle': '--'
-                            }
-                        })
-                
-                chart.plot_points_dbt_rh(points_dict, connectors_list)
-
-                
+                with timer.span("Chart: points and legend"):
+                    plot_points(chart, st.session_state.points_data, pressure, dense_threshold, dense_mode)
+            elif envelope_specs:
+                # Envelopes are named in the legend; plot_points adds it otherwise
                 chart.plot_legend(markerscale=.7, frameon=False, fontsize=10, labelspacing=1.2)
             
-            # Display the chart
             fig = ax.figure
-            st.pyplot(fig)
-            plt.close()
+            try:
+                with timer.span("Chart: render PNG"):
+                    return figure_to_image(fig)
+            finally:
+                plt.close(fig)
+        
+        try:
+            start = time.perf_counter()
+            image, rendered = image_cache.get(key, render)
+            elapsed = (time.perf_counter() - start) * 1000
+            if rendered:
+                st.session_state.chart_render_ms = elapsed
+            else:
+                timer.saved("Chart", st.session_state.get('chart_render_ms', 0.0) - elapsed)
+            
+            # Display the chart
+            with timer.span("Chart: display"):
+                st.image(image, use_container_width=True)
+            if any(level != chart_pressure for level in point_levels):
+                st.caption(f"Curves are for {chart_pressure:.3f} kPa. Points at other pressures are placed by their humidity ratio, so their RH differs from the curves'.")
         except Exception as chart_error:
             st.warning(f"Could not generate psychrometric chart: {str(chart_error)}")
+
+
+def custom_envelope_form():
+    # A custom envelope from dry bulb, RH and dew point limits
+    with st.form("custom_envelope_form", clear_on_submit=True):
+        name = st.text_input("Name", placeholder="e.g. Cleanroom ISO 7")
+        col1, col2, col3 = st.columns(3)
+        dry_bulb = col1.slider("Dry Bulb (°C)", min_value=-10.0, max_value=50.0, value=(20.0, 24.0), step=0.5)
+        rel_hum = col2.slider("RH (%)", min_value=0.0, max_value=100.0, value=(30.0, 60.0), step=1.0)
+        dew_point = col3.slider("Dew Point (°C)", min_value=-20.0, max_value=30.0, value=(-20.0, 30.0), step=0.5)
+        if st.form_submit_button("Add Envelope"):
+            name = name.strip()
+            if not name:
+                st.error("❌ Please enter a name")
+            elif name in envelopes.PRESETS:
+                st.error(f"❌ '{name}' is a preset")
+            else:
+                limits = {'dry_bulb': dry_bulb, 'rel_hum': rel_hum, 'dew_point': dew_point}
+                try:
+                    envelopes.Envelope.from_limits(name, **limits)
+                except ValueError as e:
+                    st.error(f"❌ {str(e)}")
+                else:
+                    st.session_state.custom_envelopes[name] = limits
+                    # Selected on the rerun, before the multiselect is drawn
+                    st.session_state.envelope_added = name
+                    st.rerun()
+
+
+def envelope_panel(pressure, weather_file):
+    # Envelopes to check, the points and weather hours outside each, and the
+    # (name, limits) pairs to draw on the chart ('()' for none)
+    custom = st.session_state.custom_envelopes
+    options = list(envelopes.PRESETS) + list(custom)
+    # Removed custom envelopes drop out of the selection; a new one joins it
+    selected = [name for name in st.session_state.get('envelope_names', []) if name in options]
+    added = st.session_state.pop('envelope_added', None)
+    st.session_state.envelope_names = selected + ([added] if added and added not in selected else [])
+    names = st.multiselect("Envelopes", options, key="envelope_names")
+    st.caption("The comfort zone's dry bulb band stands in for the operative temperature range; the data hall envelopes follow ASHRAE TC 9.9 class A1.")
+    with st.popover("➕ Custom Envelope"):
+        custom_envelope_form()
+    if custom and st.button("🗑️ Remove Custom Envelopes", key="remove_custom_envelopes"):
+        st.session_state.custom_envelopes = {}
+        st.rerun()
+    if not names:
+        return ()
+    specs = tuple((name, custom.get(name) or envelopes.PRESETS[name]) for name in names)
+    show = st.checkbox("Show envelopes on chart", value=True, key="envelope_overlay")
+    
+    if st.session_state.points_data:
+        with timer.span("Envelopes: points"):
+            dry_bulb, hum_ratio = points_to_chart_xy(st.session_state.points_data, pressure)
+            table = envelopes.classify(build_envelopes(specs, pressure), dry_bulb, hum_ratio)
+        st.write("**Plotted Points**")
+        st.dataframe(table.round(1), hide_index=True, use_container_width=True)
+    if weather_file is not None:
+        try:
+            with timer.span("Envelopes: weather hours"):
+                table, missing = envelope_hours(weather_file.getvalue(), weather_file.name, pressure, specs)
+            st.write("**Weather Hours**")
+            st.dataframe(table.round(1), hide_index=True, use_container_width=True)
+            if missing:
+                st.caption(f"{missing:,} missing or invalid hours are not counted.")
+        except Exception as e:
+            st.error(f"❌ Error reading weather file: {str(e)}")
+    return specs if show else ()
+
+
+@st.fragment
+def trend_replay(pressure):
+    # Plays trend data over the chart; each frame only redraws the trail on
+    # the kept background, so playback never re-renders the chart
+    import replay
+    with timer.section("Trend replay"):
+        source = st.radio("Source", ["Trend file", "Live socket"], horizontal=True, key="replay_source")
+        col1, col2, col3 = st.columns(3)
+        trail_length = col1.number_input("Trail (samples)", min_value=10, max_value=10_000, value=replay.TRAIL_LENGTH,
+                                         step=10, key="replay_trail")
+        fps = col2.number_input("Frames per second", min_value=1, max_value=60, value=replay.FRAME_RATE, key="replay_fps")
+        step = col3.number_input("Samples per frame", min_value=1, max_value=1000, value=1, key="replay_step")
+        renderer = replay_renderer(pressure, trail_length)
+        
+        if source == "Trend file":
+            trend_file = st.file_uploader("Trend File (CSV or EPW)", type=['csv', 'epw'], key="replay_file")
+            st.caption("Columns as for weather files, plus an optional timestamp column. Samples without a pressure use the barometric pressure above.")
+            if trend_file is None:
+                return
+            try:
+                trend = load_trend_file(trend_file.getvalue(), trend_file.name, pressure)
+            except Exception as e:
+                st.error(f"❌ Error reading trend file: {str(e)}")
+                return
+            if len(trend) == 0:
+                st.warning("The trend file has no samples.")
+                return
+            # Where a stopped replay got to
+            if 'replay_resume' in st.session_state:
+                st.session_state.replay_position = min(st.session_state.pop('replay_resume'), len(trend))
+            position = st.slider("Position (samples)", min_value=0, max_value=len(trend), key="replay_position")
+            col1, col2 = st.columns(2)
+            play = col1.button("▶️ Play", type="primary", key="replay_play", use_container_width=True)
+            col2.button("⏹️ Stop", key="replay_stop", use_container_width=True)
+            screen = st.empty()
+            if not play:
+                replay.seek(trend, renderer, position)
+                screen.image(renderer.frame(trend.time[position - 1] if position else ''), use_container_width=True)
+                return
+            start = 0 if position >= len(trend) else position
+            with timer.span("Replay"):
+                for position, frame in replay.replay_frames(trend, renderer, start, step, fps):
+                    screen.image(frame, use_container_width=True)
+                    st.session_state.replay_resume = position
+        
+        else:
+            col1, col2 = st.columns(2)
+            host = col1.text_input("Host", value=replay.DEFAULT_HOST, key="replay_host")
+            port = col2.number_input("Port", min_value=1, max_value=65535, value=replay.DEFAULT_PORT, key="replay_port")
+            st.caption(f"One JSON sample per line, e.g. from `python -m replay serve trend.csv --port {port}`.")
+            col1, col2 = st.columns(2)
+            connect = col1.button("📡 Connect", type="primary", key="replay_connect", use_container_width=True)
+            col2.button("⏹️ Stop", key="replay_disconnect", use_container_width=True)
+            if not connect:
+                return
+            try:
+                feed = replay.SocketFeed(host, port, pressure)
+            except OSError as e:
+                st.error(f"❌ Could not connect to {host}:{port}: {str(e)}")
+                return
+            screen = st.empty()
+            renderer.trail.clear()
+            try:
+                with timer.span("Replay"):
+                    while not feed.closed:
+                        start = time.perf_counter()
+                        trend = feed.poll()
+                        if len(trend):
+                            renderer.push(trend.dry_bulb, trend.hum_ratio)
+                            screen.image(renderer.frame(trend.time[-1]), use_container_width=True)
+                        time.sleep(max(0.0, 1 / fps - (time.perf_counter() - start)))
+            finally:
+                feed.close()
+            st.info(f"Feed closed after {feed.count:,} samples.")
+
+
+#st.set_page_config(layout="wide")
+st.title("🌡️ Psychrometric Calculator")
+st.write("Calculate and plot psychrometric properties of moist air using SI units.")
+
+# Main page - Input Parameters Section
+st.header("Add New Condition")
+# Main content area - calculations happen automatically
+if True:
+    try:
+        
+        #st.divider()
+        
+        # Point Management Section - Now includes name input
+        #st.header("💾 Save Point to Chart")
+        
+        tab1, tab2, tab3 = st.tabs(["➕ Add Condition", "🔀 Add Mixed Condition", "🎯 Goal Seek"])
+        
+        with tab1:
+            col1, col2 = st.columns(2)
+            with col1:
+                pressure_method = st.radio(
+                    "Barometric Pressure Based on:",
+                    ["Actual Pressure (kPa)", "Elevation (meters)"]
+                )
+
+            with col2:
+                if pressure_method == "Actual Pressure (kPa)":
+                    pressure = st.number_input(
+                        "Barometric Pressure (kPa)",
+                        min_value=50.0,
+                        max_value=110.0,
+                        value=101.325,
+                        step=0.1,
+                        format="%.3f"
+                    )
+                else:
+                    elevation = st.number_input(
+                        "Elevation (meters)",
+                        min_value=-500.0,
+                        max_value=5000.0,
+                        value=0.0,
+                        step=10.0
+                    )
+                    # Calculate pressure from elevation using standard atmosphere
+                    pressure = pressure_from_elevation(elevation)
+                
+                #st.metric("Calculated Pressure", f"{pressure:.3f} kPa")
+            
+            add_condition_form(pressure)
+        
+        with tab2:
+            add_mixed_form()
+        
+        with tab3:
+            goal_seek_form(pressure)
+        
+        # Display and edit existing points
+        uncertainty_ellipses = None
+        if st.session_state.points_data:
+            st.subheader("Plotted Conditions")
+            
+            # Get list of all point names for connection dropdown
+            all_point_names = store.names()
+            input_point_names = store.names('input')
+            
+            # Sensor uncertainty: Monte Carlo intervals in the tables and ellipses on the chart
+            point_intervals = None
+            with st.expander("± Sensor Uncertainty"):
+                uncertainty_mode = st.toggle("Show sensor uncertainty", key="uncertainty_mode")
+                col1, col2, col3, col4 = st.columns(4)
+                dry_bulb_accuracy = col1.number_input("Dry Bulb Accuracy (± °C)", min_value=0.0, max_value=5.0,
+                                                      value=uncertainty.DRY_BULB_ACCURACY, step=0.1, key="uncertainty_db")
+                rel_hum_accuracy = col2.number_input("RH Accuracy (± %)", min_value=0.0, max_value=20.0,
+                                                     value=uncertainty.REL_HUM_ACCURACY, step=0.5, key="uncertainty_rh")
+                samples = col3.select_slider("Samples per Point", options=UNCERTAINTY_SAMPLES,
+                                             value=uncertainty.DEFAULT_SAMPLES, key="uncertainty_samples")
+                confidence = col4.selectbox("Confidence (%)", [90, 95, 99], index=1, key="uncertainty_confidence")
+                st.caption("Accuracies are sensor limits: each reading is sampled uniformly within them and every sample is solved. Mixed points mix their sources' samples.")
+                if uncertainty_mode:
+                    samples = max(min(samples, MAX_UNCERTAINTY_STATES // len(store)), 100)
+                    with timer.span("Uncertainty"):
+                        uncertainty_summary, uncertainty_ellipses = point_uncertainty(
+                            store.to_records(), pressure, samples, dry_bulb_accuracy, rel_hum_accuracy, confidence / 100
+                        )
+                    point_intervals = uncertainty_summary
+                    if samples < st.session_state.uncertainty_samples:
+                        st.caption(f"{samples:,} samples per point for {len(store):,} points.")
+            
+            conditions_view = st.radio(
+                "View",
+                ["Point panels", "Summary table"],
+                horizontal=True,
+                label_visibility="collapsed",
+                key="conditions_view"
+            )
+            if conditions_view == "Summary table":
+                with timer.section("Summary table"):
+                    with timer.span("Summary table"):
+                        summary = properties_summary(pressure, point_intervals)
+                    st.dataframe(summary, hide_index=True, use_container_width=True)
+            else:
+                for idx in range(len(st.session_state.points_data)):
+                    point_panel(idx, all_point_names, input_point_names, pressure,
+                                None if point_intervals is None else uncertainty.format_intervals(point_intervals, idx))
+            
+            with timer.section("Export and import"):
+                # Export/Import and Clear buttons
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    # Export points; the file is only built when the button is clicked
+                    export_format = st.selectbox("Export format", export_formats(), key="export_format",
+                                                 label_visibility="collapsed")
+                    extension, mime = EXPORT_FORMATS[export_format]
+                    # Snapshot for the download thread, which runs alongside later reruns
+                    points_snapshot = list(store.points)
+                    point_counter = st.session_state.point_counter
+                    
+                    def build_export():
+                        # Runs after this run's spans are done, so it only reports to the metrics
+                        start = time.perf_counter()
+                        data = export_points(points_snapshot, point_counter, export_format)
+                        metrics.observe('span', "Export serialization", time.perf_counter() - start)
+                        return data
+                    
+                    st.download_button(
+                        label="📥 Export Points",
+                        data=build_export,
+                        file_name=f"psychrometric_points{extension}",
+                        mime=mime,
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+                
+                with col2:
+                    if st.button("🗑️ Clear All Points", use_container_width=True):
+                        st.session_state.points_data = []
+                        st.session_state.point_counter = 1
+                        st.rerun()
+        else:
+            with timer.section("Export and import"):
+                # Show import option even when no points exist
+                st.info("No saved points yet. Add points above or import existing data.")
+                uploaded_file = st.file_uploader("📤 Import Points", type=list(IMPORT_TYPES), key="import_points_empty")
+                st.caption("JSON as exported, NDJSON (one point per line) or Parquet. Points without a pressure get the barometric pressure above.")
+                if uploaded_file is not None:
+                    try:
+                        # Streamed: points are checked and stored one at a time
+                        progress = st.progress(0.0, text="Importing points...")
+                        with timer.span("Import"):
+                            imported, point_counter = read_points(
+                                uploaded_file, progress=lambda share: progress.progress(share, text="Importing points..."),
+                                pressure=pressure
+                            )
+                        progress.empty()
+                        st.session_state.points_data = imported
+                        st.session_state.point_counter = point_counter
+                        st.success(f"✅ Imported {len(imported)} points")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error importing file: {str(e)}")
+        
+        # Weather file analysis
+        weather_bins = None
+        with timer.section("Weather analysis"):
+            with st.expander("📅 Weather File Analysis"):
+                weather_file = st.file_uploader("Hourly Weather File (EPW or CSV)", type=['epw', 'csv'], key="weather_file")
+                st.caption("CSV files need a dry_bulb (°C) column, a dew_point (°C) or rel_hum (%) column and optionally pressure (kPa). Records without a pressure use the barometric pressure above.")
+                if weather_file is not None:
+                    try:
+                        with timer.span("Weather analysis"):
+                            weather_bins = analyse_weather(weather_file.getvalue(), weather_file.name, pressure)
+                    except Exception as e:
+                        st.error(f"❌ Error reading weather file: {str(e)}")
+                if weather_bins is not None:
+                    col1, col2 = st.columns(2)
+                    col1.metric("Hours", f"{weather_bins.hours:,}")
+                    col2.metric("Missing or Invalid", f"{weather_bins.missing:,}")
+                    show_weather = st.checkbox("Show hours on chart", value=True, key="weather_overlay")
+                    
+                    st.write("**Design Conditions**")
+                    st.dataframe(weather_bins.design_conditions().round(1), hide_index=True, use_container_width=True)
+                    
+                    st.write("**Hours per Enthalpy Bin**")
+                    st.bar_chart(weather_bins.enthalpy_table(), x='Enthalpy (kJ/kg)', y='Hours')
+                    
+                    st.write("**Hours per Dry Bulb and Humidity Ratio Bin**")
+                    st.dataframe(weather_bins.bin_table(), use_container_width=True)
+                    if not show_weather:
+                        weather_bins = None
+        
+        # Comfort and equipment envelopes
+        envelope_specs = ()
+        with timer.section("Envelopes"):
+            with st.expander("🟩 Comfort and Equipment Envelopes"):
+                envelope_specs = envelope_panel(pressure, weather_file)
+        
+        with st.expander("▶️ Trend Replay"):
+            trend_replay(pressure)
+        
+        # Psychrometric Chart
+        st.subheader("Psychrometric Chart")
+        psychrometric_chart(pressure, weather_bins, uncertainty_ellipses, envelope_specs)
         
         
+        # Where the time of a run goes, and what fragments and the caches save
+        if profiler is not None:
+            st.session_state.profile_report = profile_report(profiler)
+        if debug:
+            performance_panel = st.expander("⏱️ Performance", key="performance_panel", on_change="rerun")
+            if performance_panel.open:
+                with performance_panel:
+                    st.write("**Stages of this run**")
+                    st.dataframe(timer.span_rows(), hide_index=True, use_container_width=True)
+                    st.write("**Sections**")
+                    st.dataframe(timer.rows(), hide_index=True, use_container_width=True)
+                    st.caption(f"Chart images: {image_cache.hits} served from cache, {image_cache.misses} rendered")
+                    st.write("**State memo** (shared by all sessions)")
+                    st.dataframe(memo_stats(), hide_index=True, use_container_width=True)
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        # The callback runs before the rerun the click starts, so that rerun is profiled
+                        st.button("🔬 Profile next run", use_container_width=True,
+                                  on_click=st.session_state.__setitem__, args=('profile_next_run', True))
+                    with col2:
+                        st.download_button(
+                            label="📈 Metrics (Prometheus)",
+                            data=metrics.prometheus_text(),
+                            file_name="psychro_metrics.prom",
+                            mime="text/plain",
+                            use_container_width=True
+                        )
+                    if 'profile_report' in st.session_state:
+                        report, raw_stats = st.session_state.profile_report
+                        st.download_button(
+                            label="📥 Profile (pstats)",
+                            data=raw_stats,
+                            file_name="psychro_run.prof",
+                            mime="application/octet-stream"
+                        )
+                        st.code(report)
+        
     except Exception as e:
         st.error(f"❌ Error in calculation: {str(e)}")
-        st.info("Please check your input values and try again. Ensure wet bulb temperature is not higher than dry bulb temperature.")
\ No newline at end of file
+        st.info("Please check your input values and try again. Ensure wet bulb temperature is not higher than dry bulb temperature.")
+
+# Chart image and memo counters, then this run's log line and metrics file
+metrics.set_counter('chart_image_cache_hits_total', image_cache.hits, "Chart images served from the image cache.")
+metrics.set_counter('chart_image_cache_misses_total', image_cache.misses, "Chart images rendered.")
+for row in memo_stats():
+    # Metric names can't hold the dots of module-qualified names
+    name = row['Function'].replace('.', '_')
+    metrics.set_counter(f"memo_{name}_hits_total", row['Hits'], f"{row['Function']} results served from the state memo.")
+    metrics.set_counter(f"memo_{name}_misses_total", row['Misses'], f"{row['Function']} results solved.")
+timer.finish_run(METRICS_FILE)
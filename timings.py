@@ -0,0 +1,209 @@
+"""Per-section wall time of the app's script runs and fragment reruns.
+
+A full script run executes every section once; a fragment rerun executes
+only its own section, so the time it saves is what the other sections took
+in the last full run. Sections served from a cache (e.g. an unchanged chart
+image) report their own saving with ``saved``.
+
+Spans time the stages inside sections (input solving, chart build, render,
+...). Stats live in a plain dict, normally ``st.session_state``, so they
+survive reruns. Every section and span is also added to the process-wide
+``metrics``, which renders as Prometheus text. ``start_profile`` and
+``profile_report`` capture one run with cProfile.
+"""
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (s) of the duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PREFIX = 'psychro'
+# Functions listed in a profile report
+PROFILE_LIMIT = 30
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Process-wide duration histograms and counters, as Prometheus text."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._durations = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family, name, seconds):
+        """Add one duration (s) of name to a histogram family (e.g. 'span')."""
+        with self._lock:
+            stats = self._durations.setdefault((family, name), [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats[0][i] += 1
+            stats[1] += 1
+            stats[2] += seconds
+
+    def set_counter(self, name, value, help_text=''):
+        """Set a counter kept elsewhere (e.g. cache hits) to its current value."""
+        with self._lock:
+            self._counters[name] = (value, help_text)
+
+    def prometheus_text(self):
+        """Everything recorded, in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = sorted({family for family, _ in self._durations})
+            for family in families:
+                metric = f"{METRICS_PREFIX}_{family}_duration_seconds"
+                lines.append(f"# HELP {metric} Wall time of the app's {family}s.")
+                lines.append(f"# TYPE {metric} histogram")
+                for (f, name), (buckets, count, total) in sorted(self._durations.items()):
+                    if f != family:
+                        continue
+                    label = name.replace('\\', '\\\\').replace('"', '\\"')
+                    for bound, n in zip(self.buckets, buckets):
+                        lines.append(f'{metric}_bucket{{{family}="{label}",le="{bound}"}} {n}')
+                    lines.append(f'{metric}_bucket{{{family}="{label}",le="+Inf"}} {count}')
+                    lines.append(f'{metric}_sum{{{family}="{label}"}} {total:.6f}')
+                    lines.append(f'{metric}_count{{{family}="{label}"}} {count}')
+            for name, (value, help_text) in sorted(self._counters.items()):
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write prometheus_text to path (e.g. for node_exporter's textfile collector)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+# Shared by every session in the process
+metrics = Metrics()
+
+
+class SectionTimer:
+    """Records per-section durations (ms) into a dict that outlives the run."""
+
+    def __init__(self, state):
+        self.state = state
+        state.setdefault('run', 0)
+        state.setdefault('seen', set())
+        state.setdefault('sections', {})
+        state.setdefault('spans', {})
+
+    def start_run(self):
+        """Call at the top of every full script run."""
+        self.state['run'] += 1
+        self.state['seen'] = set()
+        self.state['spans'] = {}
+
+    def _stats(self, name):
+        return self.state['sections'].setdefault(name, {
+            'run': 0, 'full_ms': 0.0, 'last_ms': 0.0, 'runs': 0, 'fragment_runs': 0, 'saved_ms': 0.0,
+        })
+
+    @contextmanager
+    def section(self, name, instance=None):
+        """Time a block. Blocks repeated per item (e.g. one per point) share
+        a name and pass a distinct instance."""
+        key = (name, instance)
+        stats = self._stats(name)
+        fragment_rerun = key in self.state['seen']
+        self.state['seen'].add(key)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.observe('section', name, elapsed / 1000)
+            stats['last_ms'] = elapsed
+            stats['runs'] += 1
+            if fragment_rerun:
+                stats['fragment_runs'] += 1
+                stats['saved_ms'] += max(self.full_run_ms() - elapsed, 0.0)
+            else:
+                if stats['run'] != self.state['run']:
+                    stats['run'] = self.state['run']
+                    stats['full_ms'] = 0.0
+                stats['full_ms'] += elapsed
+
+    @contextmanager
+    def span(self, name):
+        """Time one stage of the run; repeated stages add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe('span', name, elapsed)
+            stats = self.state['spans'].setdefault(name, {'ms': 0.0, 'calls': 0})
+            stats['ms'] += elapsed * 1000
+            stats['calls'] += 1
+
+    def finish_run(self, metrics_path=None):
+        """Call at the end of a full run: logs the run's spans as one JSON
+        line (debug level) and writes the metrics file if a path is given."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                'run': self.state['run'],
+                'sections_ms': {name: round(s['last_ms'], 3) for name, s in self.state['sections'].items()},
+                'spans_ms': {name: round(s['ms'], 3) for name, s in self.state['spans'].items()},
+            }))
+        if metrics_path:
+            metrics.write(metrics_path)
+
+    def saved(self, name, ms):
+        """Record time a section saved by not redoing its work."""
+        self._stats(name)['saved_ms'] += max(ms, 0.0)
+
+    def full_run_ms(self):
+        """Time of the last full run, summed over its sections."""
+        return sum(s['full_ms'] for s in self.state['sections'].values())
+
+    def rows(self):
+        """One dict per section, for display."""
+        return [
+            {
+                'Section': name,
+                'Last full run (ms)': round(s['full_ms'], 1),
+                'Last run (ms)': round(s['last_ms'], 1),
+                'Fragment reruns': s['fragment_runs'],
+                'Time saved (ms)': round(s['saved_ms'], 1),
+            }
+            for name, s in self.state['sections'].items()
+        ]
+
+    def span_rows(self):
+        """One dict per span of the current run (and its fragment reruns), slowest first."""
+        spans = sorted(self.state['spans'].items(), key=lambda item: -item[1]['ms'])
+        return [{'Stage': name, 'Time (ms)': round(s['ms'], 1), 'Calls': s['calls']} for name, s in spans]
+
+
+def start_profile():
+    """Start a cProfile capture; pass the result to profile_report."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def profile_report(profiler, limit=PROFILE_LIMIT):
+    """Stop a capture. Returns (text of the top functions by cumulative
+    time, pstats file contents for snakeviz or pstats)."""
+    profiler.disable()
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats('cumulative').print_stats(limit)
+    # Same format as pstats.Stats.dump_stats
+    raw = marshal.dumps(stats.stats)
+    return text.getvalue(), raw
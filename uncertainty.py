@@ -0,0 +1,197 @@
+"""Monte Carlo propagation of sensor uncertainty through the state calculations.
+
+Every measured point (dry bulb and RH) is sampled many times within the
+sensor accuracy. The samples of all points are solved in one call to
+psychro_calc.solve_batch. Mixed points mix their sources' samples pairwise,
+so a source's error carries through to every mix that uses it. The samples
+are summarised as confidence intervals per property and as ellipses in the
+chart's dry bulb / humidity ratio coordinates.
+
+Sensor accuracies (± values) are taken as the half-width of a uniform
+distribution. This is the GUM treatment of a manufacturer's limit with no
+stated confidence level.
+
+Units as in the app: °C, RH in %, pressure in kPa, enthalpy in kJ/kg.
+"""
+import numpy as np
+
+import psychro_engine as engine
+from point_store import SOURCE_KEYS
+from psychro_calc import solve_batch
+
+# Typical sensor accuracy, ± °C and ± %RH
+DRY_BULB_ACCURACY = 0.3
+REL_HUM_ACCURACY = 2.5
+DEFAULT_SAMPLES = 10_000
+CONFIDENCE = 0.95
+# Properties kept per sample: solve_batch's columns plus these
+PROPERTY_KEYS = (
+    'dry_bulb', 'hum_ratio', 'rel_hum', 'wet_bulb', 'dew_point', 'enthalpy', 'specific_volume',
+    'density', 'degree_of_saturation', 'vapor_pressure', 'absolute_humidity', 'sat_vapor_pressure',
+)
+# Key of each row of psychro_calc.PROPERTY_ROWS (pressure is not measured
+# here, so it has none) and the decimals point_properties shows it with
+PROPERTY_ROW_KEYS = (
+    (None, 3), ('dry_bulb', 2), ('wet_bulb', 2), ('dew_point', 2), ('rel_hum', 2), ('hum_ratio', 6),
+    ('enthalpy', 2), ('specific_volume', 4), ('density', 4), ('degree_of_saturation', 2),
+    ('absolute_humidity', 6), ('vapor_pressure', 3), ('sat_vapor_pressure', 3),
+)
+
+
+def _solve(dry_bulb, humidity_method, humidity_value, pressure):
+    # Every PROPERTY_KEYS property of arrays of states, solved exactly: the
+    # lookup tables would be built (and saved) for every new pressure,
+    # including each mix pressure, which takes longer than these solves
+    states = solve_batch(dry_bulb, humidity_method, humidity_value, pressure)
+    states['dry_bulb'] = np.broadcast_to(dry_bulb, states['hum_ratio'].shape)
+    states['absolute_humidity'] = states['hum_ratio'] * states['density']
+    states['sat_vapor_pressure'] = engine.sat_vap_pres(states['dry_bulb']) / 1000
+    states['pressure'] = np.broadcast_to(pressure, states['hum_ratio'].shape)
+    return states
+
+
+def sample_states(dry_bulb, rel_hum, pressure, samples=DEFAULT_SAMPLES, dry_bulb_accuracy=DRY_BULB_ACCURACY,
+                  rel_hum_accuracy=REL_HUM_ACCURACY, rng=None):
+    """Solved samples of measured states.
+
+    dry_bulb, rel_hum and pressure are arrays of one value per point.
+    Returns a dict of (points, samples) arrays keyed by PROPERTY_KEYS plus
+    'pressure'. RH samples are kept within 0 to 100 %.
+    """
+    rng = np.random.default_rng(rng)
+    dry_bulb, rel_hum, pressure = (np.asarray(x, dtype=np.float64)[:, None] for x in
+                                   np.broadcast_arrays(dry_bulb, rel_hum, pressure))
+    shape = (dry_bulb.shape[0], samples)
+    sampled_dry_bulb = dry_bulb + rng.uniform(-dry_bulb_accuracy, dry_bulb_accuracy, shape)
+    sampled_rel_hum = np.clip(rel_hum + rng.uniform(-rel_hum_accuracy, rel_hum_accuracy, shape), 0.0, 100.0)
+    return _solve(sampled_dry_bulb, engine.REL_HUM, sampled_rel_hum, np.broadcast_to(pressure, shape))
+
+
+def mix_states(states1, states2, ratio1):
+    """Samples of adiabatic mixes of sampled sources, sample by sample.
+
+    states1 and states2 are sample_states results (or rows of them);
+    ratio1 is the dry air mass share of source 1 (%), one per mix. Enthalpy,
+    humidity ratio and pressure are weighted as in process_chain.mix.
+    """
+    share = np.asarray(ratio1, dtype=np.float64)[:, None] / 100
+    hum_ratio = share * states1['hum_ratio'] + (1 - share) * states2['hum_ratio']
+    enthalpy = (share * states1['enthalpy'] + (1 - share) * states2['enthalpy']) * 1000
+    pressure = share * states1['pressure'] + (1 - share) * states2['pressure']
+    with np.errstate(invalid='ignore'):
+        dry_bulb = engine.dry_bulb_from_enthalpy_and_hum_ratio(enthalpy, hum_ratio)
+    return _solve(dry_bulb, engine.HUM_RATIO, hum_ratio, pressure)
+
+
+def sample_points(points, pressure, samples=DEFAULT_SAMPLES, dry_bulb_accuracy=DRY_BULB_ACCURACY,
+                  rel_hum_accuracy=REL_HUM_ACCURACY, seed=0):
+    """Samples of every one of the app's point dicts, in order.
+
+    Input points are sampled (pressure, kPa, for points without their own);
+    mixed points mix their sources' samples. Points whose sources are
+    missing stay NaN. Returns a dict of (points, samples) arrays as
+    sample_states.
+    """
+    rng = np.random.default_rng(seed)
+    index = {p['name']: i for i, p in enumerate(points)}
+    states = {key: np.full((len(points), samples), np.nan) for key in PROPERTY_KEYS + ('pressure',)}
+    done = np.zeros(len(points), dtype=bool)
+
+    def store(rows, solved):
+        for key in states:
+            states[key][rows] = solved[key]
+        done[rows] = True
+
+    inputs = [i for i, p in enumerate(points) if p.get('type', 'input') == 'input']
+    if inputs:
+        store(inputs, sample_states(
+            [points[i]['dry_bulb'] for i in inputs], [points[i]['rel_hum'] for i in inputs],
+            [points[i].get('pressure') or pressure for i in inputs], samples, dry_bulb_accuracy, rel_hum_accuracy, rng,
+        ))
+    pending = [i for i, p in enumerate(points) if p.get('type') == 'mixed']
+    # Mixes of mixes need their sources first: solve in rounds
+    while pending:
+        ready = [i for i in pending
+                 if all(points[i].get(key) in index and done[index[points[i][key]]] for key in SOURCE_KEYS)]
+        if not ready:
+            break
+        rows1 = [index[points[i]['source1']] for i in ready]
+        rows2 = [index[points[i]['source2']] for i in ready]
+        store(ready, mix_states(
+            {key: values[rows1] for key, values in states.items()},
+            {key: values[rows2] for key, values in states.items()},
+            [points[i]['ratio1'] for i in ready],
+        ))
+        pending = [i for i in pending if not done[i]]
+    return states
+
+
+def intervals(values, confidence=CONFIDENCE):
+    """(mean, low, high) per row of (points, samples) values: the central
+    confidence interval. NaN samples (unsolvable states) are left out."""
+    ordered = np.sort(values, axis=1)  # NaN sorts last
+    valid = np.count_nonzero(~np.isnan(values), axis=1)
+    rows = np.arange(len(values))
+    bounds = []
+    for q in ((1 - confidence) / 2, (1 + confidence) / 2):
+        # Linear interpolation between order statistics, as np.quantile
+        position = np.maximum(valid - 1, 0) * q
+        lo = np.floor(position).astype(np.intp)
+        hi = np.minimum(lo + 1, np.maximum(valid - 1, 0))
+        weight = position - lo
+        bound = ordered[rows, lo] * (1 - weight) + ordered[rows, hi] * weight
+        bounds.append(np.where(valid > 0, bound, np.nan))
+    mean = np.where(valid > 0, np.nansum(values, axis=1) / np.maximum(valid, 1), np.nan)
+    return mean, bounds[0], bounds[1]
+
+
+def summarize(states, confidence=CONFIDENCE):
+    """Dict of PROPERTY_KEYS -> (mean, low, high) arrays, one value per point."""
+    return {key: intervals(states[key], confidence) for key in PROPERTY_KEYS}
+
+
+def ellipses(states, confidence=CONFIDENCE):
+    """Confidence ellipses of the samples in chart coordinates.
+
+    Returns (dry bulb centre (°C), humidity ratio centre (g/kg), width,
+    height, angle (degrees)) arrays, one per point, from each point's
+    sample mean and covariance. The ellipse holds confidence of the samples
+    if they are roughly normal.
+    """
+    x = states['dry_bulb']
+    y = states['hum_ratio'] * 1000
+    valid = ~(np.isnan(x) | np.isnan(y))
+    count = np.maximum(valid.sum(axis=1), 2)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    cx = x.sum(axis=1) / count
+    cy = y.sum(axis=1) / count
+    dx = np.where(valid, x - cx[:, None], 0.0)
+    dy = np.where(valid, y - cy[:, None], 0.0)
+    sxx = (dx * dx).sum(axis=1) / (count - 1)
+    syy = (dy * dy).sum(axis=1) / (count - 1)
+    sxy = (dx * dy).sum(axis=1) / (count - 1)
+    # Eigenvalues of the 2x2 covariance, and the angle of the major axis
+    half_trace = (sxx + syy) / 2
+    spread = np.sqrt(((sxx - syy) / 2) ** 2 + sxy ** 2)
+    major = np.maximum(half_trace + spread, 0.0)
+    minor = np.maximum(half_trace - spread, 0.0)
+    angle = np.degrees(0.5 * np.arctan2(2 * sxy, sxx - syy))
+    # Chi-square quantile with 2 degrees of freedom
+    scale = np.sqrt(-2 * np.log(1 - confidence))
+    empty = valid.sum(axis=1) < 2
+    centre_x = np.where(empty, np.nan, cx)
+    centre_y = np.where(empty, np.nan, cy)
+    return centre_x, centre_y, 2 * scale * np.sqrt(major), 2 * scale * np.sqrt(minor), angle
+
+
+def format_intervals(summary, point):
+    """Interval strings ("low – high") of point (an index into summary) in
+    psychro_calc.PROPERTY_ROWS order; '' for rows without one."""
+    rows = []
+    for key, decimals in PROPERTY_ROW_KEYS:
+        if key is None or np.isnan(summary[key][1][point]):
+            rows.append('')
+        else:
+            rows.append(f"{summary[key][1][point]:.{decimals}f} – {summary[key][2][point]:.{decimals}f}")
+    return rows
@@ -0,0 +1,291 @@
+"""Annual weather file analysis: EPW/TMY or CSV hourly records to bins and design conditions.
+
+Every record is solved with the vectorized engine and folded into fixed-size
+histograms chunk by chunk, so memory use does not grow with the length of
+the file (multi-year records work the same as a single TMY year):
+
+- frequency bins of dry bulb x humidity ratio, as drawn on the chart
+- enthalpy bins
+- design conditions at the ASHRAE annual percentiles, with mean coincident
+  values (e.g. cooling 0.4% dry bulb with its mean coincident wet bulb)
+
+Example:
+
+    python -m weather SYDNEY.epw --bins sydney_bins.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import psychro_engine as engine
+from bulk_calc import DEFAULT_CHUNK_SIZE, iter_chunks
+from psychro_calc import solve_batch
+
+# EPW data rows follow 8 header lines; fields used and their missing-value markers
+EPW_HEADER_LINES = 8
+EPW_FIELDS = {6: 'dry_bulb', 7: 'dew_point', 8: 'rel_hum', 9: 'pressure'}
+EPW_MISSING = {'dry_bulb': 99.9, 'dew_point': 99.9, 'rel_hum': 999, 'pressure': 999999}
+
+# Standard sea level pressure (kPa), used when a record has none
+SEA_LEVEL_PRESSURE = 101.325
+
+# Bin widths of the frequency tables
+DRY_BULB_BIN = 1.0  # °C
+HUM_RATIO_BIN = 1.0  # g/kg
+ENTHALPY_BIN = 5.0  # kJ/kg
+# Range covered by the bins; colder, hotter or more humid records go in the end bins
+DRY_BULB_RANGE = (-60.0, 60.0)
+HUM_RATIO_RANGE = (0.0, 40.0)
+ENTHALPY_RANGE = (-60.0, 160.0)
+# Resolution of the histograms used for percentiles
+PERCENTILE_STEP = 0.05
+# Hours within this distance of a design value are averaged for coincident values
+COINCIDENT_WINDOW = 0.5
+
+# Annual frequencies of exceedance (%) of the ASHRAE design conditions
+COOLING_FREQUENCIES = (0.4, 1.0, 2.0)
+HEATING_FREQUENCIES = (99.6, 99.0)
+COINCIDENT_LABELS = {
+    'dry_bulb': 'Mean coincident dry bulb (°C)',
+    'wet_bulb': 'Mean coincident wet bulb (°C)',
+    'hum_ratio': 'Mean coincident humidity ratio (g/kg)',
+}
+
+
+def _edges(value_range, step):
+    lo, hi = value_range
+    return np.linspace(lo, hi, int(round((hi - lo) / step)) + 1)
+
+
+def _bin_index(values, edges):
+    # Bin of each value, values outside the edges clipped into the end bins
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+def _labels(edges, decimals=0):
+    return [f"{lo:.{decimals}f} to {hi:.{decimals}f}" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+class _Histogram:
+    # Fine histogram of one property, with sums of coincident properties per bin
+
+    def __init__(self, value_range, coincident=()):
+        self.edges = _edges(value_range, PERCENTILE_STEP)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.sums = {name: np.zeros(len(self.counts)) for name in coincident}
+
+    def add(self, values, coincident):
+        index = _bin_index(values, self.edges)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        for name, sums in self.sums.items():
+            sums += np.bincount(index, weights=coincident[name], minlength=len(sums))
+
+    def exceeded(self, frequency):
+        """Value exceeded frequency % of the time, interpolated within its bin."""
+        total = self.counts.sum()
+        if total == 0:
+            return np.nan
+        target = total * (1 - frequency / 100)
+        cumulative = np.cumsum(self.counts)
+        i = min(int(np.searchsorted(cumulative, target)), len(self.counts) - 1)
+        below = cumulative[i] - self.counts[i]
+        fraction = (target - below) / self.counts[i] if self.counts[i] else 0.0
+        return self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i])
+
+    def coincident_mean(self, name, value):
+        """Mean of a coincident property over the hours within COINCIDENT_WINDOW of value."""
+        centres = (self.edges[:-1] + self.edges[1:]) / 2
+        near = np.abs(centres - value) <= COINCIDENT_WINDOW
+        hours = self.counts[near].sum()
+        return self.sums[name][near].sum() / hours if hours else np.nan
+
+
+class WeatherBins:
+    """Bin counts and design conditions accumulated over hourly states."""
+
+    def __init__(self, dry_bulb_bin=DRY_BULB_BIN, hum_ratio_bin=HUM_RATIO_BIN, enthalpy_bin=ENTHALPY_BIN):
+        self.dry_bulb_edges = _edges(DRY_BULB_RANGE, dry_bulb_bin)
+        self.hum_ratio_edges = _edges(HUM_RATIO_RANGE, hum_ratio_bin)
+        self.enthalpy_edges = _edges(ENTHALPY_RANGE, enthalpy_bin)
+        # Hours per dry bulb (rows) x humidity ratio (columns, g/kg) bin
+        self.counts = np.zeros((len(self.dry_bulb_edges) - 1, len(self.hum_ratio_edges) - 1), dtype=np.int64)
+        self.enthalpy_counts = np.zeros(len(self.enthalpy_edges) - 1, dtype=np.int64)
+        self.hours = 0
+        # Records that could not be solved (missing or invalid values)
+        self.missing = 0
+        self._dry_bulb = _Histogram(DRY_BULB_RANGE, ('wet_bulb',))
+        self._wet_bulb = _Histogram(DRY_BULB_RANGE, ('dry_bulb',))
+        self._dew_point = _Histogram(DRY_BULB_RANGE, ('dry_bulb', 'hum_ratio'))
+        self._enthalpy = _Histogram(ENTHALPY_RANGE, ('dry_bulb',))
+
+    def add(self, states):
+        """Add solved states (a solve_batch result) to the bins."""
+        valid = ~(np.isnan(states['dry_bulb']) | np.isnan(states['hum_ratio']) | np.isnan(states['wet_bulb']))
+        self.missing += int(valid.size - valid.sum())
+        states = {key: np.asarray(values)[valid] for key, values in states.items()}
+        states['hum_ratio'] = states['hum_ratio'] * 1000  # g/kg
+        self.hours += len(states['dry_bulb'])
+
+        rows = _bin_index(states['dry_bulb'], self.dry_bulb_edges)
+        cols = _bin_index(states['hum_ratio'], self.hum_ratio_edges)
+        self.counts += np.bincount(
+            rows * self.counts.shape[1] + cols, minlength=self.counts.size
+        ).reshape(self.counts.shape)
+        self.enthalpy_counts += np.bincount(
+            _bin_index(states['enthalpy'], self.enthalpy_edges), minlength=len(self.enthalpy_counts)
+        )
+        self._dry_bulb.add(states['dry_bulb'], states)
+        self._wet_bulb.add(states['wet_bulb'], states)
+        self._dew_point.add(states['dew_point'], states)
+        self._enthalpy.add(states['enthalpy'], states)
+
+    def bin_table(self):
+        """Hours per dry bulb (rows, °C) x humidity ratio (columns, g/kg) bin, empty edges trimmed."""
+        table = pd.DataFrame(
+            self.counts,
+            index=pd.Index(_labels(self.dry_bulb_edges), name='Dry bulb (°C)'),
+            columns=pd.Index(_labels(self.hum_ratio_edges), name='Humidity ratio (g/kg)'),
+        )
+        rows = np.flatnonzero(self.counts.any(axis=1))
+        cols = np.flatnonzero(self.counts.any(axis=0))
+        if rows.size == 0:
+            return table.iloc[:0, :0]
+        return table.iloc[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    def enthalpy_table(self):
+        """Hours and share of the year per enthalpy bin (kJ/kg), empty edges trimmed."""
+        table = pd.DataFrame({
+            'Enthalpy (kJ/kg)': _labels(self.enthalpy_edges),
+            'Hours': self.enthalpy_counts,
+            '%': 100 * self.enthalpy_counts / max(self.hours, 1),
+        })
+        used = np.flatnonzero(self.enthalpy_counts)
+        if used.size == 0:
+            return table.iloc[:0]
+        return table.iloc[used[0]:used[-1] + 1].reset_index(drop=True)
+
+    def design_conditions(self):
+        """ASHRAE-style annual design conditions with mean coincident values."""
+        conditions = (
+            ('Heating dry bulb', HEATING_FREQUENCIES, self._dry_bulb, '°C', 'wet_bulb'),
+            ('Cooling dry bulb', COOLING_FREQUENCIES, self._dry_bulb, '°C', 'wet_bulb'),
+            ('Evaporation wet bulb', COOLING_FREQUENCIES, self._wet_bulb, '°C', 'dry_bulb'),
+            ('Dehumidification dew point', COOLING_FREQUENCIES, self._dew_point, '°C', 'hum_ratio'),
+            ('Enthalpy', COOLING_FREQUENCIES, self._enthalpy, 'kJ/kg', 'dry_bulb'),
+        )
+        rows = []
+        for condition, frequencies, histogram, unit, coincident in conditions:
+            for frequency in frequencies:
+                value = histogram.exceeded(frequency)
+                rows.append({
+                    'Condition': condition,
+                    'Frequency (%)': frequency,
+                    'Value': value,
+                    'Unit': unit,
+                    'Coincident': COINCIDENT_LABELS[coincident],
+                    'Coincident value': histogram.coincident_mean(coincident, value),
+                })
+        return pd.DataFrame(rows)
+
+
+def _is_epw(source, fmt):
+    if fmt is not None:
+        return fmt == 'epw'
+    name = getattr(source, 'name', source)
+    return os.path.splitext(str(name))[1].lower() == '.epw'
+
+
+def iter_epw(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the hourly records of an EPW file as DataFrames.
+
+    Columns: dry_bulb (°C), dew_point (°C), rel_hum (%) and pressure (kPa),
+    missing values as NaN.
+    """
+    reader = pd.read_csv(
+        source, skiprows=EPW_HEADER_LINES, header=None, usecols=list(EPW_FIELDS),
+        chunksize=chunk_size, encoding='latin-1',
+    )
+    for chunk in reader:
+        chunk = chunk.rename(columns=EPW_FIELDS)
+        for column, missing in EPW_MISSING.items():
+            chunk[column] = chunk[column].where(chunk[column] < missing)
+        chunk['pressure'] = chunk['pressure'] / 1000  # Pa to kPa
+        yield chunk
+
+
+def iter_weather(source, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield hourly records from an EPW file or a CSV/Parquet file.
+
+    CSV and Parquet files need a dry_bulb column (°C), a dew_point (°C) or
+    rel_hum (%) column and optionally a pressure column (kPa). source may be
+    a path or a file object; fmt ('epw' or None) overrides detection by file
+    extension.
+    """
+    if _is_epw(source, fmt):
+        yield from iter_epw(source, chunk_size)
+    else:
+        yield from iter_chunks(source, chunk_size)
+
+
+def solve_weather(records, pressure=SEA_LEVEL_PRESSURE):
+    """Solve every record (see iter_weather for the columns).
+
+    The dew point is used when present (as in EPW files), relative humidity
+    otherwise. Records without a pressure use pressure (kPa).
+    """
+    if 'dew_point' in records:
+        method, humidity = engine.DEW_POINT, records['dew_point']
+    else:
+        method, humidity = engine.REL_HUM, records['rel_hum']
+    if 'pressure' in records:
+        pressure = records['pressure'].fillna(pressure).to_numpy(dtype=float)
+    dry_bulb = records['dry_bulb'].to_numpy(dtype=float)
+    states = solve_batch(dry_bulb, method, humidity.to_numpy(dtype=float), pressure)
+    states['dry_bulb'] = dry_bulb
+    return states
+
+
+def analyse(source, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, pressure=SEA_LEVEL_PRESSURE, **bin_options):
+    """Bin every hourly record of a weather file. Returns a WeatherBins."""
+    bins = WeatherBins(**bin_options)
+    for records in iter_weather(source, fmt, chunk_size):
+        bins.add(solve_weather(records, pressure))
+    return bins
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Design conditions and frequency bins of an EPW or CSV hourly weather file.",
+    )
+    parser.add_argument('input', help="input .epw, .csv or .parquet file")
+    parser.add_argument('--pressure', type=float, default=SEA_LEVEL_PRESSURE,
+                        help="barometric pressure (kPa) for records without one")
+    parser.add_argument('--bins', help="write the dry bulb x humidity ratio bin table to this CSV file")
+    parser.add_argument('--enthalpy-bins', help="write the enthalpy bin table to this CSV file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        bins = analyse(args.input, pressure=args.pressure)
+    except KeyError as e:
+        print(f"Error: column {e} not found in {args.input}", file=sys.stderr)
+        return 1
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{bins.hours} hours, {bins.missing} missing or invalid")
+    print(bins.design_conditions().to_string(index=False, float_format='{:.1f}'.format))
+    if args.bins:
+        bins.bin_table().to_csv(args.bins)
+    if args.enthalpy_bins:
+        bins.enthalpy_table().to_csv(args.enthalpy_bins, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())